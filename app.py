@@ -1,17 +1,29 @@
+from __future__ import annotations
+
 import sys
 from pathlib import Path
 
+import base64
 import csv
+import gzip
+import hashlib
 import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from io import TextIOWrapper
-import shutil
-from typing import List, Dict
-from datetime import datetime
-import pandas as pd
+from typing import TYPE_CHECKING, List, Dict
+from datetime import date, datetime
+import numpy as np
 
-from flask import Flask, request, jsonify, render_template, send_from_directory, send_file
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_DIR = BASE_DIR / "frontend"
 BACKEND_DIR = BASE_DIR / "backend"
@@ -20,9 +32,32 @@ BACKEND_DIR = BASE_DIR / "backend"
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
-from backend.postPort import validate_portfolio_input, save_portfolio, _slugify_name
+from backend import metrics
+from backend.postPort import validate_portfolio_input, build_portfolio, _slugify_name
 from backend.getStonks import update_current_portfolio_data
-from backend.portAnal import run_portfolio_analysis
+from backend.portAnal import holding_values, run_portfolio_analysis
+from backend.chartData import (
+    DEFAULT_RANGE, DEFAULT_RESOLUTION, DEFAULT_WIDTH, MAX_TICKERS, clamp_width, lttb, pick_resolution,
+    price_series_cache,
+)
+from backend.priceCache import price_cache, file_signature
+from backend.priceStore import valid_ticker
+from backend.liveUpdates import LiveValuation, SimulatedTicks
+from backend.lots import NO_DAY, Lots, parse_lots
+from backend.priceEvents import price_events
+from backend.quotes import quote_table
+from backend.valuation import value_lots, summarize
+from backend.jobs import job_queue
+from backend.tickerRegistry import ticker_registry
+from backend.timeSeries import DEFAULT_YEARS, value_series_cache, window_start
+from backend.riskAnal import DEFAULT_BENCHMARK, holdings_from_lots, portfolio_risk
+from backend.optimizer import DEFAULT_FRONTIER_POINTS, efficient_frontier, optimize
+from backend.forecast import DEFAULT_PATHS, DEFAULT_STEPS, simulate_stream
+from backend.sessions import (
+    PORTFOLIO_HEADER, SESSION_COOKIE, new_session_id, read_portfolio_csv, session_store, valid_session_id,
+)
+from backend.warmup import start_warmup
+from backend.catalog import SORT_FIELDS as CATALOG_SORT_FIELDS, catalog
 
 # Serve templates and static assets from /frontend
 app = Flask(
@@ -33,6 +68,238 @@ app = Flask(
 )
 
 
+# =========================================================
+# ⚪ instrumentation: Server-Timing, /metrics, sampling profiler ⚪
+# =========================================================
+
+# Per-request profiling (?_profile=1) is off unless the server opts in
+PROFILING_ENABLED = os.environ.get("EQUIVIZ_PROFILING", "").lower() in ("1", "true", "yes")
+MAX_PROFILES = 32
+
+_profiles: "OrderedDict[str, str]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+metrics.registry.gauge("equiviz_price_cache_entries", "Price histories held in memory.",
+                       lambda: price_cache.stats()["entries"])
+metrics.registry.gauge("equiviz_price_cache_bytes", "Memory used by cached price histories.",
+                       lambda: price_cache.stats()["bytes"])
+metrics.registry.gauge("equiviz_quotes", "Tickers in the latest-quote table.",
+                       lambda: quote_table.stats()["entries"])
+metrics.registry.gauge("equiviz_quotes_stale", "Quotes older than the quote TTL.",
+                       lambda: quote_table.stats()["stale"])
+metrics.registry.gauge("equiviz_sessions", "Sessions with a portfolio in memory.",
+                       lambda: session_store.stats()["sessions"])
+
+
+@app.before_request
+def _start_timing():
+    g.request_start = time.perf_counter()
+    g.timings = metrics.begin_collecting()
+    g.profiler = None
+    if PROFILING_ENABLED and request.args.get("_profile") == "1":
+        g.profiler = metrics.SamplingProfiler(threading.get_ident()).start()
+
+
+@app.after_request
+def _finish_timing(response):
+    # Registered first, so it runs after every other after_request hook
+    total = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.REQUEST_SECONDS.observe(total, route=route, method=request.method, status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing_header(g.timings, total)
+
+    profiler = getattr(g, "profiler", None)
+    if profiler is not None:
+        profile_id = new_session_id()
+        with _profiles_lock:
+            _profiles[profile_id] = profiler.stop().collapsed()
+            while len(_profiles) > MAX_PROFILES:
+                _profiles.popitem(last=False)
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@app.teardown_request
+def _stop_profiler(exc):
+    # after_request is skipped on unhandled errors; don't leave the sampler running
+    profiler = getattr(g, "profiler", None)
+    if profiler is not None:
+        profiler.stop()
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/debug/profile/<profile_id>', methods=['GET'])
+def debug_profile(profile_id):
+    """Collapsed stacks of a ?_profile=1 request (feed to flamegraph.pl or speedscope)."""
+    with _profiles_lock:
+        profile = _profiles.get(profile_id)
+    if profile is None:
+        return jsonify({"success": False, "error": "Profile not found."}), 404
+    return Response(profile, mimetype="text/plain")
+
+
+# =========================================================
+# 🟤 sessions: each browser gets its own current portfolio 🟤
+# =========================================================
+
+SESSION_COOKIE_MAX_AGE = 30 * 24 * 3600
+
+
+@app.before_request
+def _bind_session():
+    sid = request.cookies.get(SESSION_COOKIE)
+    g.new_session = not valid_session_id(sid)
+    g.session_id = new_session_id() if g.new_session else sid
+
+
+@app.after_request
+def _issue_session_cookie(response):
+    if getattr(g, "new_session", False):
+        response.set_cookie(SESSION_COOKIE, g.session_id, max_age=SESSION_COOKIE_MAX_AGE,
+                            httponly=True, samesite="Lax")
+    return response
+
+
+def _current_portfolio():
+    """This session's portfolio snapshot; FileNotFoundError if it has none."""
+    return session_store.require(g.session_id)
+
+
+# =========================================================
+# 🔵 HTTP caching: ETag / Last-Modified validators, gzip for large JSON 🔵
+# =========================================================
+
+# Snapshot versions restart with the process; the boot id keeps old ETags from matching
+_BOOT_ID = new_session_id()[:8]
+GZIP_MIN_BYTES = 2048
+GZIP_LEVEL = 6
+# Large numeric bodies (chart data, big pages) compress several times faster at level 1, for ~15% more bytes
+GZIP_FAST_MIN_BYTES = 64 * 1024
+GZIP_FAST_LEVEL = 1
+
+
+def _price_signature(portfolio) -> tuple:
+    """
+    (price store file signatures, quote signature) for the portfolio's tickers;
+    changes with every price write or quote change.
+    """
+    tickers = portfolio.lots.tickers
+    return tuple(file_signature(t) for t in tickers), quote_table.signature(tickers)
+
+
+def _validators(portfolio, price_sig: tuple | None = None) -> tuple:
+    """
+    (ETag, Last-Modified timestamp) for a view of `portfolio`: the snapshot version
+    changes on every edit, `price_sig` on every price write or quote change. Leave
+    price_sig out for views that don't depend on prices.
+    """
+    etag = f"{_BOOT_ID}-{portfolio.version}"
+    modified = portfolio.modified
+    if price_sig is not None:
+        etag += "-" + hashlib.blake2b(repr(price_sig).encode(), digest_size=8).hexdigest()
+        file_sigs, (_, quoted_at) = price_sig
+        mtimes = [sig[0] / 1e9 for sig in file_sigs if sig is not None]
+        modified = max(modified, quoted_at, *mtimes)
+    return etag, modified
+
+
+def _with_validators(response, etag: str, modified: float):
+    # Weak: the gzip and identity encodings share one tag
+    response.set_etag(etag, weak=True)
+    response.last_modified = int(modified)
+    # Per-session data: browsers may keep it, but must revalidate before reuse
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def _not_modified(etag: str, modified: float):
+    """A 304 response when the request's validators still match, else None."""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since is not None:
+        fresh = int(modified) <= request.if_modified_since.timestamp()
+    else:
+        fresh = False
+    return _with_validators(Response(status=304), etag, modified) if fresh else None
+
+
+@app.after_request
+def _gzip_json(response):
+    if (response.mimetype != "application/json" or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or not request.accept_encodings["gzip"]):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    with metrics.stage("gzip"):
+        level = GZIP_FAST_LEVEL if len(data) >= GZIP_FAST_MIN_BYTES else GZIP_LEVEL
+        compressed = gzip.compress(data, compresslevel=level)
+    metrics.GZIP_BYTES.inc(len(data), direction="in")
+    metrics.GZIP_BYTES.inc(len(compressed), direction="out")
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# =========================================================
+# 🟣 background jobs: refresh + analysis after portfolio changes 🟣
+# =========================================================
+
+MAX_JOB_WAIT_SECONDS = 30.0
+# Latest prices come from the quote table (TTL below), so full history syncs run on a slower schedule
+QUOTE_TTL_SECONDS = float(os.environ.get("EQUIVIZ_QUOTE_TTL_SECONDS", "60"))
+HISTORY_SYNC_SECONDS = float(os.environ.get("EQUIVIZ_HISTORY_SYNC_SECONDS", str(6 * 3600)))
+quote_table.ttl = QUOTE_TTL_SECONDS
+
+
+def _enqueue_refresh(portfolio):
+    def refresh_and_analyze(job) -> Dict:
+        with metrics.collect() as timings:
+            job.update(0.05, "Fetching market data")
+            # The risk panel's default benchmark needs history even when it isn't held
+            tickers = list(dict.fromkeys([*portfolio.tickers, DEFAULT_BENCHMARK]))
+            refresh = update_current_portfolio_data(tickers, max_age=HISTORY_SYNC_SECONDS)
+            job.update(0.5, "Fetching quotes")
+            quoted = quote_table.refresh(portfolio.tickers)
+            job.update(0.6, "Valuing portfolio")
+            # Precompute net totals so table pages only value their own rows
+            state = _table_state(portfolio)
+            # Keep the saved copy's summary current when this is an unmodified saved portfolio
+            catalog.record_valuation(portfolio.name, portfolio.lots.content_hash, state["totals"])
+        ms = {name: round(elapsed * 1000, 2) for name, elapsed in metrics.merge_timings(timings).items()}
+        return {"refresh": refresh, "quotes_changed": quoted, "timings": ms}
+
+    # A newer edit in the same session supersedes a refresh still waiting in the queue
+    return job_queue.submit(f"portfolio:{portfolio.session_id}", refresh_and_analyze, kind="refresh")
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found."}), 404
+    return jsonify({"success": True, "job": job.to_dict()}), 200
+
+
+@app.route('/jobs/<job_id>/wait', methods=['GET'])
+def job_wait(job_id):
+    try:
+        timeout = float(request.args.get("timeout", 10))
+    except ValueError:
+        return jsonify({"success": False, "error": "timeout must be a number."}), 400
+    timeout = max(0.0, min(timeout, MAX_JOB_WAIT_SECONDS))
+    job = job_queue.wait(job_id, timeout)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found."}), 404
+    return jsonify({"success": True, "job": job.to_dict()}), 200
+
+
 # =========================================================
 # 🔴index.html routes: landing + creation/upload/import 🔴
 # =========================================================
@@ -56,23 +323,20 @@ def create_portfolio():
         return jsonify({"success": False, "error": message}), 400
 
     try:
-        saved_path = save_portfolio(data)
+        name, rows = build_portfolio(data)
+        portfolio = session_store.set(g.session_id, name, rows)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to save current_portfolio: {e}"}), 500
 
-    try:
-        update_current_portfolio_data()
-        run_portfolio_analysis()
-    except Exception as e:
-        return jsonify({"success": False, "error": f"Portfolio saved but failed to initialize data: {e}"}), 500
-
+    job = _enqueue_refresh(portfolio)
     return jsonify({
         "success": True,
         "message": message,
-        "path": str(saved_path)
-    }), 200
+        "name": portfolio.name,
+        "job_id": job.id
+    }), 202
 
 
 @app.route('/upload-portfolio', methods=['POST'])
@@ -90,51 +354,101 @@ def upload_portfolio():
 
     # Validate CSV header
     try:
-        file.stream.seek(0)
-        wrapper = TextIOWrapper(file.stream, encoding='utf-8', newline='')
-        reader = csv.reader(wrapper)
-        header = next(reader, [])
-        expected = ["Asset", "Quantity", "Date Acquired"]
+        text = TextIOWrapper(file.stream, encoding='utf-8', newline='').read()
+        header = next(csv.reader(io.StringIO(text)), [])
         normalized = [h.strip() for h in header]
-        if normalized != expected:
+        if normalized != PORTFOLIO_HEADER:
             return jsonify({"success": False, "error": "CSV has incorrect format."}), 400
     except Exception:
         return jsonify({"success": False, "error": "CSV has incorrect format."}), 400
-    finally:
-        file.stream.seek(0)
-
-    dest_dir = BACKEND_DIR / "current_portfolio"
-    dest_dir.mkdir(parents=True, exist_ok=True)
-
-    # Clear previous uploads
-    for item in dest_dir.iterdir():
-        if item.is_file():
-            item.unlink()
 
-    dest_path = dest_dir / filename
     try:
-        file.save(dest_path)
+        portfolio = session_store.set(g.session_id, Path(filename).stem, read_portfolio_csv(text))
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to save file: {e}"}), 500
 
-    try:
-        update_current_portfolio_data()
-        run_portfolio_analysis()
-    except Exception as e:
-        return jsonify({"success": False, "error": f"Saved file but failed to fetch stock data: {e}"}), 500
+    job = _enqueue_refresh(portfolio)
+    return jsonify({"success": True, "message": "Portfolio uploaded.", "name": portfolio.name,
+                    "job_id": job.id}), 202
+
 
-    return jsonify({"success": True, "message": "Portfolio uploaded.", "path": str(dest_path)}), 200
+CATALOG_DEFAULT_LIMIT = 200
+CATALOG_MAX_LIMIT = 1000
 
 
 @app.route('/saved-portfolios', methods=['GET'])
 def saved_portfolios():
-    saved_dir = BACKEND_DIR / "saved_portfolios"
-    saved_dir.mkdir(parents=True, exist_ok=True)
-    portfolios = []
-    for f in saved_dir.glob("*.csv"):
-        if f.is_file():
-            portfolios.append(f.stem)
-    return jsonify({"success": True, "portfolios": portfolios}), 200
+    """
+    One page of the saved-portfolio catalog with summaries (lots, tickers, dates, value, return).
+    Query: q (name substring / ticker prefix), ticker, sort (see catalog.SORT_FIELDS), order, limit, offset.
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", CATALOG_DEFAULT_LIMIT)), CATALOG_MAX_LIMIT))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"success": False, "error": "Invalid paging parameters."}), 400
+    sort = request.args.get("sort", "name")
+    if sort not in CATALOG_SORT_FIELDS:
+        return jsonify({"success": False, "error": f"Unknown sort field: {sort}"}), 400
+    descending = request.args.get("order", "asc").lower() == "desc"
+
+    try:
+        items, total = catalog.search(request.args.get("q", ""), request.args.get("ticker", ""),
+                                      sort=sort, descending=descending, offset=offset, limit=limit)
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to list saved portfolios: {e}"}), 500
+    return jsonify({
+        "success": True,
+        "portfolios": [item["name"] for item in items],
+        "items": items,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+    }), 200
+
+
+@app.route('/saved-portfolios', methods=['POST'])
+def save_portfolio():
+    """Save this session's current portfolio to the catalog (optionally under a new name)."""
+    data = request.json or {}
+    try:
+        portfolio = _current_portfolio()
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+
+    safe_name = _slugify_name((data.get("name") or portfolio.name).strip())
+    if not safe_name:
+        return jsonify({"success": False, "error": "Invalid portfolio name."}), 400
+
+    overwrite = bool(data.get("overwrite"))
+    if not overwrite and catalog.exists(safe_name):
+        return jsonify({"success": False, "exists": True,
+                        "error": f"A saved portfolio named '{safe_name}' already exists."}), 409
+
+    try:
+        entry = catalog.save(safe_name, portfolio.rows, overwrite=overwrite)
+        if safe_name != portfolio.name:
+            # The session now holds the saved copy, so later refreshes update its summary
+            session_store.set(g.session_id, safe_name, portfolio.rows)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to save portfolio: {e}"}), 500
+    return jsonify({"success": True, "message": "Portfolio saved.", "portfolio": entry}), 201
+
+
+@app.route('/saved-portfolios/<name>', methods=['DELETE'])
+def delete_saved_portfolio(name):
+    safe_name = _slugify_name(name)
+    if not safe_name:
+        return jsonify({"success": False, "error": "Invalid portfolio name."}), 400
+    try:
+        catalog.delete(safe_name)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to delete portfolio: {e}"}), 500
+    return jsonify({"success": True, "message": "Portfolio deleted."}), 200
 
 
 @app.route('/select-portfolio', methods=['POST'])
@@ -148,78 +462,26 @@ def select_portfolio():
     if not safe_name:
         return jsonify({"success": False, "error": "Invalid portfolio name."}), 400
 
-    saved_dir = BACKEND_DIR / "saved_portfolios"
-    source_file = saved_dir / f"{safe_name}.csv"
-    if not source_file.exists():
-        return jsonify({"success": False, "error": "Portfolio not found."}), 404
-
-    dest_dir = BACKEND_DIR / "current_portfolio"
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    for item in dest_dir.iterdir():
-        if item.is_file():
-            item.unlink()
-
-    dest_path = dest_dir / source_file.name
     try:
-        shutil.copy2(source_file, dest_path)
-        update_current_portfolio_data()
-        run_portfolio_analysis()
+        rows = catalog.read_rows(safe_name)
+        portfolio = session_store.set(g.session_id, safe_name, rows)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to load portfolio: {e}"}), 500
 
-    return jsonify({"success": True, "message": "Portfolio loaded.", "path": str(dest_path)}), 200
+    job = _enqueue_refresh(portfolio)
+    return jsonify({"success": True, "message": "Portfolio loaded.", "name": portfolio.name,
+                    "job_id": job.id}), 202
 
 
 # =========================================================
 # 🟠 portfolio.html routes: data display, edit, download 🟠
 # =========================================================
 
-def _load_current_portfolio() -> Dict:
-    current_dir = BACKEND_DIR / "current_portfolio"
-    if not current_dir.exists():
-        raise FileNotFoundError("No current portfolio found.")
-
-    csv_files = list(current_dir.glob("*.csv"))
-    if not csv_files:
-        raise FileNotFoundError("No current portfolio found.")
-
-    csv_path = csv_files[0]
-    with csv_path.open(newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-
-    if not rows:
-        raise ValueError("Portfolio file is empty.")
-
-    header = rows[0]
-    data_rows = rows[1:]
-    return {"columns": header, "rows": data_rows}
-
-
-def _current_csv_path() -> Path:
-    current_dir = BACKEND_DIR / "current_portfolio"
-    current_dir.mkdir(parents=True, exist_ok=True)
-    csv_files = list(current_dir.glob("*.csv"))
-    if csv_files:
-        return csv_files[0]
-    return current_dir / "current_portfolio.csv"
-
-
-def _load_stock_df(ticker: str, cache: dict) -> pd.DataFrame:
-    if ticker in cache:
-        return cache[ticker]
-    path = BACKEND_DIR / "stock_data" / f"{ticker}.csv"
-    if not path.exists():
-        cache[ticker] = pd.DataFrame()
-        return cache[ticker]
-    try:
-        df = pd.read_csv(path, parse_dates=["Date"])
-        df = df.sort_values("Date").reset_index(drop=True)
-        cache[ticker] = df
-        return df
-    except Exception:
-        cache[ticker] = pd.DataFrame()
-        return cache[ticker]
+def _load_stock_df(ticker: str) -> pd.DataFrame:
+    # Shared process-wide cache; invalidated when stock_data is rewritten
+    return price_cache.get_df(ticker)
 
 
 def _validate_rows(rows: list) -> list:
@@ -245,96 +507,188 @@ def _validate_rows(rows: list) -> list:
         except Exception:
             raise ValueError(f"Row {idx}: Date must be YYYY-MM-DD and not in the future.")
         validated.append([asset.upper(), str(qty_int), date_str])
+
+    # Registry lookups only (no remote calls): reject symbols already known not to exist
+    rejected = set(ticker_registry.rejected(row[0] for row in validated))
+    for idx, row in enumerate(validated, start=1):
+        if row[0] in rejected:
+            raise ValueError(f"Row {idx}: Ticker '{row[0]}' could not be found on the market.")
     return validated
 
 
+TABLE_COLUMNS = ["Asset", "Qty", "Acquired", "$/Share", "$/Share tdy", "Cost", "Value", "Return", "Return %"]
+
+
+def _money(x: float) -> str:
+    return f"${x:,.2f}"
+
+
+def _format_lot_rows(lots: Lots, valuation: Dict) -> List[list]:
+    # Formatting only happens here, after the array math in backend.valuation
+    formatted = []
+    for i, row in enumerate(lots.rows):
+        if valuation["valued"][i]:
+            formatted.append(row + [
+                _money(valuation["entry"][i]),
+                _money(valuation["current"][i]),
+                _money(valuation["cost"][i]),
+                _money(valuation["value"][i]),
+                _money(valuation["ret"][i]),
+                f"{valuation['pct'][i] * 100:+.2f}%",
+            ])
+        else:
+            formatted.append(row + ["N/A"] * 6)
+    return formatted
+
+
+def _format_net_row(totals: Dict) -> list:
+    return [
+        "Net Total",
+        str(totals["qty"]) if totals["qty"] else "0",
+        "N/A",
+        _money(totals["avg_price"]) if totals["count"] else "N/A",
+        _money(totals["avg_price_today"]) if totals["count"] else "N/A",
+        _money(totals["cost"]),
+        _money(totals["value"]),
+        _money(totals["ret"]),
+        f"{totals['pct']:+.2f}%"
+    ]
+
+
 def _enrich_rows(rows: list) -> Dict:
-    stock_cache = {}
-    enriched = []
-    cost_sum = 0.0
-    value_sum = 0.0
-    qty_sum = 0
-    price_accum = 0.0
-    price_count = 0
-    price_today_accum = 0.0
-    price_today_count = 0
-    for row in rows:
-        if len(row) < 3:
-            continue
-        ticker = row[0].strip().upper()
-        qty_str = row[1]
-        date_str = row[2]
-        cost_str = "N/A"
-        price_str = "N/A"
-        price_today_str = "N/A"
-        value_str = "N/A"
-        ret_str = "N/A"
-        pct_str = "N/A"
-        try:
-            qty = int(qty_str)
-            df = _load_stock_df(ticker, stock_cache)
-            if not df.empty and "Adj Close" in df:
-                acquired_dt = pd.to_datetime(date_str, errors="coerce")
-                if pd.isna(acquired_dt):
-                    raise ValueError("bad date")
-                entry_row = df[df["Date"] >= acquired_dt].head(1)
-                if entry_row.empty:
-                    entry_row = df.tail(1)
-                latest_row = df.tail(1)
-                if not entry_row.empty and not latest_row.empty:
-                    entry_price = float(entry_row["Adj Close"].iloc[0])
-                    current_price = float(latest_row["Adj Close"].iloc[0])
-                    cost = entry_price * qty
-                    value = current_price * qty
-                    ret = (current_price - entry_price) * qty
-                    pct = ((current_price - entry_price) / entry_price) if entry_price != 0 else 0.0
-                    price_str = f"${entry_price:,.2f}"
-                    price_today_str = f"${current_price:,.2f}"
-                    cost_str = f"${cost:,.2f}"
-                    value_str = f"${value:,.2f}"
-                    ret_str = f"${ret:,.2f}"
-                    pct_str = f"{pct*100:+.2f}%"
-                    cost_sum += cost
-                    value_sum += value
-                    qty_sum += qty
-                    price_accum += entry_price
-                    price_count += 1
-                    price_today_accum += current_price
-                    price_today_count += 1
-        except Exception:
-            pass
-        enriched.append(row + [price_str, price_today_str, cost_str, value_str, ret_str, pct_str])
-    if enriched:
-        net_ret = value_sum - cost_sum
-        net_pct = (net_ret / cost_sum * 100) if cost_sum else 0.0
-        avg_price = (price_accum / price_count) if price_count else 0.0
-        avg_price_today = (price_today_accum / price_today_count) if price_today_count else 0.0
-        net_row = [
-            "Net Total",
-            str(qty_sum) if qty_sum else "0",
-            "N/A",
-            f"${avg_price:,.2f}" if price_count else "N/A",
-            f"${avg_price_today:,.2f}" if price_today_count else "N/A",
-            f"${cost_sum:,.2f}",
-            f"${value_sum:,.2f}",
-            f"${net_ret:,.2f}",
-            f"{net_pct:+.2f}%"
-        ]
-        enriched.append(net_row)
+    with metrics.stage("parse"):
+        lots = parse_lots(rows)
+    with metrics.stage("value"):
+        valuation = value_lots(lots)
+    with metrics.stage("format"):
+        enriched = _format_lot_rows(lots, valuation)
+        if enriched:
+            enriched.append(_format_net_row(summarize(lots, valuation)))
     return {
-        "columns": rows and ["Asset", "Qty", "Acquired", "$/Share", "$/Share tdy", "Cost", "Value", "Return", "Return %"] or [],
+        "columns": rows and TABLE_COLUMNS or [],
         "rows": enriched
     }
 
 
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 1000
+EXPORT_CHUNK_ROWS = 1000
+# sort key -> valuation column (None = sortable without valuing anything)
+SORT_FIELDS = {
+    "asset": None,
+    "qty": None,
+    "acquired": None,
+    "price": "entry",
+    "price_today": "current",
+    "cost": "cost",
+    "value": "value",
+    "return": "ret",
+    "return_pct": "pct",
+}
+
+MAX_TABLE_STATES = 64
+
+_table_states: "OrderedDict[tuple, Dict]" = OrderedDict()
+_table_lock = threading.Lock()
+
+
+def _table_state(portfolio, aggregate: bool = False, price_sig: tuple | None = None) -> Dict:
+    """
+    Parsed lots + precomputed net totals for a session's portfolio snapshot, cached
+    until the portfolio is edited or any of its tickers' price files change.
+    aggregate=True merges identical lots (same ticker and acquisition date) first.
+    """
+    file_sig = portfolio.signature
+    lots = portfolio.lots.aggregate() if aggregate else portfolio.lots
+    if price_sig is None:
+        price_sig = _price_signature(portfolio)
+    key = (file_sig, price_sig, aggregate)
+
+    with _table_lock:
+        state = _table_states.get(key)
+        if state is not None:
+            _table_states.move_to_end(key)
+    metrics.cache_lookup("table_state", state is not None)
+    if state is not None:
+        return state
+
+    with metrics.stage("value"):
+        valuation = value_lots(lots)
+        totals = summarize(lots, valuation)
+    state = {
+        "file_sig": file_sig,
+        "lots": lots,
+        "totals": totals,
+        "valuation": None,
+        "orders": {},
+    }
+    with _table_lock:
+        _table_states[key] = state
+        while len(_table_states) > MAX_TABLE_STATES:
+            _table_states.popitem(last=False)
+    return state
+
+
+def _current_table_state(aggregate: bool = False) -> Dict:
+    return _table_state(_current_portfolio(), aggregate)
+
+
+def _aggregate_arg() -> bool:
+    return request.args.get("aggregate", "0").lower() in ("1", "true", "yes")
+
+
+def _sort_order(state: Dict, field: str, descending: bool) -> np.ndarray:
+    key = (field, descending)
+    order = state["orders"].get(key)
+    if order is not None:
+        return order
+
+    lots = state["lots"]
+    if field == "asset":
+        # Ticker ids index the sorted symbol list, so they sort like the symbols
+        order = np.argsort(lots.ticker_id, kind="stable")
+        if descending:
+            order = order[::-1]
+    else:
+        if field == "qty":
+            vals = lots.qty.astype("f8")
+        elif field == "acquired":
+            vals = lots.day.astype("f8")
+            vals[lots.day == NO_DAY] = np.nan
+        else:
+            # Value-based sorts need every lot valued once; kept for later pages
+            if state["valuation"] is None:
+                state["valuation"] = value_lots(lots)
+            vals = state["valuation"][SORT_FIELDS[field]]
+        # NaN (unvalued) rows sort last either way
+        order = np.argsort(-vals if descending else vals, kind="stable")
+    state["orders"][key] = order
+    return order
+
+
+def _encode_cursor(offset: int, sort: str | None, descending: bool, aggregate: bool = False) -> str:
+    raw = json.dumps({"o": offset, "s": sort, "d": descending, "a": aggregate}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return int(data["o"]), data.get("s"), bool(data.get("d")), bool(data.get("a"))
+
+
 @app.route('/current-portfolio/raw', methods=['GET'])
 def current_portfolio_raw():
     try:
-        csv_path = _current_csv_path()
-        if not csv_path.exists():
-            return jsonify({"success": False, "error": "No current portfolio found."}), 404
-        content = csv_path.read_text(encoding='utf-8')
-        return jsonify({"success": True, "text": content, "filename": csv_path.name}), 200
+        portfolio = _current_portfolio()
+        etag, modified = _validators(portfolio)
+        not_modified = _not_modified(etag, modified)
+        if not_modified is not None:
+            return not_modified
+        response = jsonify({"success": True, "text": portfolio.to_csv(), "filename": portfolio.filename})
+        return _with_validators(response, etag, modified), 200
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to load portfolio: {e}"}), 500
 
@@ -347,8 +701,9 @@ def update_portfolio():
         return jsonify({"success": False, "error": "No data provided."}), 400
 
     try:
-        reader = csv.reader(io.StringIO(csv_text))
-        rows = [row for row in reader if any(cell.strip() for cell in row)]
+        with metrics.stage("parse"):
+            reader = csv.reader(io.StringIO(csv_text))
+            rows = [row for row in reader if any(cell.strip() for cell in row)]
     except Exception:
         return jsonify({"success": False, "error": "Could not parse CSV."}), 400
 
@@ -356,79 +711,520 @@ def update_portfolio():
         return jsonify({"success": False, "error": "Portfolio is empty."}), 400
 
     header = [h.strip() for h in rows[0]]
-    expected = ["Asset", "Quantity", "Date Acquired"]
-    if header != expected:
+    if header != PORTFOLIO_HEADER:
         return jsonify({"success": False, "error": "Header must be: Asset,Quantity,Date Acquired"}), 400
 
     try:
-        validated_rows = _validate_rows(rows[1:])
+        with metrics.stage("validate"):
+            validated_rows = _validate_rows(rows[1:])
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
-    csv_path = _current_csv_path()
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
-
+    existing = session_store.get(g.session_id)
     try:
-        with csv_path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(expected)
-            writer.writerows(validated_rows)
-        update_current_portfolio_data()
-        run_portfolio_analysis()
+        with metrics.stage("store"):
+            portfolio = session_store.set(g.session_id, existing.name if existing else "current_portfolio",
+                                          validated_rows)
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to update portfolio: {e}"}), 500
 
-    return jsonify({"success": True, "message": "Portfolio updated."}), 200
+    job = _enqueue_refresh(portfolio)
+    return jsonify({"success": True, "message": "Portfolio updated.", "job_id": job.id}), 202
 
 
 @app.route('/current-portfolio', methods=['GET'])
 def current_portfolio():
+    """
+    One page of the enriched portfolio table.
+    Query: limit, offset | cursor, sort (see SORT_FIELDS), order (asc|desc),
+    aggregate (1 = merge identical lots).
+    """
     try:
-        table = _load_current_portfolio()
+        limit = int(request.args.get("limit", PAGE_DEFAULT_LIMIT))
+        cursor = request.args.get("cursor")
+        if cursor:
+            offset, sort, descending, aggregate = _decode_cursor(cursor)
+        else:
+            offset = int(request.args.get("offset", 0))
+            sort = request.args.get("sort") or None
+            descending = request.args.get("order", "asc").lower() == "desc"
+            aggregate = _aggregate_arg()
+    except Exception:
+        return jsonify({"success": False, "error": "Invalid paging parameters."}), 400
+    if sort is not None and sort not in SORT_FIELDS:
+        return jsonify({"success": False, "error": f"Unknown sort field: {sort}"}), 400
+    limit = max(1, min(limit, PAGE_MAX_LIMIT))
+    offset = max(0, offset)
+
+    try:
+        portfolio = _current_portfolio()
+        # Taken before valuing, so the stream re-sends anything written meanwhile
+        price_seq = price_events.seq
+        price_sig = _price_signature(portfolio)
+        # Unchanged portfolio and prices: answer before any valuation work
+        etag, modified = _validators(portfolio, price_sig)
+        not_modified = _not_modified(etag, modified)
+        if not_modified is not None:
+            return not_modified
+        state = _table_state(portfolio, aggregate, price_sig)
     except FileNotFoundError as e:
         return jsonify({"success": False, "error": str(e)}), 404
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to load portfolio: {e}"}), 500
 
-    enriched = _enrich_rows(table["rows"])
-    rows = enriched["rows"]
-    columns = enriched["columns"]
-    total = len(rows)
-    display_rows = rows if total <= 10 else rows[:5] + rows[-5:]
+    lots = state["lots"]
+    total = len(lots)
+    if sort is None:
+        page_idx = np.arange(offset, min(offset + limit, total))
+    else:
+        page_idx = _sort_order(state, sort, descending)[offset:offset + limit]
 
-    return jsonify({
+    with metrics.stage("format"):
+        page = lots.take(page_idx)
+        rows = _format_lot_rows(page, value_lots(page))
+    next_offset = offset + len(rows)
+
+    response = jsonify({
         "success": True,
-        "columns": columns,
-        "rows": display_rows,
+        "columns": TABLE_COLUMNS if total else [],
+        "rows": rows,
+        "net_total": _format_net_row(state["totals"]) if total else None,
         "total_rows": total,
-        "truncated": total > 10
-    }), 200
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "aggregate": aggregate,
+        # Lot index per row; /current-portfolio/stream updates rows by these
+        "indexes": page_idx.tolist(),
+        # Open /current-portfolio/stream?since= with this to get changes made after these rows
+        "price_seq": price_seq,
+        "next_cursor": _encode_cursor(next_offset, sort, descending, aggregate) if next_offset < total else None
+    })
+    return _with_validators(response, etag, modified), 200
+
+
+@app.route('/current-portfolio/export.ndjson', methods=['GET'])
+def current_portfolio_export():
+    """Stream the full enriched table as NDJSON, valuing one chunk of lots at a time (aggregate=1 merges identical lots)."""
+    try:
+        state = _current_table_state(_aggregate_arg())
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to load portfolio: {e}"}), 500
+
+    def generate():
+        lots = state["lots"]
+        total = len(lots)
+        yield json.dumps({"columns": TABLE_COLUMNS, "total_rows": total}) + "\n"
+        for start in range(0, total, EXPORT_CHUNK_ROWS):
+            chunk = lots.take(np.arange(start, min(start + EXPORT_CHUNK_ROWS, total)))
+            for row in _format_lot_rows(chunk, value_lots(chunk)):
+                yield json.dumps(dict(zip(TABLE_COLUMNS, row))) + "\n"
+        if total:
+            yield json.dumps({"net_total": dict(zip(TABLE_COLUMNS, _format_net_row(state["totals"])))}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+STREAM_KEEPALIVE_SECONDS = 15.0
+# Gather writes that land together (a refresh or tick touches several tickers) into one event
+STREAM_COALESCE_SECONDS = 0.1
+# Streams end after this long; EventSource reconnects on its own
+STREAM_MAX_SECONDS = 600.0
+STREAM_RETRY_MS = 3000
+
+_open_streams = 0
+_streams_lock = threading.Lock()
+metrics.registry.gauge("equiviz_sse_streams", "Open /current-portfolio/stream connections.", lambda: _open_streams)
+
+
+def _sse(event: str, data: Dict, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _stream_since() -> int | None:
+    """
+    Price event seq the client's table reflects: Last-Event-ID on a reconnect, else ?since=
+    (the `price_seq` of the /current-portfolio response it rendered). None if not given.
+    """
+    raw = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        since = int(raw) if raw else None
+    except ValueError:
+        return None
+    if since is not None and since > price_events.seq:
+        # Seq from before a restart: anything written since start may be missing
+        return 0
+    return since
+
+
+def _price_rows_event(live: LiveValuation, idx: np.ndarray, seq: int) -> str:
+    rows = _format_lot_rows(live.lots.take(idx), live.subset(idx))
+    return _sse("prices", {
+        "rows": [{"index": int(i), "row": row} for i, row in zip(idx, rows)],
+        "net_total": _format_net_row(live.totals()),
+    }, event_id=seq)
+
+
+@app.route('/current-portfolio/stream', methods=['GET'])
+def current_portfolio_stream():
+    """
+    Server-Sent Events for the portfolio table (aggregate=1 matches the aggregated table).
+    'prices': only the rows whose valuation changed, keyed by lot index (the table's
+    `indexes`), plus the new net total; sent whenever the price store receives data
+    or a quote changes. Each carries the price event seq as its id. With ?since= (the
+    table's `price_seq`) or Last-Event-ID, the rows of tickers that changed after that
+    seq are sent first, so nothing written before the stream connected is missed.
+    'portfolio': the portfolio itself was edited or replaced; reload the table.
+    """
+    aggregate = _aggregate_arg()
+    sid = g.session_id
+    client_since = _stream_since()
+    try:
+        portfolio = _current_portfolio()
+        # Anything written from here on is picked up by the first wait below
+        since = price_events.seq
+        state = _table_state(portfolio, aggregate)
+        if state["valuation"] is None:
+            state["valuation"] = value_lots(state["lots"])
+        live = LiveValuation(state["lots"], state["valuation"])
+        tickers = live.lots.tickers
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to start stream: {e}"}), 500
+
+    def generate():
+        global _open_streams
+        nonlocal since
+        with _streams_lock:
+            _open_streams += 1
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if client_since is not None and client_since < since:
+                # Changes between the client's table and this stream's baseline
+                _, missed = price_events.wait(client_since, 0)
+                idx = live.members(missed)
+                if len(idx):
+                    yield _price_rows_event(live, idx, since)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                # An open stream keeps its tickers' quotes within the TTL
+                quote_table.refresh_stale(tickers)
+                seq, changed = price_events.wait(since, min(STREAM_KEEPALIVE_SECONDS, quote_table.ttl))
+                if session_store.get(sid) is not portfolio:
+                    yield _sse("portfolio", {"name": portfolio.name})
+                    return
+                if not changed:
+                    yield ": keepalive\n\n"
+                    continue
+                time.sleep(STREAM_COALESCE_SECONDS)
+                since, changed = price_events.wait(since, 0)
+                idx = live.apply(changed)
+                if not len(idx):
+                    continue
+                yield _price_rows_event(live, idx, since)
+        finally:
+            with _streams_lock:
+                _open_streams -= 1
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Keep reverse proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route('/current-portfolio/value-series', methods=['GET'])
+def current_portfolio_value_series():
+    """
+    Daily market value, cost basis and P&L of the current portfolio over the 5-year window.
+    With ?width=, the series is built from weekly or monthly bars when those still fill the
+    width (see chartData.pick_resolution) and LTTB-downsampled (on market value) to about
+    that many points.
+    """
+    try:
+        width = request.args.get('width', '').strip()
+        width = clamp_width(int(width)) if width else None
+    except ValueError:
+        return jsonify({"success": False, "error": "width must be an integer."}), 400
+    resolution = "daily"
+    if width is not None:
+        today = np.datetime64(date.today(), "D")
+        resolution = pick_resolution(window_start(today, DEFAULT_YEARS), today, width)
+    try:
+        state = _current_table_state()
+        series, mode = value_series_cache.get(state["file_sig"], state["lots"], resolution=resolution)
+        data = series.to_dict()
+        if width is not None:
+            idx = lttb([(series.dates.astype("i8"), series.value)], width)[0].tolist()
+            data = {key: [column[i] for i in idx] for key, column in data.items()}
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to build value series: {e}"}), 500
+    return jsonify({"success": True, "mode": mode, "resolution": resolution, **data}), 200
+
+
+@app.route('/current-portfolio/risk', methods=['GET'])
+def current_portfolio_risk():
+    """
+    Volatility, beta, VaR and covariance/correlation of the current portfolio.
+    ?resolution=weekly|monthly takes returns from the price store's bars instead of daily closes.
+    """
+    benchmark = request.args.get('benchmark', DEFAULT_BENCHMARK).strip().upper()
+    method = request.args.get('method', 'sample').lower()
+    resolution = request.args.get('resolution', 'daily').lower()
+    if not valid_ticker(benchmark):
+        return jsonify({"success": False, "error": f"Invalid benchmark symbol '{benchmark}'."}), 400
+    try:
+        confidence = float(request.args.get('confidence', 0.95))
+        horizon = max(1, int(request.args.get('horizon', 1)))
+    except ValueError:
+        return jsonify({"success": False, "error": "confidence and horizon must be numbers."}), 400
+
+    try:
+        state = _current_table_state()
+        tickers, values = holdings_from_lots(state["lots"])
+        risk = portfolio_risk(tickers, values, benchmark=benchmark, confidence=confidence,
+                              horizon_days=horizon, method=method, resolution=resolution)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to compute risk: {e}"}), 500
+    return jsonify({"success": True, **risk}), 200
+
+
+def _optimizer_args() -> Dict:
+    """Query params shared by the optimizer routes; float() raises ValueError on bad input."""
+    cap = request.args.get('cap', '').strip()
+    return {
+        "long_only": request.args.get('long_only', '1').lower() not in ('0', 'false', 'no'),
+        "cap": float(cap) if cap else None,
+        "risk_free": float(request.args.get('rf', 0.0)),
+        "method": request.args.get('method', 'sample').lower(),
+    }
+
+
+@app.route('/current-portfolio/optimize', methods=['GET'])
+def current_portfolio_optimize():
+    """Min-variance / max-Sharpe / target-return weights over the current portfolio's tickers."""
+    objective = request.args.get('objective', 'min_variance').lower()
+    try:
+        args = _optimizer_args()
+        target = request.args.get('target', '').strip()
+        target = float(target) if target else None
+    except ValueError:
+        return jsonify({"success": False, "error": "cap, rf and target must be numbers."}), 400
+
+    try:
+        state = _current_table_state()
+        tickers, values = holdings_from_lots(state["lots"])
+        result = optimize(tickers, objective=objective, target_return=target, **args)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to optimize: {e}"}), 500
+    current = (values / values.sum()).round(6).tolist() if len(values) else []
+    return jsonify({"success": True, "current_weights": current, **result}), 200
+
+
+@app.route('/current-portfolio/frontier', methods=['GET'])
+def current_portfolio_frontier():
+    """Efficient frontier (return/volatility/Sharpe per point) for the current portfolio's tickers."""
+    try:
+        args = _optimizer_args()
+        points = int(request.args.get('points', DEFAULT_FRONTIER_POINTS))
+    except ValueError:
+        return jsonify({"success": False, "error": "cap and rf must be numbers, points an integer."}), 400
+
+    try:
+        state = _current_table_state()
+        tickers, _ = holdings_from_lots(state["lots"])
+        result = efficient_frontier(tickers, points=points, **args)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to build frontier: {e}"}), 500
+    return jsonify({"success": True, **result}), 200
+
+
+@app.route('/current-portfolio/forecast.ndjson', methods=['GET'])
+def current_portfolio_forecast():
+    """Stream Monte Carlo percentile bands of portfolio value as NDJSON, one line per finished chunk."""
+    model = request.args.get('model', 'gbm').lower()
+    try:
+        paths = int(request.args.get('paths', DEFAULT_PATHS))
+        steps = int(request.args.get('steps', DEFAULT_STEPS))
+        seed = request.args.get('seed', '').strip()
+        seed = int(seed) if seed else None
+    except ValueError:
+        return jsonify({"success": False, "error": "paths, steps and seed must be integers."}), 400
+
+    try:
+        state = _current_table_state()
+        tickers, values = holdings_from_lots(state["lots"])
+        stream = simulate_stream(tickers, values, kind=model, paths=paths, steps=steps, seed=seed)
+        # Pull the first chunk here so bad parameters still get a JSON error response
+        first = next(stream)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to run forecast: {e}"}), 500
+
+    def generate():
+        yield json.dumps({"tickers": tickers, **first}) + "\n"
+        for snap in stream:
+            yield json.dumps(snap) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 
 @app.route('/current-portfolio/papie.png')
 def portfolio_papie():
-    papie_path = BACKEND_DIR / "current_portfolio" / "PApie.png"
-    if not papie_path.exists():
+    # Cache lookup by content hash; matplotlib only runs on a miss
+    try:
+        portfolio = _current_portfolio()
+        etag, modified = _validators(portfolio, _price_signature(portfolio))
+        not_modified = _not_modified(etag, modified)
+        if not_modified is not None:
+            return not_modified
+        papie_path = run_portfolio_analysis(portfolio.lots)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to build analysis image: {e}"}), 500
+    if papie_path is None or not papie_path.exists():
         return jsonify({"success": False, "error": "Analysis image not found."}), 404
-    return send_from_directory(papie_path.parent, papie_path.name)
+    metrics.BYTES_READ.inc(papie_path.stat().st_size, store="chart_cache")
+    # Validators come from the portfolio/price versions, not the cached file
+    response = send_from_directory(papie_path.parent, papie_path.name, etag=False, conditional=False)
+    return _with_validators(response, etag, modified)
+
+
+@app.route('/price-cache/stats', methods=['GET'])
+def price_cache_stats():
+    return jsonify({"success": True, "stats": price_cache.stats()}), 200
 
 
 @app.route('/download-current', methods=['GET'])
 def download_current():
     try:
-        current_dir = BACKEND_DIR / "current_portfolio"
-        csv_files = list(current_dir.glob("*.csv"))
-        if not csv_files:
-            return jsonify({"success": False, "error": "No current portfolio found."}), 404
-        csv_path = csv_files[0]
-    except Exception:
-        return jsonify({"success": False, "error": "No current portfolio found."}), 404
+        portfolio = _current_portfolio()
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+
+    etag, modified = _validators(portfolio)
+    not_modified = _not_modified(etag, modified)
+    if not_modified is not None:
+        return not_modified
 
     try:
-        return send_file(csv_path, as_attachment=True, download_name=csv_path.name)
+        data = io.BytesIO(portfolio.to_csv().encode("utf-8"))
+        response = send_file(data, mimetype="text/csv", as_attachment=True, download_name=portfolio.filename,
+                             etag=False, conditional=False)
+        return _with_validators(response, etag, modified)
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to download portfolio: {e}"}), 500
 
 
+# =========================================================
+# 🟢 chart data: JSON series the pages draw themselves 🟢
+# =========================================================
+
+@app.route('/chart-data/prices', methods=['GET'])
+def chart_data_prices():
+    """
+    Adjusted close per ticker (?tickers=A,B) over ?range= (1m, 3m, 6m, 1y, ytd, 3y, 5y, max),
+    LTTB-downsampled to ?width= points. ?resolution= (auto, daily, weekly, monthly) picks
+    the bars read; auto uses weekly/monthly bars when they still fill the width. Each series is
+    {"ticker", "start", "steps", "values", "points", "resolution"}: a start date, days between
+    consecutive points, and prices.
+    """
+    tickers = [t for t in dict.fromkeys(t.strip().upper() for t in request.args.get('tickers', '').split(',')) if t]
+    range_name = request.args.get('range', DEFAULT_RANGE).lower()
+    resolution = request.args.get('resolution', DEFAULT_RESOLUTION).lower()
+    if not tickers:
+        return jsonify({"success": False, "error": "tickers is required."}), 400
+    if len(tickers) > MAX_TICKERS:
+        return jsonify({"success": False, "error": f"At most {MAX_TICKERS} tickers per request."}), 400
+    invalid = [t for t in tickers if not valid_ticker(t)]
+    if invalid:
+        return jsonify({"success": False, "error": f"Invalid ticker symbol(s): {', '.join(invalid)}."}), 400
+    try:
+        width = clamp_width(int(request.args.get('width', DEFAULT_WIDTH)))
+    except ValueError:
+        return jsonify({"success": False, "error": "width must be an integer."}), 400
+    try:
+        sigs = [file_signature(t) for t in tickers]
+        # Not per session, but the range moves with the calendar day
+        etag = hashlib.blake2b(repr((sigs, range_name, width, resolution, date.today())).encode(),
+                               digest_size=8).hexdigest()
+        mtimes = [sig[0] / 1e9 for sig in sigs if sig is not None]
+        modified = max(mtimes, default=0.0)
+        not_modified = _not_modified(etag, modified)
+        if not_modified is not None:
+            return not_modified
+        series = price_series_cache.get_json(tickers, range_name, width, resolution)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to build chart data: {e}"}), 500
+    # The series are cached pre-serialized; splice them in rather than re-encoding
+    body = (f'{{"success":true,"range":{json.dumps(range_name)},"width":{width},'
+            f'"resolution":{json.dumps(resolution)},"series":{series}}}')
+    response = Response(body, mimetype="application/json")
+    return _with_validators(response, etag, modified), 200
+
+
+@app.route('/current-portfolio/chart-data/composition', methods=['GET'])
+def chart_data_composition():
+    """Market value and weight per held ticker (largest first), for the allocation pie."""
+    try:
+        portfolio = _current_portfolio()
+        etag, modified = _validators(portfolio, _price_signature(portfolio))
+        not_modified = _not_modified(etag, modified)
+        if not_modified is not None:
+            return not_modified
+        holdings = sorted(holding_values(portfolio.lots), key=lambda h: h["Value"], reverse=True)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to build composition: {e}"}), 500
+    total = sum(h["Value"] for h in holdings)
+    assets = [{
+        "asset": h["Asset"],
+        "quantity": h["Quantity"],
+        "value": round(h["Value"], 2),
+        "weight": round(h["Value"] / total, 6) if total else 0.0,
+    } for h in holdings]
+    response = jsonify({"success": True, "total": round(total, 2), "assets": assets})
+    return _with_validators(response, etag, modified), 200
+
+
+# Testing aid: random-walk today's quotes of the portfolios in memory (quote table only; stock_data is untouched)
+SIM_TICKS_ENABLED = os.environ.get("EQUIVIZ_SIM_TICKS", "").lower() in ("1", "true", "yes")
+SIM_TICK_SECONDS = float(os.environ.get("EQUIVIZ_SIM_TICK_SECONDS", "1.0"))
+if SIM_TICKS_ENABLED and (__name__ != '__main__' or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+    SimulatedTicks(lambda: session_store.active_tickers(), interval=SIM_TICK_SECONDS).start()
+
+# Optional warm start: preload deferred imports + recently used tickers once the server is up
+WARMUP_ENABLED = os.environ.get("EQUIVIZ_WARMUP", "").lower() in ("1", "true", "yes")
+# With the debug reloader, only the serving child process (WERKZEUG_RUN_MAIN) should warm up
+if WARMUP_ENABLED and (__name__ != '__main__' or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+    start_warmup(session_store.persist_dir)
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,415 @@
+"""
+Index of saved portfolios (backend/saved_portfolios/*.csv) with precomputed summaries.
+Each entry holds the lot count, ticker set, acquisition date range and the last
+computed cost/value/return, so the selector can list, search and sort thousands
+of portfolios without opening a CSV.
+The index lives in memory. On disk it is a snapshot (.catalog.json) plus an
+append-only journal (.catalog.log) of later changes, compacted into the snapshot
+once it grows past the index size, so a save/delete writes one line, not the whole
+index. Save, delete and record_valuation (after a refresh job values a saved
+portfolio) update it in place; CSVs added, replaced or removed outside the app are
+picked up by sync(), which costs one stat of the directory unless it changed.
+"""
+
+import bisect
+import csv
+import io
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from backend.lots import parse_lots
+from backend.sessions import PORTFOLIO_HEADER, read_portfolio_csv
+from backend.valuation import summarize, value_lots
+
+BASE_DIR = Path(__file__).resolve().parent
+SAVED_PORTFOLIOS_DIR = BASE_DIR / "saved_portfolios"
+SNAPSHOT_FILENAME = ".catalog.json"
+JOURNAL_FILENAME = ".catalog.log"
+INDEX_VERSION = 2
+# Compact once the journal has more lines than this or than the index has entries
+JOURNAL_MIN_COMPACT = 256
+
+# sort key -> entry field; None values sort last either way
+SORT_FIELDS = {
+    "name": "name",
+    "lots": "lots",
+    "value": "value",
+    "return": "return",
+    "return_pct": "return_pct",
+    "updated": "updated",
+    "first_date": "first_date",
+    "last_date": "last_date",
+}
+
+_UNVALUED = {"cost": None, "value": None, "return": None, "return_pct": None, "valued_lots": 0, "valued_at": None}
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+
+def _valuation_fields(totals: Dict) -> Dict:
+    if not totals["count"]:
+        # Nothing had price data; a zero value/return would be misleading
+        return dict(_UNVALUED)
+    return {
+        "cost": round(totals["cost"], 2),
+        "value": round(totals["value"], 2),
+        "return": round(totals["ret"], 2),
+        "return_pct": round(totals["pct"], 4),
+        "valued_lots": totals["count"],
+        "valued_at": _now(),
+    }
+
+
+def summarize_rows(name: str, rows: List[list]) -> Dict:
+    """
+    Catalog entry for a portfolio's [Asset, Quantity, Date Acquired] rows, valued at
+    the last stored closes. No quotes are fetched, so indexing stays offline; a refresh
+    job later records quote-based totals (record_valuation).
+    """
+    lots = parse_lots(rows)
+    dates = lots.date[lots.ok]
+    entry = {
+        "name": name,
+        "lots": len(lots),
+        "tickers": lots.tickers,
+        "first_date": str(dates.min()) if len(dates) else None,
+        "last_date": str(dates.max()) if len(dates) else None,
+        "content_hash": lots.content_hash,
+    }
+    try:
+        entry.update(_valuation_fields(summarize(lots, value_lots(lots, stored_only=True))))
+    except Exception:
+        # Unreadable price data; the next refresh of this portfolio fills it in
+        entry.update(_UNVALUED)
+    return entry
+
+
+class _Order:
+    """Names in one sort order, plus a lowercased '\n'-joined copy for substring search."""
+
+    __slots__ = ("names", "rank", "blob", "starts")
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.rank = {n: i for i, n in enumerate(names)}
+        self.blob = "\n".join(names).lower()
+        self.starts = []
+        pos = 0
+        for n in names:
+            self.starts.append(pos)
+            pos += len(n) + 1
+
+    def containing(self, needle: str) -> List[str]:
+        """Names containing `needle`, in order. Cost scales with matches, not with the index."""
+        hits = []
+        pos = self.blob.find(needle)
+        while pos != -1:
+            i = bisect.bisect_right(self.starts, pos) - 1
+            hits.append(self.names[i])
+            # Skip to the next name so each one is reported once
+            nxt = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.blob)
+            pos = self.blob.find(needle, nxt)
+        return hits
+
+
+class Catalog:
+    def __init__(self, directory: Path = SAVED_PORTFOLIOS_DIR):
+        self.directory = directory
+        self._entries: Dict[str, Dict] = {}
+        self._by_ticker: Dict[str, Set[str]] = defaultdict(set)
+        # (sort field, descending) -> _Order; dropped on every change
+        self._orders: Dict[Tuple[str, bool], _Order] = {}
+        self._tickers: List[str] | None = None
+        self._dir_sig: int | None = None
+        self._journal_lines = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # ---- in-memory index ----
+
+    def _put(self, entry: Dict) -> None:
+        self._drop(entry["name"])
+        self._entries[entry["name"]] = entry
+        for ticker in entry["tickers"]:
+            self._by_ticker[ticker].add(entry["name"])
+        self._orders.clear()
+        self._tickers = None
+
+    def _drop(self, name: str) -> None:
+        old = self._entries.pop(name, None)
+        if old is None:
+            return
+        for ticker in old["tickers"]:
+            names = self._by_ticker.get(ticker)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._by_ticker[ticker]
+        self._orders.clear()
+        self._tickers = None
+
+    # ---- persistence ----
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.csv"
+
+    @staticmethod
+    def _file_sig(path: Path) -> List[int] | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _dir_mtime(self) -> int | None:
+        try:
+            return self.directory.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            data = json.loads((self.directory / SNAPSHOT_FILENAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {"version": INDEX_VERSION}
+        if data.get("version") != INDEX_VERSION:
+            # Older index format: rescan everything, and the first write rewrites the snapshot
+            self._journal_lines = sys.maxsize
+            return
+        for entry in data.get("entries", []):
+            self._put(entry)
+        try:
+            lines = (self.directory / JOURNAL_FILENAME).read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return
+        torn = False
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Interrupted append; everything before it still applies
+                torn = True
+                continue
+            if record.get("op") == "put":
+                self._put(record["entry"])
+            elif record.get("op") == "drop":
+                self._drop(record["name"])
+        self._journal_lines = len(lines)
+        if torn:
+            # Appending after a partial line would corrupt the next record too
+            self._compact()
+
+    def _journal(self, record: Dict) -> None:
+        if self._journal_lines >= max(JOURNAL_MIN_COMPACT, len(self._entries)):
+            self._compact()
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / JOURNAL_FILENAME).open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._journal_lines += 1
+
+    def _compact(self) -> None:
+        """Write the whole index as the snapshot and start an empty journal."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / f"{SNAPSHOT_FILENAME}.tmp"
+        payload = {"version": INDEX_VERSION, "entries": list(self._entries.values())}
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.directory / SNAPSHOT_FILENAME)
+        (self.directory / JOURNAL_FILENAME).unlink(missing_ok=True)
+        self._journal_lines = 0
+
+    def _mark_synced(self) -> None:
+        # Our own writes change the directory mtime; don't mistake them for external edits
+        self._dir_sig = self._dir_mtime()
+
+    def sync(self, force: bool = False) -> int:
+        """
+        Reconcile the index with the CSVs on disk. Cheap unless the directory changed
+        (or force=True, which also catches in-place edits). Returns entries (re)built or dropped.
+        """
+        with self._lock:
+            self._load()
+            dir_sig = self._dir_mtime()
+            if dir_sig is None or (not force and dir_sig == self._dir_sig):
+                return 0
+            updates: List[Dict] = []
+            seen = set()
+            for path in self.directory.glob("*.csv"):
+                name = path.stem
+                seen.add(name)
+                sig = self._file_sig(path)
+                entry = self._entries.get(name)
+                if sig is None or (entry is not None and entry.get("sig") == sig):
+                    continue
+                try:
+                    rows = read_portfolio_csv(path.read_text(encoding="utf-8"))
+                except (OSError, UnicodeDecodeError):
+                    continue
+                entry = summarize_rows(name, rows)
+                entry["sig"] = sig
+                entry["updated"] = datetime.utcfromtimestamp(sig[0] / 1e9).isoformat(timespec="seconds") + "Z"
+                updates.append(entry)
+            removed = [n for n in self._entries if n not in seen]
+
+            for entry in updates:
+                self._put(entry)
+            for name in removed:
+                self._drop(name)
+            if len(updates) + len(removed) > JOURNAL_MIN_COMPACT:
+                self._compact()
+            else:
+                for entry in updates:
+                    self._journal({"op": "put", "entry": entry})
+                for name in removed:
+                    self._journal({"op": "drop", "name": name})
+            self._mark_synced()
+            return len(updates) + len(removed)
+
+    # ---- writes ----
+
+    def save(self, name: str, rows: List[list], overwrite: bool = False) -> Dict:
+        """Write `rows` as saved portfolio `name` and index it. ValueError if it exists and not overwrite."""
+        with self._lock:
+            self.sync()
+            path = self._path(name)
+            if path.exists() and not overwrite:
+                raise ValueError(f"A saved portfolio named '{name}' already exists.")
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            writer.writerow(PORTFOLIO_HEADER)
+            writer.writerows(rows)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.directory / f".{name}.csv.tmp"
+            tmp_path.write_text(buf.getvalue(), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+            entry = summarize_rows(name, rows)
+            entry["sig"] = self._file_sig(path)
+            entry["updated"] = _now()
+            self._put(entry)
+            self._journal({"op": "put", "entry": entry})
+            self._mark_synced()
+            return self._public(entry)
+
+    def delete(self, name: str) -> None:
+        """Remove saved portfolio `name`; FileNotFoundError if there is none."""
+        with self._lock:
+            self.sync()
+            path = self._path(name)
+            if name not in self._entries and not path.exists():
+                raise FileNotFoundError("Portfolio not found.")
+            path.unlink(missing_ok=True)
+            self._drop(name)
+            self._journal({"op": "drop", "name": name})
+            self._mark_synced()
+
+    def record_valuation(self, name: str, content_hash: str, totals: Dict) -> bool:
+        """Store freshly computed totals for `name` if its saved rows are the ones that were valued."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            if entry is None or entry.get("content_hash") != content_hash:
+                return False
+            fields = _valuation_fields(totals)
+            if all(entry.get(k) == v for k, v in fields.items() if k != "valued_at"):
+                return False
+            entry = {**entry, **fields}
+            self._put(entry)
+            self._journal({"op": "put", "entry": entry})
+            self._mark_synced()
+            return True
+
+    # ---- reads ----
+
+    def exists(self, name: str) -> bool:
+        return self._path(name).exists()
+
+    def read_rows(self, name: str) -> List[list]:
+        path = self._path(name)
+        if not path.exists():
+            raise FileNotFoundError("Portfolio not found.")
+        return read_portfolio_csv(path.read_text(encoding="utf-8"))
+
+    def get(self, name: str) -> Dict | None:
+        with self._lock:
+            self.sync()
+            entry = self._entries.get(name)
+            return self._public(entry) if entry is not None else None
+
+    def _order(self, field: str, descending: bool) -> _Order:
+        key = (field, descending)
+        cached = self._orders.get(key)
+        if cached is not None:
+            return cached
+        column = SORT_FIELDS[field]
+        if column == "name":
+            names = sorted(self._entries, key=str.lower, reverse=descending)
+        else:
+            present = [n for n, e in self._entries.items() if e.get(column) is not None]
+            missing = sorted((n for n, e in self._entries.items() if e.get(column) is None), key=str.lower)
+            # Names break ties so paging is stable
+            present.sort(key=lambda n: (self._entries[n][column], n.lower()), reverse=descending)
+            names = present + missing
+        cached = self._orders[key] = _Order(names)
+        return cached
+
+    def _tickers_with_prefix(self, prefix: str) -> Set[str]:
+        if self._tickers is None:
+            self._tickers = sorted(self._by_ticker)
+        names: Set[str] = set()
+        i = bisect.bisect_left(self._tickers, prefix)
+        while i < len(self._tickers) and self._tickers[i].startswith(prefix):
+            names |= self._by_ticker[self._tickers[i]]
+            i += 1
+        return names
+
+    def search(self, query: str = "", ticker: str = "", sort: str = "name", descending: bool = False,
+               offset: int = 0, limit: int = 50) -> Tuple[List[Dict], int]:
+        """
+        One page of entries, plus the number of matches.
+        `query` matches a name substring or a ticker prefix (case-insensitive); `ticker` is an exact ticker.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        with self._lock:
+            self.sync()
+            order = self._order(sort, descending)
+            # Saved names are slugs, so a newline can't be part of a real match
+            query = query.strip().lower().replace("\n", "")
+            ticker = ticker.strip().upper()
+            if not query and not ticker:
+                matches = order.names
+            elif query:
+                by_name = order.containing(query)
+                by_ticker = self._tickers_with_prefix(query.upper())
+                matches = sorted(by_ticker.union(by_name), key=order.rank.__getitem__) if by_ticker else by_name
+                if ticker:
+                    allowed = self._by_ticker.get(ticker, set())
+                    matches = [n for n in matches if n in allowed]
+            else:
+                # Few portfolios hold any one ticker: order the hits instead of scanning the index
+                matches = sorted(self._by_ticker.get(ticker, ()), key=order.rank.__getitem__)
+            return [self._public(self._entries[n]) for n in matches[offset:offset + limit]], len(matches)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.sync()
+            return len(self._entries)
+
+    @staticmethod
+    def _public(entry: Dict) -> Dict:
+        return {k: v for k, v in entry.items() if k not in ("sig", "content_hash")}
+
+
+catalog = Catalog()
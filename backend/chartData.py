@@ -0,0 +1,225 @@
+"""
+Chart data for client-side rendering.
+Long series are reduced to about one point per pixel of the requested width
+with Largest-Triangle-Three-Buckets (LTTB), which keeps peaks, troughs and the
+overall shape of the line. lttb() runs its bucket loop once for a whole batch of
+series, so 50 tickers cost about as much as one. Downsampled price series are
+cached per (ticker, range, width, resolution), already serialized, and dropped
+when the ticker's price file changes. Series are encoded compactly: a start date, day
+steps between points, and prices rounded to a few significant digits.
+Long ranges read priceStore's weekly or monthly bars instead of the daily
+history when those still give a point every few pixels ("auto" resolution).
+"""
+
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend import metrics, priceStore
+from backend.priceCache import file_signature
+
+DEFAULT_RANGE = "1y"
+DEFAULT_WIDTH = 600
+MIN_WIDTH = 16
+MAX_WIDTH = 4000
+MAX_TICKERS = 100
+MAX_CACHED_SERIES = 4096
+SIGNIFICANT_DIGITS = 5
+
+# Calendar days back from today; "ytd" and "max" are handled in range_start
+RANGE_DAYS = {"1m": 31, "3m": 92, "6m": 183, "1y": 365, "3y": 1096, "5y": 1827}
+RANGES = (*RANGE_DAYS, "ytd", "max")
+
+DEFAULT_RESOLUTION = "auto"
+RESOLUTIONS = (DEFAULT_RESOLUTION, *priceStore.RESOLUTIONS)
+# "auto" reads bars when they still give at least one point per this many pixels
+AUTO_PIXELS_PER_BAR = 4
+# Trading days per bar of each resolution, and per calendar day
+_BAR_DAYS = (("monthly", 21), ("weekly", 5))
+_TRADING_DAYS_PER_DAY = 252 / 365
+
+
+def range_start(name: str, end: np.datetime64) -> np.datetime64 | None:
+    """First day of range `name` ending at `end`; None for "max"."""
+    if name in RANGE_DAYS:
+        return end - np.timedelta64(RANGE_DAYS[name], "D")
+    if name == "ytd":
+        return end.astype("M8[Y]").astype("M8[D]")
+    if name == "max":
+        return None
+    raise ValueError(f"Unknown range '{name}'; use one of {', '.join(RANGES)}.")
+
+
+def clamp_width(width: int) -> int:
+    return max(MIN_WIDTH, min(MAX_WIDTH, int(width)))
+
+
+def pick_resolution(start: np.datetime64, end: np.datetime64, width: int) -> str:
+    """
+    Coarsest stored resolution with at least one bar per AUTO_PIXELS_PER_BAR pixels of
+    `width` between start and end (e.g. weekly for 5 years at 600 px, monthly for 20).
+    """
+    trading_days = float((end - start).astype("i8")) * _TRADING_DAYS_PER_DAY
+    for resolution, days_per_bar in _BAR_DAYS:
+        if trading_days / days_per_bar * AUTO_PIXELS_PER_BAR >= width:
+            return resolution
+    return "daily"
+
+
+def lttb(series: List[Tuple[np.ndarray, np.ndarray]], threshold: int) -> List[np.ndarray]:
+    """
+    Indexes of the points LTTB keeps for each (x, y) series (x ascending), at most
+    `threshold` per series. Series that are already short enough are kept whole.
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points.")
+    out = [np.arange(len(x)) for x, _ in series]
+    long = [i for i, (x, _) in enumerate(series) if len(x) > threshold]
+    if not long:
+        return out
+
+    # All long series in flat arrays; `base` is each series' offset
+    lengths = np.array([len(series[i][0]) for i in long])
+    base = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    X = np.concatenate([np.asarray(series[i][0], dtype="f8") for i in long])
+    Y = np.concatenate([np.asarray(series[i][1], dtype="f8") for i in long])
+    m = len(long)
+    n_buckets = threshold - 2
+
+    # Bucket b of a series covers local [edges[b], edges[b + 1]); first and last points are kept as-is
+    every = (lengths - 2) / n_buckets
+    edges = (np.floor(np.arange(n_buckets + 1)[None, :] * every[:, None]) + 1).astype(np.intp)
+    edges[:, -1] = lengths - 1
+    sizes = np.diff(edges, axis=1)
+
+    # Average of the following bucket (the last point, for the last bucket)
+    CX = np.concatenate([[0.0], np.cumsum(X)])
+    CY = np.concatenate([[0.0], np.cumsum(Y)])
+    next_start = base[:, None] + edges[:, 1:]
+    next_end = base[:, None] + np.concatenate([edges[:, 2:], lengths[:, None]], axis=1)
+    count = next_end - next_start
+    avg_x = (CX[next_end] - CX[next_start]) / count
+    avg_y = (CY[next_end] - CY[next_start]) / count
+
+    # Candidates per bucket, padded to the widest bucket
+    k = np.arange(sizes.max())
+    valid = k[None, None, :] < sizes[:, :, None]
+    cand = base[:, None, None] + edges[:, :-1, None] + np.where(valid, k[None, None, :], 0)
+    BX, BY = X[cand], Y[cand]
+
+    picked = np.empty((m, threshold), dtype=np.intp)
+    picked[:, 0] = 0
+    picked[:, -1] = lengths - 1
+    rows = np.arange(m)
+    ax, ay = X[base], Y[base]
+    for b in range(n_buckets):
+        # Twice the triangle area between the previous pick, each candidate and the next bucket's average
+        area = np.abs((ax - avg_x[:, b])[:, None] * (BY[:, b] - ay[:, None])
+                      - (ax[:, None] - BX[:, b]) * (avg_y[:, b] - ay)[:, None])
+        area[~valid[:, b]] = -1.0
+        best = area.argmax(axis=1)
+        picked[:, b + 1] = cand[rows, b, best] - base
+        ax, ay = BX[rows, b, best], BY[rows, b, best]
+
+    for j, i in enumerate(long):
+        out[i] = picked[j]
+    return out
+
+
+def round_significant(values: np.ndarray, digits: int = SIGNIFICANT_DIGITS) -> np.ndarray:
+    """Round a series to `digits` significant digits of its largest magnitude."""
+    if not len(values):
+        return values
+    peak = float(np.max(np.abs(values)))
+    decimals = digits - 1 - int(math.floor(math.log10(peak))) if peak > 0 else 0
+    return np.round(values, max(0, decimals))
+
+
+def encode_series(days: np.ndarray, values: np.ndarray) -> Dict:
+    """{"start", "steps", "values"}: steps are days since the previous point (the first is 0)."""
+    if not len(days):
+        return {"start": None, "steps": [], "values": []}
+    days = days.astype("M8[D]")
+    steps = np.diff(days.astype("i8"), prepend=days[:1].astype("i8"))
+    return {
+        "start": str(days[0]),
+        "steps": steps.tolist(),
+        "values": round_significant(values).tolist(),
+    }
+
+
+class PriceSeriesCache:
+    def __init__(self, max_entries: int = MAX_CACHED_SERIES):
+        self.max_entries = max_entries
+        # (ticker, range, width, resolution) -> ((file signature, range start), series JSON)
+        self._entries: "OrderedDict[tuple, Tuple[tuple, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_json(self, tickers: List[str], range_name: str = DEFAULT_RANGE, width: int = DEFAULT_WIDTH,
+                 resolution: str = DEFAULT_RESOLUTION) -> str:
+        """
+        JSON array with the adjusted close of each ticker over `range_name`,
+        LTTB-downsampled to `width` points, as {"ticker", "start", "steps", "values",
+        "points", "resolution"} ("points" is the count of bars read at "resolution",
+        before downsampling). "auto" picks the resolution per ticker from the span
+        and width. Unknown tickers come back empty. Cached series are joined as
+        stored, without re-encoding.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'; use one of {', '.join(RESOLUTIONS)}.")
+        end = np.datetime64(date.today(), "D")
+        start = range_start(range_name, end)
+        width = clamp_width(width)
+        tags = [(file_signature(t), start) for t in tickers]
+
+        out: List[str | None] = [None] * len(tickers)
+        with self._lock:
+            for i, ticker in enumerate(tickers):
+                key = (ticker, range_name, width, resolution)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == tags[i]:
+                    self._entries.move_to_end(key)
+                    out[i] = entry[1]
+        missing = [i for i, series in enumerate(out) if series is None]
+        for i in range(len(tickers)):
+            metrics.cache_lookup("chart_series", out[i] is not None)
+
+        if missing:
+            loaded, used = [], []
+            for i in missing:
+                chosen = resolution
+                if chosen == "auto":
+                    first = start
+                    if first is None:
+                        daily = priceStore.open_records(tickers[i])
+                        first = daily["Date"][0] if len(daily) else end
+                    chosen = pick_resolution(first, end, width)
+                recs = priceStore.open_records(tickers[i], chosen)
+                days = np.asarray(recs["Date"]).astype("M8[D]")
+                adj = np.asarray(recs["Adj Close"], dtype="f8")
+                keep = np.isfinite(adj) if start is None else np.isfinite(adj) & (days >= start)
+                loaded.append((days[keep], adj[keep]))
+                used.append(chosen)
+            picks = lttb([(days.astype("i8"), adj) for days, adj in loaded], width)
+
+            with self._lock:
+                for i, (days, adj), idx, chosen in zip(missing, loaded, picks, used):
+                    series = {"ticker": tickers[i], **encode_series(days[idx], adj[idx]), "points": len(days),
+                              "resolution": chosen}
+                    out[i] = json.dumps(series, separators=(",", ":"))
+                    self._entries[(tickers[i], range_name, width, resolution)] = (tags[i], out[i])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return "[" + ",".join(out) + "]"
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+price_series_cache = PriceSeriesCache()
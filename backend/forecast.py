@@ -0,0 +1,208 @@
+"""
+Monte Carlo forecast of portfolio value for the Forecasts tab.
+Two return models over the current holdings (buy and hold):
+- "gbm": correlated geometric Brownian motion, drift and covariance estimated
+  from the daily log returns in stock_data.
+- "bootstrap": whole historical days resampled with replacement, so the
+  cross-asset correlation and fat tails of the sample are kept.
+Paths are simulated in fixed-size chunks (chunk x assets state per step), so
+memory does not grow with the path count. Chunks run on the shared process pool
+(backend.processPool), each
+with its own child of one SeedSequence, and reduce to per-step histograms of
+log(value / start value). Histograms merge by addition, so percentile bands can
+be streamed after every chunk and the final result does not depend on which
+worker finished first.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from backend import processPool
+from backend.riskAnal import DEFAULT_YEARS, risk_cache
+
+DEFAULT_PATHS = 10_000
+MAX_PATHS = 1_000_000
+DEFAULT_STEPS = 252
+MAX_STEPS = 1260
+CHUNK_PATHS = 10_000
+HIST_BINS = 4096
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class _Model:
+    """Everything a worker needs to simulate a chunk; sent once per worker."""
+
+    def __init__(self, kind: str, weights: np.ndarray, steps: int, returns: np.ndarray):
+        self.kind = kind
+        self.weights = weights.astype("f4")
+        self.steps = steps
+        log_rets = np.log1p(np.clip(returns, -0.999, None))
+        if kind == "gbm":
+            self.drift = log_rets.mean(axis=0).astype("f4")
+            cov = np.cov(log_rets, rowvar=False) if len(log_rets) > 1 else np.zeros((len(weights),) * 2)
+            cov = np.atleast_2d(cov)
+            # Covariance can be singular (short histories, duplicate tickers); use a PSD square root
+            evals, evecs = np.linalg.eigh(cov)
+            self.chol = (evecs * np.sqrt(np.clip(evals, 0.0, None))).astype("f4")
+        else:
+            self.returns = returns.astype("f4")
+
+        # Histogram range in log(value ratio): wide enough that clamping to the edge bins is rare
+        daily_sd = log_rets.std(axis=0).max() if len(log_rets) else 0.0
+        daily_mu = np.abs(log_rets.mean(axis=0)).max() if len(log_rets) else 0.0
+        half = max(8.0 * daily_sd * np.sqrt(steps) + daily_mu * steps, 0.25)
+        self.lo, self.hi = -half, half
+
+    def simulate(self, n_paths: int, seed: np.random.SeedSequence) -> Dict:
+        rng = np.random.default_rng(seed)
+        n_assets = len(self.weights)
+        values = np.empty((n_paths, self.steps), dtype="f4")
+        if self.kind == "gbm":
+            level = np.zeros((n_paths, n_assets), dtype="f4")
+            for step in range(self.steps):
+                shocks = rng.standard_normal((n_paths, n_assets), dtype=np.float32)
+                level += self.drift + shocks @ self.chol.T
+                values[:, step] = np.exp(level) @ self.weights
+        else:
+            growth = np.ones((n_paths, n_assets), dtype="f4")
+            n_days = len(self.returns)
+            for step in range(self.steps):
+                growth *= 1.0 + self.returns[rng.integers(0, n_days, n_paths)]
+                values[:, step] = growth @ self.weights
+
+        log_ratio = np.log(np.clip(values, 1e-12, None))
+        width = (self.hi - self.lo) / HIST_BINS
+        bins = np.clip(((log_ratio - self.lo) / width).astype(np.int64), 0, HIST_BINS - 1)
+        # One bincount over (step, bin) pairs instead of a histogram per step
+        flat = bins + np.arange(self.steps, dtype=np.int64) * HIST_BINS
+        hist = np.bincount(flat.ravel(), minlength=self.steps * HIST_BINS).reshape(self.steps, HIST_BINS)
+        return {"hist": hist, "sum": values.sum(axis=0, dtype="f8"), "paths": n_paths}
+
+
+def _simulate_chunk(shared: processPool.Shared, n_paths: int, seed: np.random.SeedSequence) -> Dict:
+    # Runs in a pool worker; the model is unpickled once per worker
+    return processPool.load(shared).simulate(n_paths, seed)
+
+
+def _percentiles(hist: np.ndarray, lo: float, hi: float, qs=PERCENTILES) -> np.ndarray:
+    """Per-step percentiles of the value ratio from cumulative histograms (linear within a bin)."""
+    width = (hi - lo) / hist.shape[1]
+    cum = np.cumsum(hist, axis=1)
+    total = cum[:, -1:].astype("f8")
+    out = np.empty((len(qs), hist.shape[0]))
+    for k, q in enumerate(qs):
+        need = total * q / 100.0
+        idx = np.minimum((cum < need).sum(axis=1), hist.shape[1] - 1)
+        before = np.where(idx > 0, cum[np.arange(len(idx)), idx - 1], 0)
+        inside = hist[np.arange(len(idx)), idx]
+        frac = np.where(inside > 0, (need[:, 0] - before) / np.maximum(inside, 1), 0.5)
+        out[k] = np.exp(lo + (idx + frac) * width)
+    return out
+
+
+def build_model(
+    tickers: List[str],
+    values: np.ndarray,
+    kind: str = "gbm",
+    steps: int = DEFAULT_STEPS,
+    years: int = DEFAULT_YEARS,
+) -> _Model:
+    if kind not in ("gbm", "bootstrap"):
+        raise ValueError("model must be 'gbm' or 'bootstrap'.")
+    if not tickers:
+        raise ValueError("No priced holdings in portfolio.")
+    if not 1 <= steps <= MAX_STEPS:
+        raise ValueError(f"steps must be between 1 and {MAX_STEPS}.")
+    state, _ = risk_cache.get(list(tickers), years)
+    # Whole days only (the window's first day, and days before a listing, have gaps)
+    returns = state.complete_returns()
+    if len(returns) < 2:
+        raise ValueError("Not enough price history to forecast.")
+    weights = np.asarray(values, dtype="f8") / float(np.sum(values))
+    return _Model(kind, weights, steps, returns)
+
+
+def simulate_stream(
+    tickers: List[str],
+    values: np.ndarray,
+    kind: str = "gbm",
+    paths: int = DEFAULT_PATHS,
+    steps: int = DEFAULT_STEPS,
+    seed: int | None = None,
+    chunk_paths: int = CHUNK_PATHS,
+    max_workers: int | None = None,
+) -> Iterator[Dict]:
+    """
+    Yield a progress snapshot after every finished chunk (percentile bands and
+    mean in dollars per step); the last snapshot has "done": True.
+    """
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS}.")
+    model = build_model(tickers, values, kind=kind, steps=steps)
+    start_value = float(np.sum(values))
+    seed_seq = np.random.SeedSequence(seed)
+
+    sizes = [chunk_paths] * (paths // chunk_paths) + ([paths % chunk_paths] if paths % chunk_paths else [])
+    seeds = seed_seq.spawn(len(sizes))
+    hist = np.zeros((steps, HIST_BINS), dtype=np.int64)
+    total = np.zeros(steps)
+    done_paths = 0
+
+    def snapshot(done: bool) -> Dict:
+        bands = _percentiles(hist, model.lo, model.hi) * start_value
+        terminal_loss = hist[-1, : int((0.0 - model.lo) / (model.hi - model.lo) * HIST_BINS)].sum()
+        return {
+            "done": done,
+            "model": kind,
+            # Entropy can exceed 2^53, so keep it a string for JS clients
+            "seed": str(seed_seq.entropy),
+            "paths": done_paths,
+            "paths_total": paths,
+            "steps": steps,
+            "start_value": round(start_value, 2),
+            "mean": np.round(total / max(done_paths, 1) * start_value, 2).tolist(),
+            "bands": {f"p{q}": np.round(band, 2).tolist() for q, band in zip(PERCENTILES, bands)},
+            "prob_loss": round(float(terminal_loss) / max(done_paths, 1), 6),
+        }
+
+    def merge(result: Dict) -> None:
+        nonlocal done_paths
+        np.add(hist, result["hist"], out=hist)
+        np.add(total, result["sum"], out=total)
+        done_paths += result["paths"]
+
+    workers = max(1, min(max_workers or processPool.MAX_WORKERS, len(sizes)))
+    if workers == 1:
+        for size, child in zip(sizes, seeds):
+            merge(model.simulate(size, child))
+            yield snapshot(done_paths == paths)
+        return
+
+    shared = processPool.Shared(model)
+    # Keep a bounded number of chunks in flight, so finished histograms don't pile up
+    # and a slow streaming client holds at most that much of the shared pool
+    pending = set()
+    queue = list(zip(sizes, seeds))
+    try:
+        while queue or pending:
+            while queue and len(pending) < workers * 2:
+                size, child = queue.pop(0)
+                pending.add(processPool.submit(_simulate_chunk, shared, size, child))
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                merge(future.result())
+            yield snapshot(done_paths == paths)
+    finally:
+        # A client that disconnects mid-stream leaves nothing queued behind it
+        for future in pending:
+            future.cancel()
+
+
+def simulate(tickers: List[str], values: np.ndarray, **kwargs) -> Dict:
+    """Run a forecast to completion and return the final snapshot."""
+    result = None
+    for result in simulate_stream(tickers, values, **kwargs):
+        pass
+    return result
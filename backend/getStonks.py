@@ -1,17 +1,30 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, date
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
 
-import pandas as pd
-import yfinance as yf
+from backend import metrics, priceStore
+from backend.providers import YahooProvider
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent
-CURRENT_PORTFOLIO_DIR = BASE_DIR / "current_portfolio"
-STOCK_DATA_DIR = BASE_DIR / "stock_data"
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 50
 
 # Used YF.py from DataGrabber
 
 def _normalize_df(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     if df is None or df.empty:
         return pd.DataFrame()
     if isinstance(df.columns, pd.MultiIndex):
@@ -22,109 +35,192 @@ def _normalize_df(df: pd.DataFrame) -> pd.DataFrame:
     return df[keep]
 
 
-def _read_existing(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        return pd.DataFrame()
-    try:
-        df = pd.read_csv(path, parse_dates=["Date"])
-        if df.empty:
-            return pd.DataFrame()
-        df = df.sort_values("Date").reset_index(drop=True)
-        return df
-    except Exception:
-        return pd.DataFrame()
-
-
-def _fetch(symbol: str, start: str, end_exclusive: str) -> pd.DataFrame:
-    return yf.download(symbol, start=start, end=end_exclusive, auto_adjust=False, progress=False)
-
-
-def _update_symbol(symbol: str, start_date: datetime.date, end_date: datetime.date) -> bool:
-    STOCK_DATA_DIR.mkdir(parents=True, exist_ok=True)
-    csv_path = STOCK_DATA_DIR / f"{symbol}.csv"
-
-    existing = _read_existing(csv_path)
-    frames = []
-    if not existing.empty:
-        frames.append(existing)
-
-    target_start = start_date
-    target_end = end_date
-    end_excl_str = (target_end + timedelta(days=1)).strftime("%Y-%m-%d")
-
-    if existing.empty or "Date" not in existing:
-        fetched = _normalize_df(_fetch(symbol, target_start.strftime("%Y-%m-%d"), end_excl_str))
-        if fetched.empty:
-            return False
-        frames.append(fetched)
-    else:
-        current_start = existing["Date"].min().date()
-        current_end = existing["Date"].max().date()
-
-        if target_start < current_start:
-            prepend_end_excl = current_start.strftime("%Y-%m-%d")
-            fetched = _normalize_df(_fetch(symbol, target_start.strftime("%Y-%m-%d"), prepend_end_excl))
-            if not fetched.empty:
-                frames.append(fetched)
-
-        if target_end > current_end:
-            append_start = (current_end + timedelta(days=1)).strftime("%Y-%m-%d")
-            fetched = _normalize_df(_fetch(symbol, append_start, end_excl_str))
-            if not fetched.empty:
-                frames.append(fetched)
-
-        if len(frames) == 1:
-            # Existing file already covers requested range
-            return True
-
+_provider = None
+# symbol -> time.time() of its last successful portfolio history sync in this process
+_synced_at: Dict[str, float] = {}
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = YahooProvider()
+    return _provider
+
+
+def set_provider(provider) -> None:
+    """Swap the market data source (e.g. FakeProvider for tests and benchmarks)."""
+    global _provider
+    _provider = provider
+
+
+def _market_holidays(first_year: int, last_year: int) -> np.ndarray:
+    """
+    NYSE fixed-date full closures (New Year's Day, Juneteenth from 2022, Independence
+    Day, Christmas) as observed: Saturday moves to Friday and Sunday to Monday, except
+    that a Saturday New Year's Day is not observed. Floating holidays are not included.
+    """
+    days = []
+    for year in range(first_year, last_year + 1):
+        fixed = [(1, 1), (7, 4), (12, 25)] + ([(6, 19)] if year >= 2022 else [])
+        for month, day in fixed:
+            holiday = date(year, month, day)
+            if holiday.weekday() == 5:
+                if (month, day) == (1, 1):
+                    continue
+                holiday -= timedelta(days=1)
+            elif holiday.weekday() == 6:
+                holiday += timedelta(days=1)
+            days.append(holiday)
+    return np.array(sorted(days), dtype="M8[D]")
+
+
+def _trading_days(start: date, end_exclusive: date) -> int:
+    return int(np.busday_count(start, end_exclusive,
+                               holidays=_market_holidays(start.year, end_exclusive.year)))
+
+
+def _plan_windows(symbol: str, start_date: date, end_date: date) -> List[Tuple[str, str]]:
+    """Date windows (start, end_exclusive) that still need fetching for `symbol`."""
+    end_excl_str = (end_date + timedelta(days=1)).strftime("%Y-%m-%d")
+    bounds = priceStore.date_range(symbol)
+    if bounds is None:
+        return [(start_date.strftime("%Y-%m-%d"), end_excl_str)]
+
+    current_start, current_end = bounds
+    windows = []
+    # Skip gaps without a single trading day (e.g. Jan 1 -> first trading day, weekends)
+    if start_date < current_start and _trading_days(start_date, current_start) > 0:
+        windows.append((start_date.strftime("%Y-%m-%d"), current_start.strftime("%Y-%m-%d")))
+    append_start = current_end + timedelta(days=1)
+    if end_date > current_end and _trading_days(append_start, end_date + timedelta(days=1)) > 0:
+        windows.append((append_start.strftime("%Y-%m-%d"), end_excl_str))
+    return windows
+
+
+def _apply_fetched(symbol: str, fetched: List[pd.DataFrame]) -> bool:
+    """
+    Store fetched frames. New days past the stored range are appended in place;
+    prepends and overlap corrections trigger a compaction (full rewrite).
+    Returns True if anything was written.
+    """
+    frames = [f for f in (_normalize_df(df) for df in fetched) if not f.empty]
     if not frames:
         return False
-
-    combined = pd.concat(frames, ignore_index=True)
-    if "Date" in combined.columns:
-        combined["Date"] = pd.to_datetime(combined["Date"])
-        combined = combined.sort_values("Date").drop_duplicates(subset=["Date"], keep="last")
-
-    combined.to_csv(csv_path, index=False, float_format="%.10f")
-    return True
-
-
-def _extract_tickers() -> List[str]:
-    csv_files = list(CURRENT_PORTFOLIO_DIR.glob("*.csv"))
-    if not csv_files:
-        raise FileNotFoundError("No current portfolio found.")
-    df = pd.read_csv(csv_files[0])
-    if "Asset" not in df.columns:
-        raise ValueError("Portfolio is missing required 'Asset' column.")
-    tickers = (
-        df["Asset"]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .str.upper()
-        .unique()
-        .tolist()
-    )
-    tickers = [t for t in tickers if t]
+    if len(frames) == 1:
+        combined = frames[0]
+    else:
+        import pandas as pd
+        combined = pd.concat(frames, ignore_index=True)
+    return priceStore.merge_df(symbol, combined) != "none"
+
+
+def refresh_symbols(
+    symbols: List[str],
+    start_date: date,
+    end_date: date,
+    provider=None,
+    max_workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Dict]:
+    """
+    Bring stored histories for `symbols` up to [start_date, end_date].
+    Symbols missing the same window are fetched together in one multi-symbol
+    download, and batches run on a bounded thread pool.
+    Returns {symbol: {"status": "updated"|"up_to_date"|"partial"|"failed", "rows": int, "error": str|None}}.
+    "partial" means some windows were stored but another one's download failed (see "error").
+    """
+    provider = provider or get_provider()
+    symbols = list(dict.fromkeys(symbols))
+    outcomes = {s: {"status": "up_to_date", "rows": 0, "error": None} for s in symbols}
+
+    groups: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    needs_fetch = set()
+    with metrics.stage("plan"):
+        for symbol in symbols:
+            windows = _plan_windows(symbol, start_date, end_date)
+            for window in windows:
+                groups[window].append(symbol)
+            if windows:
+                needs_fetch.add(symbol)
+
+    tasks = []
+    for (start, end_excl), members in groups.items():
+        for i in range(0, len(members), batch_size):
+            tasks.append((members[i:i + batch_size], start, end_excl))
+
+    fetched: Dict[str, List[pd.DataFrame]] = defaultdict(list)
+    errors: Dict[str, str] = {}
+    if tasks:
+        # Timed here rather than per batch: stage breakdowns belong to the calling thread
+        with metrics.stage("fetch"), ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+            futures = {pool.submit(provider.download, batch, start, end_excl): batch for batch, start, end_excl in tasks}
+            for future in as_completed(futures):
+                batch = futures[future]
+                metrics.FETCHED_SYMBOLS.inc(len(batch))
+                try:
+                    result = future.result()
+                except Exception as e:
+                    metrics.FETCHES.inc(outcome="error")
+                    for symbol in batch:
+                        errors[symbol] = str(e)
+                    continue
+                metrics.FETCHES.inc(outcome="ok")
+                for symbol in batch:
+                    df = result.get(symbol)
+                    if df is not None and not df.empty:
+                        fetched[symbol].append(df)
+
+    for symbol in needs_fetch:
+        try:
+            with metrics.stage("write"):
+                wrote = _apply_fetched(symbol, fetched.get(symbol, []))
+        except Exception as e:
+            outcomes[symbol] = {"status": "failed", "rows": 0, "error": str(e)}
+            continue
+        rows = sum(len(df) for df in fetched.get(symbol, []))
+        if wrote and symbol in errors:
+            outcomes[symbol] = {"status": "partial", "rows": rows, "error": errors[symbol]}
+        elif wrote:
+            outcomes[symbol] = {"status": "updated", "rows": rows, "error": None}
+        elif priceStore.date_range(symbol) is None:
+            outcomes[symbol] = {"status": "failed", "rows": 0, "error": errors.get(symbol) or "No data returned."}
+        elif symbol in errors:
+            outcomes[symbol] = {"status": "failed", "rows": 0, "error": errors[symbol]}
+    return outcomes
+
+
+def _update_symbol(symbol: str, start_date: datetime.date, end_date: datetime.date, provider=None) -> bool:
+    outcome = refresh_symbols([symbol], start_date, end_date, provider=provider, max_workers=1)[symbol]
+    return outcome["status"] in ("updated", "up_to_date")
+
+
+def update_current_portfolio_data(
+    tickers: List[str], years: int = 5, provider=None, max_workers: int = DEFAULT_WORKERS,
+    max_age: float = 0.0,
+) -> Dict[str, Dict]:
+    """
+    Refresh stock_data for every ticker in a portfolio (e.g. sessions.Portfolio.tickers, from its parsed Lots).
+    Returns per-ticker outcomes (see refresh_symbols) instead of raising on partial failure.
+    Tickers synced within the last `max_age` seconds are reported up_to_date without
+    planning a fetch; their latest price comes from the quote table (backend.quotes) meanwhile.
+    """
+    tickers = [t for t in dict.fromkeys(str(t).strip().upper() for t in tickers) if t]
     if not tickers:
         raise ValueError("No tickers found in portfolio.")
-    return tickers
-
-
-def update_current_portfolio_data(years: int = 5) -> List[str]:
-    tickers = _extract_tickers()
+    now = time.time()
+    recent = {t for t in tickers if now - _synced_at.get(t, float("-inf")) < max_age}
+    outcomes = {t: {"status": "up_to_date", "rows": 0, "error": None} for t in recent}
+    tickers = [t for t in tickers if t not in recent]
+    if not tickers:
+        return outcomes
     end_date = datetime.utcnow().date()
     # Anchor to Jan 1 of (current_year - years) so the first row aligns with the first trading day of that January.
     start_year = end_date.year - years
     start_date = date(start_year, 1, 1)
-
-    failures = []
-    for symbol in tickers:
-        ok = _update_symbol(symbol, start_date, end_date)
-        if not ok:
-            failures.append(symbol)
-
-    if failures:
-        raise RuntimeError(f"Failed to update data for: {', '.join(failures)}")
-
-    return tickers
+    synced = refresh_symbols(tickers, start_date, end_date, provider=provider, max_workers=max_workers)
+    for symbol, outcome in synced.items():
+        # A partial sync is retried on the next change rather than after max_age
+        if outcome["status"] in ("updated", "up_to_date"):
+            _synced_at[symbol] = now
+    outcomes.update(synced)
+    return outcomes
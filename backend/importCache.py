@@ -0,0 +1,133 @@
+"""
+Offline bulk importer for the bundled cache/ datasets.
+Reads the CRSP-style per-ticker files (cache/<TICKER>_5yr_history.csv:
+date,ticker,permno,prc,vol,ret) and the wide cache/13_stocks_5yrs.csv
+(MM/DD/YYYY dates, "$278.03 " prices) in chunks, de-duplicates them with
+vectorized operations and writes the reconciled histories into the price store
+that getStonks and app._load_stock_df read.
+
+Reconciliation per ticker, over the union of both date sets:
+- Close: the wide file's (split-adjusted) close, falling back to |prc|.
+- Adj Close: daily total returns (CRSP `ret`, else close-to-close from the wide
+  file) chained and anchored so the last Adj Close equals the last Close.
+- Volume: CRSP `vol`. Open/High/Low are not in either source and stay NaN.
+"""
+
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from backend import priceStore
+
+BASE_DIR = Path(__file__).resolve().parent
+CACHE_DATA_DIR = BASE_DIR.parent / "cache"
+CHUNK_ROWS = 100_000
+
+
+def _read_crsp(path: Path, chunksize: int = CHUNK_ROWS) -> Dict[str, pd.DataFrame]:
+    parts = defaultdict(list)
+    reader = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        usecols=["date", "ticker", "prc", "vol", "ret"],
+        dtype={"date": str, "ticker": str},
+    )
+    for chunk in reader:
+        chunk = chunk.drop_duplicates()
+        chunk["ticker"] = chunk["ticker"].str.strip().str.upper()
+        for ticker, group in chunk.groupby("ticker", sort=False):
+            parts[ticker].append(group)
+
+    out = {}
+    for ticker, groups in parts.items():
+        df = pd.concat(groups, ignore_index=True)
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+        # CRSP marks missing prices/returns with letter codes; treat those as NaN
+        for col in ("prc", "vol", "ret"):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        df = df.dropna(subset=["date"]).drop_duplicates(subset=["date"], keep="last")
+        out[ticker] = df.set_index("date").sort_index()[["prc", "vol", "ret"]]
+    return out
+
+
+def _read_wide(path: Path, chunksize: int = CHUNK_ROWS) -> Dict[str, pd.Series]:
+    frames = []
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str):
+        dates = pd.to_datetime(chunk["Date"].str.strip(), format="%m/%d/%Y", errors="coerce")
+        prices = chunk.drop(columns=["Date"])
+        prices = prices.apply(lambda col: pd.to_numeric(col.str.replace(r"[$,\s]", "", regex=True), errors="coerce"))
+        prices.index = dates
+        frames.append(prices[prices.index.notna()])
+    if not frames:
+        return {}
+    wide = pd.concat(frames)
+    wide = wide[~wide.index.duplicated(keep="last")].sort_index()
+    wide.columns = [c.strip().upper() for c in wide.columns]
+    return {ticker: wide[ticker].dropna() for ticker in wide.columns}
+
+
+def _reconcile(crsp: pd.DataFrame | None, wide: pd.Series | None) -> pd.DataFrame:
+    index = pd.DatetimeIndex([])
+    if crsp is not None:
+        index = index.union(crsp.index)
+    if wide is not None:
+        index = index.union(wide.index)
+    if len(index) == 0:
+        return pd.DataFrame()
+
+    crsp = crsp.reindex(index) if crsp is not None else pd.DataFrame(index=index, columns=["prc", "vol", "ret"], dtype="f8")
+    wide = wide.reindex(index) if wide is not None else pd.Series(np.nan, index=index)
+
+    prc = crsp["prc"].abs()
+    close = wide.fillna(prc)
+    ret = crsp["ret"].fillna(wide / wide.shift(1) - 1).fillna(prc / prc.shift(1) - 1).fillna(0.0)
+    growth = np.cumprod(1.0 + ret.to_numpy())
+    adj = growth / growth[-1] * close.to_numpy()[-1]
+
+    return pd.DataFrame({
+        "Date": index,
+        "Open": np.nan,
+        "High": np.nan,
+        "Low": np.nan,
+        "Close": close.to_numpy(),
+        "Adj Close": adj,
+        "Volume": crsp["vol"].to_numpy(dtype="f8"),
+    })
+
+
+def import_cache(cache_dir: Path = CACHE_DATA_DIR, overwrite: bool = False) -> Dict[str, int]:
+    """
+    Seed the price store from cache_dir. Existing stored rows win over imported
+    ones unless overwrite=True. Returns {ticker: rows written}.
+    """
+    cache_dir = Path(cache_dir)
+    crsp = {}
+    for path in sorted(cache_dir.glob("*_5yr_history.csv")):
+        crsp.update(_read_crsp(path))
+    wide = {}
+    for path in sorted(cache_dir.glob("*_stocks_*.csv")):
+        wide.update(_read_wide(path))
+
+    written = {}
+    for ticker in sorted(set(crsp) | set(wide)):
+        df = _reconcile(crsp.get(ticker), wide.get(ticker))
+        if df.empty or not np.isfinite(df["Adj Close"].iloc[-1]):
+            continue
+        recs = priceStore.df_to_records(df)
+        if not overwrite:
+            # Later records win when priceStore de-duplicates, so put stored rows last
+            recs = np.concatenate([recs, np.array(priceStore.open_records(ticker))])
+        priceStore.write_records(ticker, recs)
+        written[ticker] = len(df)
+    return written
+
+
+if __name__ == "__main__":
+    overwrite = "--overwrite" in sys.argv
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    result = import_cache(Path(args[0]) if args else CACHE_DATA_DIR, overwrite=overwrite)
+    print(f"Imported {len(result)} ticker(s) into {priceStore.STOCK_DATA_DIR}")
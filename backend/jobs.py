@@ -0,0 +1,150 @@
+"""
+Background job queue for portfolio refresh/analysis work.
+Jobs run on a small worker pool and are keyed by portfolio: at most one job per
+key runs at a time, and at most one waits behind it. Submitting a newer job for a
+key supersedes the one still waiting, so a burst of edits collapses into one run.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+FINISHED = {DONE, FAILED, SUPERSEDED}
+
+DEFAULT_WORKERS = 2
+MAX_FINISHED_JOBS = 500
+
+
+class Job:
+    def __init__(self, key: str, kind: str, fn: Callable):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.fn = fn
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = "Queued"
+        self.result = None
+        self.error = None
+        self.superseded_by = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done_event = threading.Event()
+
+    def update(self, progress: float, stage: str) -> None:
+        self.progress = max(0.0, min(1.0, progress))
+        self.stage = stage
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "key": self.key,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "superseded_by": self.superseded_by,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="equiviz-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._running: Dict[str, Job] = {}
+        self._pending: Dict[str, Job] = {}
+
+    def submit(self, key: str, fn: Callable, kind: str = "refresh") -> Job:
+        """
+        Queue `fn(job)` for `key`. Returns the new job; a job still waiting for the
+        same key is marked superseded and points at it.
+        """
+        job = Job(key, kind, fn)
+        with self._lock:
+            self._jobs[job.id] = job
+            waiting = self._pending.get(key)
+            if waiting is not None:
+                waiting.superseded_by = job.id
+                self._finish(waiting, SUPERSEDED, stage="Superseded by a newer request")
+            self._pending[key] = job
+            if key not in self._running:
+                self._pool.submit(self._run_next, key)
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Job | None:
+        """
+        Block until the job (or whatever superseded it) finishes, or until timeout.
+        A superseded job is only returned once its successor has been pruned; it is final.
+        """
+        deadline = time.time() + timeout
+        job = self.get(job_id)
+        while job is not None:
+            job.done_event.wait(max(0.0, deadline - time.time()))
+            if job.status != SUPERSEDED or job.superseded_by is None:
+                return job
+            newer = self.get(job.superseded_by)
+            if newer is None or time.time() >= deadline:
+                return newer or job
+            job = newer
+        return None
+
+    def _run_next(self, key: str) -> None:
+        with self._lock:
+            if key in self._running or key not in self._pending:
+                return
+            job = self._pending.pop(key)
+            self._running[key] = job
+            job.status = RUNNING
+            job.stage = "Running"
+            job.started = time.time()
+
+        try:
+            result = job.fn(job)
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, FAILED, stage="Failed")
+        else:
+            with self._lock:
+                job.result = result
+                job.progress = 1.0
+                self._finish(job, DONE, stage="Done")
+
+        with self._lock:
+            self._running.pop(key, None)
+            if key in self._pending:
+                self._pool.submit(self._run_next, key)
+
+    def _finish(self, job: Job, status: str, stage: str) -> None:
+        job.status = status
+        job.stage = stage
+        job.finished = time.time()
+        job.done_event.set()
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in FINISHED]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job.id, None)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,150 @@
+"""
+Incremental revaluation for live portfolio updates.
+LiveValuation holds one valuation of a Lots and, when some tickers' prices
+change, re-values only those tickers' lots. It reports which lots changed and
+keeps the net totals as running sums, so a push to the client costs O(changed
+lots) rather than a full re-enrichment (app.py streams these deltas over SSE).
+SimulatedTicks is a local tick source for testing: it random-walks today's quote
+for a few tickers at a time in the in-memory quote table (backend.quotes), which
+notifies the streams the same way a real quote refresh does. Nothing is written
+to stock_data, so simulated prices never outlive the process or reach the
+history, the weekly/monthly bars or the next history sync.
+"""
+
+import logging
+import math
+import threading
+from datetime import date
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from backend import priceStore
+from backend.lots import Lots
+from backend.quotes import QuoteTable, quote_table
+from backend.valuation import value_lots
+
+logger = logging.getLogger(__name__)
+
+
+class LiveValuation:
+    def __init__(self, lots: Lots, valuation: Dict[str, np.ndarray] | None = None):
+        self.lots = lots
+        base = valuation if valuation is not None else value_lots(lots)
+        self.valuation = {k: np.array(v) for k, v in base.items()}
+
+        order = np.argsort(lots.ticker_id, kind="stable")
+        bounds = np.searchsorted(lots.ticker_id[order], np.arange(len(lots.symbols) + 1))
+        self._members: Dict[str, np.ndarray] = {
+            lots.symbols[code]: order[bounds[code]:bounds[code + 1]]
+            for code in range(len(lots.symbols)) if bounds[code + 1] > bounds[code]
+        }
+        self._sums = self._contribution(np.arange(len(lots)))
+
+    def _contribution(self, idx: np.ndarray) -> np.ndarray:
+        # Sums over the valued lots in idx: count, qty, entry, current, cost, value
+        v = self.valuation
+        idx = idx[v["valued"][idx]]
+        return np.array([
+            len(idx),
+            self.lots.qty[idx].sum(),
+            v["entry"][idx].sum(),
+            v["current"][idx].sum(),
+            v["cost"][idx].sum(),
+            v["value"][idx].sum(),
+        ], dtype="f8")
+
+    def members(self, tickers) -> np.ndarray:
+        """Indexes of the lots of `tickers` (sorted)."""
+        parts = [self._members[t] for t in tickers if t in self._members]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def apply(self, tickers) -> np.ndarray:
+        """Re-value the lots of `tickers`; returns the indexes of lots whose valuation changed."""
+        idx = self.members(tickers)
+        if not len(idx):
+            return idx
+        before = self._contribution(idx)
+        fresh = value_lots(self.lots.take(idx))
+
+        old = self.valuation
+        changed = fresh["valued"] != old["valued"][idx]
+        for key in ("entry", "current"):
+            a, b = fresh[key], old[key][idx]
+            changed |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        for key, column in fresh.items():
+            old[key][idx] = column
+        self._sums += self._contribution(idx) - before
+        return np.sort(idx[changed])
+
+    def subset(self, idx: np.ndarray) -> Dict[str, np.ndarray]:
+        return {k: v[idx] for k, v in self.valuation.items()}
+
+    def totals(self) -> Dict:
+        """Net totals in valuation.summarize's shape, from the running sums."""
+        count, qty, entry, current, cost, value = self._sums
+        count = int(round(count))
+        ret = value - cost
+        return {
+            "count": count,
+            "qty": int(round(qty)),
+            "avg_price": entry / count if count else None,
+            "avg_price_today": current / count if count else None,
+            "cost": cost,
+            "value": value,
+            "ret": ret,
+            "pct": (ret / cost * 100) if cost else 0.0,
+        }
+
+
+class SimulatedTicks:
+    """
+    Test tick source: every `interval` seconds, moves today's quote of up to
+    `per_tick` tickers from tickers_fn() by a random step, starting from the
+    current quote (or the stored close). Quotes live in `quotes` only; the price
+    store is never written.
+    """
+
+    def __init__(self, tickers_fn: Callable[[], List[str]], interval: float = 1.0, per_tick: int = 5,
+                 volatility: float = 0.002, seed: int | None = None, quotes: QuoteTable | None = None):
+        self.tickers_fn = tickers_fn
+        self.interval = interval
+        self.per_tick = per_tick
+        self.volatility = volatility
+        self.quotes = quotes or quote_table
+        self._rng = np.random.default_rng(seed)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def tick(self) -> List[str]:
+        tickers = [t for t in self.tickers_fn() if priceStore.has_history(t)]
+        if not tickers:
+            return []
+        chosen = self._rng.choice(tickers, size=min(self.per_tick, len(tickers)), replace=False).tolist()
+        today = str(date.today())
+        current = self.quotes.prices(chosen)
+        moved = {}
+        for ticker, price in zip(chosen, current.tolist()):
+            if not np.isfinite(price):
+                continue
+            moved[ticker] = (price * math.exp(self._rng.normal(0.0, self.volatility)), today)
+        self.quotes.set_quotes(moved)
+        return list(moved)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Simulated tick failed")
+
+    def start(self) -> "SimulatedTicks":
+        self._thread = threading.Thread(target=self._run, name="simulated-ticks", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+
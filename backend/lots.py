@@ -0,0 +1,191 @@
+"""
+Compact, array-backed portfolio lots.
+A portfolio's (Asset, Quantity, Date Acquired) rows are parsed once into parallel
+columns: a ticker id per lot (index into the sorted `symbols` array), an int64
+quantity and an int32 day ordinal (days since 1970-01-01). Lots are immutable and
+memoized by the rows' content hash, so the session snapshot, the saved-portfolio
+catalog and the chart renderer all share one parse of the same portfolio.
+aggregate() merges lots with the same ticker and acquisition date (e.g. a row
+entered twice) into one lot with the summed quantity.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend import metrics
+
+NO_DAY = np.iinfo(np.int32).min
+MAX_MEMO_ENTRIES = 64
+
+# Quantities both parse paths accept. int() takes exactly these plus digit-group
+# underscores ("1_000"), which the fast path rejects up front.
+_INT_PATTERN = r"\s*[+-]?\d+\s*"
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+class Lots:
+    """Parsed lots; `ok` marks lots whose quantity and date parsed."""
+
+    __slots__ = ("rows", "symbols", "ticker_id", "qty", "day", "ok", "content_hash", "_aggregated")
+
+    def __init__(self, rows: List[list], symbols: np.ndarray, ticker_id: np.ndarray, qty: np.ndarray,
+                 day: np.ndarray, ok: np.ndarray, content_hash: str | None = None):
+        self.rows = rows
+        self.symbols = _frozen(symbols)
+        self.ticker_id = _frozen(ticker_id.astype(np.int32, copy=False))
+        self.qty = _frozen(qty.astype(np.int64, copy=False))
+        self.day = _frozen(day.astype(np.int32, copy=False))
+        self.ok = _frozen(ok.astype(bool, copy=False))
+        self.content_hash = content_hash
+        self._aggregated: Lots | None = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def tickers(self) -> List[str]:
+        """Distinct tickers present, sorted."""
+        return self.symbols[np.unique(self.ticker_id)].tolist()
+
+    @property
+    def ticker(self) -> np.ndarray:
+        """Ticker symbol per lot."""
+        return self.symbols[self.ticker_id]
+
+    @property
+    def date(self) -> np.ndarray:
+        """Acquisition date per lot as datetime64[D] (NaT where it did not parse)."""
+        days = self.day.astype("i8")
+        days[self.day == NO_DAY] = np.iinfo(np.int64).min
+        return days.view("M8[D]")
+
+    def take(self, idx) -> "Lots":
+        """Subset (e.g. one page) in the order given by `idx`; shares `symbols`."""
+        idx = np.asarray(idx, dtype=np.intp)
+        return Lots([self.rows[i] for i in idx], self.symbols, self.ticker_id[idx], self.qty[idx],
+                    self.day[idx], self.ok[idx])
+
+    def aggregate(self) -> "Lots":
+        """
+        One lot per (ticker, acquisition date) with quantities summed, in first-seen
+        order. Lots that did not parse are kept as they are.
+        """
+        if self._aggregated is not None:
+            return self._aggregated
+        ok_idx = np.flatnonzero(self.ok)
+        key = (self.ticker_id[ok_idx].astype(np.int64) << 32) | (self.day[ok_idx].astype(np.int64) & 0xFFFFFFFF)
+        _, first, group = np.unique(key, return_index=True, return_inverse=True)
+        qty = np.zeros(len(first), dtype=np.int64)
+        np.add.at(qty, group, self.qty[ok_idx])
+
+        # Each group sits at its first member's position; bad lots keep theirs
+        heads = ok_idx[first]
+        pos = np.concatenate([heads, np.flatnonzero(~self.ok)])
+        order = np.argsort(pos, kind="stable")
+        pos = pos[order]
+        qty_all = np.concatenate([qty, self.qty[~self.ok]])[order]
+        rows = []
+        for i, q in zip(pos.tolist(), qty_all.tolist()):
+            row = self.rows[i]
+            rows.append([row[0], str(q), *row[2:]] if self.ok[i] and q != self.qty[i] else row)
+        merged = Lots(rows, self.symbols, self.ticker_id[pos], qty_all, self.day[pos], self.ok[pos],
+                      self.content_hash)
+        merged._aggregated = merged
+        self._aggregated = merged
+        return merged
+
+
+def _columns(rows: List[list]) -> Tuple[List[list], List[str], List[str], List[str]]:
+    rows = [row for row in rows if len(row) >= 3]
+    return rows, [str(row[0]) for row in rows], [str(row[1]) for row in rows], [str(row[2]) for row in rows]
+
+
+def _content_hash(*columns: List[str]) -> str:
+    digest = hashlib.sha1()
+    for column in columns:
+        digest.update("\x1f".join(column).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def _factorize(assets: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(sorted symbols, id per asset); a dict pass is far cheaper than np.unique on strings."""
+    first_seen: Dict[str, int] = {}
+    codes = np.fromiter((first_seen.setdefault(a, len(first_seen)) for a in assets), dtype=np.int32,
+                        count=len(assets))
+    symbols = sorted(first_seen)
+    rank = np.empty(len(symbols), dtype=np.int32)
+    rank[[first_seen[sym] for sym in symbols]] = np.arange(len(symbols), dtype=np.int32)
+    return np.array(symbols, dtype=object), rank[codes]
+
+
+def _parse(rows: List[list], assets: List[str], qty_raw: List[str], date_raw: List[str],
+           content_hash: str) -> Lots:
+    n = len(rows)
+    symbols, ticker_id = _factorize([a.strip().upper() for a in assets])
+
+    # Fast path: every cell is a clean integer / ISO date; otherwise parse per column with masks
+    try:
+        if "_" in "".join(qty_raw):
+            raise ValueError("quantity outside _INT_PATTERN")
+        qty = np.fromiter(map(int, qty_raw), dtype=np.int64, count=n)
+        qty_ok = np.ones(n, dtype=bool)
+    except ValueError:
+        import pandas as pd
+        qty_series = pd.Series(qty_raw, dtype=object)
+        qty_ok = qty_series.str.fullmatch(_INT_PATTERN).to_numpy(dtype=bool)
+        qty = np.zeros(n, dtype=np.int64)
+        if qty_ok.any():
+            qty[qty_ok] = qty_series[qty_ok].str.strip().astype(np.int64).to_numpy()
+
+    date_raw = [d.strip() for d in date_raw]
+    try:
+        day = np.array(date_raw, dtype="M8[D]")
+    except ValueError:
+        import pandas as pd
+        dates = pd.to_datetime(pd.Series(date_raw, dtype=object), errors="coerce", format="%Y-%m-%d")
+        fallback = (dates.isna() & pd.Series(date_raw).ne("")).to_numpy()
+        if fallback.any():
+            # Rare non-ISO dates: fall back to pandas' per-element inference
+            dates[fallback] = [pd.to_datetime(d, errors="coerce") for d in np.array(date_raw, dtype=object)[fallback]]
+        day = dates.to_numpy().astype("M8[D]")
+    date_ok = ~np.isnat(day)
+    ordinal = np.where(date_ok, day.astype("i8"), NO_DAY)
+
+    return Lots(rows, symbols, ticker_id, qty, ordinal, qty_ok & date_ok, content_hash)
+
+
+_memo: "OrderedDict[str, Lots]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def parse_lots(rows: List[list]) -> Lots:
+    """
+    Lots for raw (Asset, Quantity, Date Acquired) rows; rows with fewer than 3 cells
+    are dropped. Rows whose first three cells match share one parse, and `content_hash`
+    matches between a saved file and a session loaded from it.
+    """
+    rows, assets, qty_raw, date_raw = _columns(rows)
+    key = _content_hash(assets, qty_raw, date_raw)
+    with _memo_lock:
+        lots = _memo.get(key)
+        if lots is not None:
+            _memo.move_to_end(key)
+    metrics.cache_lookup("lots", lots is not None)
+    if lots is not None:
+        return lots
+
+    lots = _parse(rows, assets, qty_raw, date_raw, key)
+    with _memo_lock:
+        lots = _memo.setdefault(key, lots)
+        while len(_memo) > MAX_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return lots
@@ -0,0 +1,255 @@
+"""
+Lightweight request/stage instrumentation.
+- Counters, gauges and latency histograms rendered in Prometheus text format
+  (served by app.py at /metrics); no client library needed.
+- stage("name") times a block. Inside a request (or any collect() scope) the
+  duration is also appended to that scope's breakdown, which app.py turns into
+  a Server-Timing header and refresh jobs return in their result.
+- SamplingProfiler samples one thread's stack every few milliseconds and keeps
+  the collapsed stacks (flamegraph.pl / speedscope input).
+"""
+
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter as _Tally, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_INTERVAL_SECONDS = 0.005
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str] | None) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge:
+    """Value read from a callback at scrape time (e.g. cache sizes kept elsewhere)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float | Dict[LabelKey, float]]):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        value = self.fn()
+        if isinstance(value, dict):
+            return [(self.name, key, v) for key, v in value.items()]
+        return [(self.name, (), float(value))]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        out = []
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, count in zip(self.buckets, row):
+                    out.append((f"{self.name}_bucket", key + (("le", repr(bound)),), count))
+                out.append((f"{self.name}_bucket", key + (("le", "+Inf"),), row[-2]))
+                out.append((f"{self.name}_count", key, row[-2]))
+                out.append((f"{self.name}_sum", key, row[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str, fn: Callable) -> Gauge:
+        return self._register(Gauge(name, help_text, fn))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram("equiviz_request_seconds", "HTTP request latency by route.")
+STAGE_SECONDS = registry.histogram("equiviz_stage_seconds", "Time spent in instrumented stages.")
+FETCHES = registry.counter("equiviz_provider_fetches_total", "Market data provider calls by outcome.")
+FETCHED_SYMBOLS = registry.counter("equiviz_provider_symbols_total", "Symbols requested from the provider.")
+BYTES_READ = registry.counter("equiviz_bytes_read_total", "Bytes read from disk by store.")
+BYTES_WRITTEN = registry.counter("equiviz_bytes_written_total", "Bytes written to disk by store.")
+CACHE_LOOKUPS = registry.counter("equiviz_cache_lookups_total", "Cache lookups by cache and result (hit/miss).")
+GZIP_BYTES = registry.counter("equiviz_gzip_bytes_total", "JSON response bytes before (in) and after (out) gzip.")
+
+
+# ---- per-request stage breakdown ----
+
+_timings: contextvars.ContextVar[List[Tuple[str, float]] | None] = contextvars.ContextVar("equiviz_timings", default=None)
+
+
+@contextmanager
+def collect() -> Iterator[List[Tuple[str, float]]]:
+    """Collect stage() durations made in this context into the yielded list."""
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def begin_collecting() -> List[Tuple[str, float]]:
+    """Start a fresh breakdown for the current context (one per request; replaces any previous one)."""
+    timings: List[Tuple[str, float]] = []
+    _timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def merge_timings(timings: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Sum repeated stages, keeping first-seen order."""
+    merged: Dict[str, float] = {}
+    for name, elapsed in timings:
+        merged[name] = merged.get(name, 0.0) + elapsed
+    return merged
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    parts = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in merge_timings(timings).items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_rates() -> Dict[LabelKey, float]:
+    tally: Dict[str, _Tally] = defaultdict(_Tally)
+    for _, key, value in CACHE_LOOKUPS.samples():
+        labels = dict(key)
+        tally[labels["cache"]][labels["result"]] += value
+    return {
+        (("cache", cache),): counts["hit"] / (counts["hit"] + counts["miss"])
+        for cache, counts in tally.items() if counts["hit"] + counts["miss"]
+    }
+
+
+registry.gauge("equiviz_cache_hit_ratio", "Hit ratio per cache since start.", cache_hit_rates)
+
+
+# ---- sampling profiler ----
+
+class SamplingProfiler:
+    """Samples `thread_id`'s stack until stop(); collapsed() gives 'frame;frame;frame count' lines."""
+
+    def __init__(self, thread_id: int | None = None, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: _Tally = _Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        # Safe to call more than once
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
@@ -0,0 +1,288 @@
+"""
+Mean-variance optimizer for the Optimization tab.
+Expected returns and the covariance come from riskAnal's cached returns matrix
+(annualized). Every solve is the QP
+
+    min 0.5 w'Σw - t μ'w   s.t.  Σw_i = 1 (, μ'w = r),  lower <= w <= cap
+
+handled by ADMM: the equality-constrained x-step always uses the same
+(Σ + ρI)^-1, so it is factorized once per problem and shared by all solves,
+and the bound constraints are a clip. Efficient-frontier points are split into
+contiguous chunks and solved on the shared process pool (backend.processPool),
+each worker warm-starting from its previous point.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend import processPool
+from backend.riskAnal import DEFAULT_YEARS, TRADING_DAYS, risk_cache
+
+DEFAULT_FRONTIER_POINTS = 50
+MAX_FRONTIER_POINTS = 200
+MAX_ITERATIONS = 5000
+TOLERANCE = 1e-7
+SHARPE_SEARCH_STEPS = 40
+RELAXATION = 1.6
+RHO_UPDATE_EVERY = 25
+
+
+class _Problem:
+    """Factorized (Σ + ρI) plus bounds; picklable so pool workers get one copy each."""
+
+    def __init__(self, mu: np.ndarray, cov: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+        self.mu = mu
+        self.cov = cov
+        self.lower = lower
+        self.upper = upper
+        n = len(mu)
+        # Eigendecomposition once; (Σ + ρI)^-1 for any ρ is then a rescale of the eigenvalues
+        evals, self._evecs = np.linalg.eigh(cov)
+        self._evals = np.clip(evals, 0.0, None)
+        ones = np.ones(n)
+        # Equality rows: budget, and the return target when one is given
+        self._rows = {"budget": ones[None, :], "target": np.vstack([ones, mu])}
+        self._factors = {}
+        self.base_rho = max(float(np.trace(cov)) / max(n, 1), 1e-8)
+
+    def _factor(self, rho: float, kind: str):
+        key = (rho, kind)
+        cached = self._factors.get(key)
+        if cached is None:
+            if len(self._factors) > 16:
+                self._factors.clear()
+            m_inv = (self._evecs / (self._evals + rho)) @ self._evecs.T
+            a = self._rows[kind]
+            ma = m_inv @ a.T
+            cached = (m_inv, a, ma, np.linalg.pinv(a @ ma))
+            self._factors[key] = cached
+        return cached
+
+    def solve(self, risk_aversion_inv: float = 0.0, target: float | None = None,
+              warm: Tuple | None = None) -> Tuple[np.ndarray, Tuple, int]:
+        """
+        ADMM for min 0.5 w'Σw - risk_aversion_inv * μ'w under the equality rows
+        (budget, plus μ'w = target when given) and the box bounds.
+        """
+        kind = "budget" if target is None else "target"
+        b = np.array([1.0]) if target is None else np.array([1.0, target])
+        n = len(self.mu)
+        if warm is None:
+            z = np.clip(np.full(n, 1.0 / n), self.lower, self.upper)
+            u = np.zeros(n)
+            rho = self.base_rho
+        else:
+            z, u, rho = warm[0].copy(), warm[1].copy(), warm[2]
+        m_inv, a, ma, s_inv = self._factor(rho, kind)
+        q = -risk_aversion_inv * self.mu
+
+        for it in range(1, MAX_ITERATIONS + 1):
+            x0 = m_inv @ (rho * (z - u) - q)
+            x = x0 - ma @ (s_inv @ (a @ x0 - b))
+            # Over-relaxation speeds up convergence on the degenerate high-return end
+            x_hat = RELAXATION * x + (1.0 - RELAXATION) * z
+            z_prev = z
+            z = np.clip(x_hat + u, self.lower, self.upper)
+            u = u + x_hat - z
+            primal = np.linalg.norm(x - z, np.inf)
+            dual = rho * np.linalg.norm(z - z_prev, np.inf)
+            if primal < TOLERANCE and dual < TOLERANCE:
+                break
+            if it % RHO_UPDATE_EVERY == 0 and primal > 0 and dual > 0:
+                # Rebalance ρ so the primal and dual residuals shrink at similar rates
+                scale = np.sqrt(primal / dual)
+                if scale > 5.0 or scale < 0.2:
+                    new_rho = float(np.clip(rho * scale, self.base_rho * 1e-4, self.base_rho * 1e4))
+                    u = u * rho / new_rho
+                    rho = new_rho
+                    m_inv, a, ma, s_inv = self._factor(rho, kind)
+        return z, (z, u, rho), it
+
+
+def _max_return_weights(mu: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray | None:
+    """Weights with the highest μ'w, Σw = 1 inside the box (None if unbounded): fill the best assets first."""
+    if not np.all(np.isfinite(lower)) or not np.all(np.isfinite(upper)):
+        return None
+    w = lower.copy()
+    left = 1.0 - w.sum()
+    for i in np.argsort(-mu):
+        step = min(upper[i] - w[i], left)
+        w[i] += step
+        left -= step
+        if left <= 0:
+            break
+    return w
+
+
+def _max_return(mu: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> float:
+    w = _max_return_weights(mu, lower, upper)
+    return float(mu.max()) if w is None else float(mu @ w)
+
+
+def _stats(problem: _Problem, w: np.ndarray, risk_free: float) -> Dict:
+    ret = float(problem.mu @ w)
+    vol = float(np.sqrt(max(w @ problem.cov @ w, 0.0)))
+    return {
+        "return": round(ret, 6),
+        "volatility": round(vol, 6),
+        "sharpe": round((ret - risk_free) / vol, 6) if vol > 0 else None,
+    }
+
+
+def _solve_shared(targets: List[float], shared: processPool.Shared) -> List[np.ndarray]:
+    # Runs in a pool worker; the factorized problem is unpickled once per worker
+    return _solve_chunk(targets, processPool.load(shared))
+
+
+def _solve_chunk(targets: List[float], problem: _Problem) -> List[np.ndarray]:
+    out, warm = [], None
+    top = _max_return_weights(problem.mu, problem.lower, problem.upper)
+    for target in targets:
+        if top is not None and target >= problem.mu @ top - 1e-12:
+            # The highest-return point is a vertex of the box; ADMM crawls there, the greedy fill is exact
+            out.append(top)
+            continue
+        w, warm, _ = problem.solve(target=target, warm=warm)
+        out.append(w)
+    return out
+
+
+def build_problem(
+    tickers: List[str],
+    long_only: bool = True,
+    cap: float | None = None,
+    method: str = "sample",
+    years: int = DEFAULT_YEARS,
+) -> _Problem:
+    if not tickers:
+        raise ValueError("No priced holdings in portfolio.")
+    if method not in ("sample", "ewma"):
+        raise ValueError("method must be 'sample' or 'ewma'.")
+    n = len(tickers)
+    if cap is not None and (cap <= 0 or cap > 1):
+        raise ValueError("cap must be in (0, 1].")
+    if cap is not None and cap * n < 1 - 1e-12:
+        raise ValueError(f"cap {cap} is infeasible for {n} assets (needs at least {1 / n:.4f}).")
+
+    state, _ = risk_cache.get(list(tickers), years)
+    if state.count < 2:
+        raise ValueError("Not enough price history to optimize.")
+    mu = state.mean() * TRADING_DAYS
+    cov = state.covariance(method) * TRADING_DAYS
+    upper = np.full(n, np.inf if cap is None else cap)
+    if long_only:
+        lower = np.zeros(n)
+    else:
+        lower = np.full(n, -np.inf if cap is None else -cap)
+    return _Problem(mu, cov, lower, upper)
+
+
+def optimize(
+    tickers: List[str],
+    objective: str = "min_variance",
+    target_return: float | None = None,
+    risk_free: float = 0.0,
+    long_only: bool = True,
+    cap: float | None = None,
+    method: str = "sample",
+) -> Dict:
+    """Weights for `objective`: "min_variance", "max_sharpe" or "target_return"."""
+    problem = build_problem(tickers, long_only=long_only, cap=cap, method=method)
+    min_w, _, iters = problem.solve()
+
+    if objective == "min_variance":
+        w = min_w
+    elif objective == "target_return":
+        if target_return is None:
+            raise ValueError("target_return objective needs a target.")
+        lo, hi = float(problem.mu @ min_w), _max_return(problem.mu, problem.lower, problem.upper)
+        if not long_only and cap is None:
+            hi = np.inf
+        if target_return > hi + 1e-9:
+            raise ValueError(f"Target return {target_return:.4f} is above the attainable {hi:.4f}.")
+        # Below the min-variance return the frontier is inefficient; the min-variance portfolio dominates
+        w = min_w if target_return <= lo else problem.solve(target=target_return)[0]
+    elif objective == "max_sharpe":
+        w = _max_sharpe(problem, min_w, risk_free)
+    else:
+        raise ValueError("objective must be 'min_variance', 'max_sharpe' or 'target_return'.")
+
+    return {
+        "objective": objective,
+        "tickers": list(tickers),
+        "weights": np.round(w, 6).tolist(),
+        **_stats(problem, w, risk_free),
+    }
+
+
+def _max_sharpe(problem: _Problem, min_w: np.ndarray, risk_free: float) -> np.ndarray:
+    """Golden-section search over target return; Sharpe is unimodal along the efficient frontier."""
+    lo = float(problem.mu @ min_w)
+    hi = _max_return(problem.mu, problem.lower, problem.upper)
+    if hi <= lo + 1e-12:
+        return min_w
+
+    def sharpe(target: float) -> Tuple[float, np.ndarray]:
+        w = problem.solve(target=target)[0]
+        vol = np.sqrt(max(w @ problem.cov @ w, 0.0))
+        return ((problem.mu @ w - risk_free) / vol if vol > 0 else -np.inf), w
+
+    ratio = (np.sqrt(5.0) - 1.0) / 2.0
+    a, b = lo, hi
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    fc, fd = sharpe(c), sharpe(d)
+    for _ in range(SHARPE_SEARCH_STEPS):
+        if fc[0] >= fd[0]:
+            b, d, fd = d, c, fc
+            c = b - ratio * (b - a)
+            fc = sharpe(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + ratio * (b - a)
+            fd = sharpe(d)
+        if b - a < 1e-6:
+            break
+    best = max((fc, fd, (sharpe(lo)[0], min_w)), key=lambda p: p[0])
+    return best[1]
+
+
+def efficient_frontier(
+    tickers: List[str],
+    points: int = DEFAULT_FRONTIER_POINTS,
+    risk_free: float = 0.0,
+    long_only: bool = True,
+    cap: float | None = None,
+    method: str = "sample",
+    max_workers: int | None = None,
+) -> Dict:
+    """
+    `points` frontier portfolios from the min-variance return up to the highest
+    attainable return, solved in parallel on the shared process pool.
+    """
+    points = max(2, min(int(points), MAX_FRONTIER_POINTS))
+    problem = build_problem(tickers, long_only=long_only, cap=cap, method=method)
+    min_w, _, _ = problem.solve()
+    lo = float(problem.mu @ min_w)
+    hi = _max_return(problem.mu, problem.lower, problem.upper)
+    targets = np.linspace(lo, max(hi, lo), points)
+
+    workers = max(1, min(max_workers or processPool.MAX_WORKERS, points))
+    chunks = [c.tolist() for c in np.array_split(targets, workers) if len(c)]
+    if workers == 1:
+        weights = _solve_chunk(chunks[0], problem)
+    else:
+        shared = processPool.Shared(problem)
+        futures = [processPool.submit(_solve_shared, chunk, shared) for chunk in chunks]
+        weights = [w for future in futures for w in future.result()]
+
+    frontier = [_stats(problem, w, risk_free) for w in weights]
+    return {
+        "tickers": list(tickers),
+        "points": frontier,
+        "weights": [np.round(w, 6).tolist() for w in weights] if len(tickers) <= 100 else None,
+        "assets": [
+            {"ticker": t, "return": round(float(m), 6), "volatility": round(float(np.sqrt(max(v, 0.0))), 6)}
+            for t, m, v in zip(tickers, problem.mu, np.diag(problem.cov))
+        ],
+    }
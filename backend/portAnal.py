@@ -1,91 +1,162 @@
 """
-Generates portfolio analysis visuals using data in current_portfolio and stock_data.
-Currently outputs a pie chart of portfolio value composition.
+Generates portfolio analysis visuals from a portfolio's parsed lots and their quotes (backend.quotes).
+Currently outputs a pie chart of portfolio value composition; the Analysis page
+draws it client-side from holding_values() (app.py's chart-data routes) instead.
+Rendered charts are cached in chart_cache/ under a hash of their input data, so an
+unchanged portfolio (same holdings and latest prices) never re-runs matplotlib.
+matplotlib and pandas are imported on first use, so importing this module is cheap.
 """
 
-import matplotlib
+from __future__ import annotations
 
-# Use non-GUI backend for server environments
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt  # noqa: E402
-import pandas as pd  # noqa: E402
-from pathlib import Path  # noqa: E402
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+from backend import metrics
+from backend.lots import Lots
+from backend.quotes import quote_table
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent
-CURRENT_PORTFOLIO_DIR = BASE_DIR / "current_portfolio"
-STOCK_DATA_DIR = BASE_DIR / "stock_data"
+CHART_CACHE_DIR = BASE_DIR / "chart_cache"
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
+PIE_PARAMS = {
+    "chart": "pie",
+    "figsize": [6, 6],
+    "dpi": 150,
+    "autopct": "%1.1f%%",
+    "startangle": 140,
+    "title": "Portfolio Value Composition",
+}
 
-def _latest_price(ticker: str) -> float | None:
-    csv_path = STOCK_DATA_DIR / f"{ticker}.csv"
-    if not csv_path.exists():
-        return None
-    try:
-        df = pd.read_csv(csv_path, parse_dates=["Date"])
-        if df.empty or "Adj Close" not in df.columns:
-            return None
-        return float(df["Adj Close"].iloc[-1])
-    except Exception:
-        return None
+# pyplot keeps global state; jobs and requests may render from different threads
+_render_lock = threading.Lock()
 
 
-def _load_portfolio() -> pd.DataFrame:
-    csv_files = list(CURRENT_PORTFOLIO_DIR.glob("*.csv"))
-    if not csv_files:
-        return pd.DataFrame()
-    try:
-        df = pd.read_csv(csv_files[0])
-        return df
-    except Exception:
-        return pd.DataFrame()
+def load_pyplot():
+    """Import matplotlib.pyplot with the non-GUI backend (for server environments)."""
+    import matplotlib
 
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-def _build_value_df() -> pd.DataFrame:
-    portfolio = _load_portfolio()
-    if portfolio.empty or not {"Asset", "Quantity"}.issubset(portfolio.columns):
-        return pd.DataFrame()
+    return plt
 
+
+def holding_values(lots: Lots) -> List[Dict]:
+    """{"Asset", "Quantity", "Value"} per held ticker with a price, in ticker order."""
+    # Quantity per ticker in one pass over the lot columns
+    ids = lots.ticker_id[lots.ok]
+    held = np.bincount(ids, minlength=len(lots.symbols)) > 0
+    qty = np.zeros(len(lots.symbols), dtype=np.int64)
+    np.add.at(qty, ids, lots.qty[lots.ok])
+
+    codes = np.flatnonzero(held)
+    tickers = lots.symbols[codes].tolist()
+    try:
+        prices = quote_table.prices(tickers)
+    except Exception:
+        prices = np.full(len(tickers), np.nan)
     assets = []
-    for _, row in portfolio.iterrows():
-        ticker = str(row["Asset"]).strip().upper()
-        try:
-            qty = int(row["Quantity"])
-        except Exception:
-            continue
-        price = _latest_price(ticker)
-        if price is None:
+    for ticker, code, price in zip(tickers, codes, prices):
+        if not np.isfinite(price):
             continue
-        value = price * qty
-        assets.append({"Asset": ticker, "Quantity": qty, "Price": price, "Value": value})
+        assets.append({"Asset": ticker, "Quantity": int(qty[code]), "Value": float(price) * int(qty[code])})
+    return assets
+
+
+def _build_value_df(lots: Lots) -> pd.DataFrame:
+    import pandas as pd
 
+    assets = holding_values(lots)
     if not assets:
         return pd.DataFrame()
+    return pd.DataFrame(assets)
+
+
+def _chart_key(df: pd.DataFrame, params: dict) -> str:
+    payload = {
+        "params": params,
+        "assets": df["Asset"].tolist(),
+        # Round so float noise in the last bits doesn't defeat the cache
+        "values": [round(float(v), 6) for v in df["Value"]],
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _cached_chart(key: str) -> Path | None:
+    path = CHART_CACHE_DIR / f"{key}.png"
+    try:
+        # Touch on hit so eviction is least-recently-used
+        os.utime(path)
+    except OSError:
+        return None
+    return path
 
-    df = pd.DataFrame(assets)
-    df = df.groupby("Asset", as_index=False).agg({"Quantity": "sum", "Value": "sum"})
-    return df
+
+def _evict_chart_cache() -> None:
+    entries = []
+    for path in CHART_CACHE_DIR.glob("*.png"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CHART_CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
 
 
 def _save_pie(df: pd.DataFrame) -> Path | None:
     if df.empty or df["Value"].sum() <= 0:
         return None
 
-    CURRENT_PORTFOLIO_DIR.mkdir(parents=True, exist_ok=True)
-    out_path = CURRENT_PORTFOLIO_DIR / "PApie.png"
-
-    fig, ax = plt.subplots(figsize=(6, 6))
-    ax.pie(df["Value"], labels=df["Asset"], autopct="%1.1f%%", startangle=140)
-    ax.set_title("Portfolio Value Composition")
-    plt.tight_layout()
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    key = _chart_key(df, PIE_PARAMS)
+    cached = _cached_chart(key)
+    metrics.cache_lookup("chart", cached is not None)
+    if cached is not None:
+        return cached
+
+    CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = CHART_CACHE_DIR / f"{key}.png"
+    tmp_path = CHART_CACHE_DIR / f"{key}.{threading.get_ident()}.tmp"
+
+    with metrics.stage("render"), _render_lock:
+        plt = load_pyplot()
+        fig, ax = plt.subplots(figsize=tuple(PIE_PARAMS["figsize"]))
+        ax.pie(df["Value"], labels=df["Asset"], autopct=PIE_PARAMS["autopct"], startangle=PIE_PARAMS["startangle"])
+        ax.set_title(PIE_PARAMS["title"])
+        plt.tight_layout()
+        fig.savefig(tmp_path, dpi=PIE_PARAMS["dpi"], format="png")
+        plt.close(fig)
+    os.replace(tmp_path, out_path)
+    metrics.BYTES_WRITTEN.inc(out_path.stat().st_size, store="chart_cache")
+    _evict_chart_cache()
     return out_path
 
 
-def run_portfolio_analysis() -> Path | None:
+def run_portfolio_analysis(lots: Lots) -> Path | None:
     """
-    Build basic analytics (currently a value pie chart) for the current portfolio.
-    Returns path to the generated pie chart, or None if not created.
+    Build basic analytics (currently a value pie chart) for a portfolio's parsed
+    lots (backend.lots; sessions.Portfolio.lots).
+    Returns path to the (possibly cached) pie chart, or None if not created.
     """
-    df = _build_value_df()
+    with metrics.stage("chart_values"):
+        df = _build_value_df(lots)
     return _save_pie(df)
@@ -1,9 +1,8 @@
 from datetime import datetime
-import csv
 import re
-from pathlib import Path
 
-import yfinance as yf
+from backend.catalog import catalog
+from backend.tickerRegistry import ticker_registry
 
 
 def validate_portfolio_input(data):
@@ -29,13 +28,9 @@ def validate_portfolio_input(data):
     if len(ticker) > 8:
         return False, "Ticker symbol looks too long."
 
-    # Yahoo Finance API Check
+    # Local registry first; Yahoo is only asked about symbols we've never seen (results TTL-cached)
     try:
-        stock = yf.Ticker(ticker)
-        # fetch 5 days of history to see if data exists
-        hist = stock.history(period="5d")
-
-        if len(hist) == 0:
+        if not ticker_registry.verify(ticker):
             return False, f"Ticker '{ticker}' could not be found on the market."
 
     except Exception as e:
@@ -67,48 +62,22 @@ def _slugify_name(name: str) -> str:
     return safe_name
 
 
-def _clear_portfolio_dir(portfolio_dir: Path) -> None:
-    if not portfolio_dir.exists():
-        return
-    for item in portfolio_dir.iterdir():
-        if item.is_file():
-            item.unlink()
-
-
-def save_portfolio(data):
+def build_portfolio(data):
     """
-    Append a validated current_portfolio tranche to backend/current_portfolio/<name>.csv.
+    Turn a validated create-form submission into (name, rows) for the session store.
     """
     name = (data.get('name') or "").strip()
-    ticker = data.get('ticker')
+    ticker = str(data.get('ticker')).strip().upper()
     quantity = int(data.get('quantity'))
     date_str = data.get('date')
 
-    # Slugify the filename to keep it filesystem-friendly
+    # Slugify the name to keep saved/downloaded filenames filesystem-friendly
     safe_name = _slugify_name(name)
     if not safe_name:
         raise ValueError("Invalid current_portfolio name.")
 
-    base_dir = Path(__file__).resolve().parent
-    portfolio_dir = base_dir / "current_portfolio"
-    saved_dir = base_dir / "saved_portfolios"
-    portfolio_dir.mkdir(parents=True, exist_ok=True)
-
     # Block creation if a saved current_portfolio with the same name already exists
-    saved_conflict = saved_dir / f"{safe_name}.csv"
-    if saved_conflict.exists():
+    if catalog.exists(safe_name):
         raise ValueError("A saved current_portfolio with this name already exists. Choose a different name.")
 
-    # Clear temp current_portfolio directory before writing a new file
-    _clear_portfolio_dir(portfolio_dir)
-
-    file_path = portfolio_dir / f"{safe_name}.csv"
-    write_header = not file_path.exists()
-
-    with file_path.open("a", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        if write_header:
-            writer.writerow(["Asset", "Quantity", "Date Acquired"])
-        writer.writerow([ticker, quantity, date_str])
-
-    return file_path
+    return safe_name, [[ticker, str(quantity), date_str]]
@@ -0,0 +1,126 @@
+"""
+Process-wide cache of loaded price histories shared by app.py and portAnal.py.
+Entries are keyed by ticker and tagged with the backing file's (mtime, size), so a
+refresh written by getStonks invalidates them on the next lookup. Least recently
+used entries are evicted once the entry count or memory budget is exceeded.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from backend import metrics, priceStore
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def file_signature(ticker: str) -> Tuple[int, int] | None:
+    if not priceStore.valid_ticker(ticker):
+        return None
+    try:
+        st = priceStore.store_path(ticker).stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class PriceCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int] | None, pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get_df(self, ticker: str) -> pd.DataFrame:
+        """
+        Return the sorted price history for `ticker` (empty DataFrame if missing).
+        The frame is shared between callers and must not be mutated.
+        """
+        sig = file_signature(ticker)
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is not None:
+                if entry[0] == sig:
+                    self._entries.move_to_end(ticker)
+                    self.hits += 1
+                    metrics.cache_lookup("price", True)
+                    return entry[1]
+                self.invalidations += 1
+                self._drop(ticker)
+            self.misses += 1
+        metrics.cache_lookup("price", False)
+
+        try:
+            df = priceStore.load_df(ticker)
+        except Exception:
+            import pandas as pd
+            df = pd.DataFrame()
+        # Tag with the signature seen before loading, so a write that lands during the
+        # load invalidates this frame; only a just-migrated legacy CSV has none yet
+        if sig is None:
+            sig = file_signature(ticker)
+        size = int(df.memory_usage(index=True).sum()) if not df.empty else 0
+
+        with self._lock:
+            if ticker in self._entries:
+                self._drop(ticker)
+            self._entries[ticker] = (sig, df, size)
+            self._bytes += size
+            self._evict()
+        return df
+
+    def latest_price(self, ticker: str) -> float | None:
+        df = self.get_df(ticker)
+        if df.empty or "Adj Close" not in df.columns:
+            return None
+        return float(df["Adj Close"].iloc[-1])
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif ticker in self._entries:
+                self._drop(ticker)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, ticker: str) -> None:
+        _, _, size = self._entries.pop(ticker)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            ticker = next(iter(self._entries))
+            self._drop(ticker)
+            self.evictions += 1
+
+
+price_cache = PriceCache()
@@ -0,0 +1,43 @@
+"""
+In-process notifications of price changes.
+priceStore publishes the ticker after every write, and the quote table
+(backend.quotes) after a quote changes; listeners (the live SSE
+streams in app.py) wait for a sequence number newer than the last one they saw
+and get the set of tickers written since. Writes made by another process (e.g.
+the importCache CLI) are not seen here.
+"""
+
+import threading
+from typing import Dict, Iterable, Set, Tuple
+
+
+class PriceEvents:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        # ticker -> seq of its latest write
+        self._changed: Dict[str, int] = {}
+
+    @property
+    def seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def publish(self, tickers: Iterable[str]) -> int:
+        with self._cond:
+            self._seq += 1
+            for ticker in tickers:
+                self._changed[ticker] = self._seq
+            self._cond.notify_all()
+            return self._seq
+
+    def wait(self, since: int, timeout: float) -> Tuple[int, Set[str]]:
+        """Block until something newer than `since` is published (or timeout); (seq, tickers changed after `since`)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > since, timeout)
+            if self._seq <= since:
+                return self._seq, set()
+            return self._seq, {t for t, s in self._changed.items() if s > since}
+
+
+price_events = PriceEvents()
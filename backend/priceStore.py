@@ -0,0 +1,392 @@
+"""
+Binary price store backing backend/stock_data.
+Each ticker is kept in <TICKER>.bin as fixed-width records (one per trading day)
+and opened with np.memmap, so loading a history needs no CSV or date parsing.
+Legacy <TICKER>.csv files are migrated the first time a ticker is opened, or all
+at once with `python -m backend.priceStore`; the CSV is kept as <TICKER>.csv.migrated.
+Ticker symbols are checked before they become file names (see valid_ticker), so
+no request can reach a file outside the store.
+Weekly and monthly bars are kept alongside in weekly/<TICKER>.bin and
+monthly/<TICKER>.bin, in the same record layout. Every write here keeps them
+current: a full rewrite rebuilds them, and an append only re-aggregates the
+week/month it touches. So getStonks' refreshes (and importCache, SimulatedTicks)
+maintain them without extra work. Pick one with open_records(ticker, resolution);
+a 5-year monthly read is about 20x smaller than the daily one.
+pandas is only imported by the DataFrame conversions, so record-level readers
+(timeSeries, riskAnal) never load it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Tuple
+
+import numpy as np
+
+from backend import metrics
+from backend.priceEvents import price_events
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+STOCK_DATA_DIR = BASE_DIR / "stock_data"
+
+COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+PRICE_COLUMNS = COLUMNS[1:]
+RECORD_DTYPE = np.dtype([("Date", "<M8[D]")] + [(c, "<f8") for c in PRICE_COLUMNS])
+
+_EMPTY = np.empty(0, dtype=RECORD_DTYPE)
+
+RESOLUTIONS = ("daily", "weekly", "monthly")
+ROLLUPS = RESOLUTIONS[1:]
+
+# One writer at a time per process: a merge decides append vs. rewrite from what
+# is stored, and rollup files are patched in place on append
+_write_lock = threading.RLock()
+
+
+# Exchange symbols such as BRK-B, ^GSPC or EURUSD=X; no path separators
+_TICKER_RE = re.compile(r"[A-Za-z0-9.^=_-]{1,15}")
+
+
+def valid_ticker(ticker: str | None) -> bool:
+    return isinstance(ticker, str) and bool(_TICKER_RE.fullmatch(ticker)) and ".." not in ticker
+
+
+def _checked(ticker: str) -> str:
+    if not valid_ticker(ticker):
+        raise ValueError(f"Invalid ticker symbol {ticker!r}.")
+    return ticker
+
+
+def store_path(ticker: str) -> Path:
+    """Path of the ticker's daily records; ValueError for a symbol that is not a plain file name."""
+    return STOCK_DATA_DIR / f"{_checked(ticker)}.bin"
+
+
+def rollup_path(ticker: str, resolution: str) -> Path:
+    if resolution not in ROLLUPS:
+        raise ValueError(f"Unknown resolution '{resolution}'; use one of {', '.join(RESOLUTIONS)}.")
+    return STOCK_DATA_DIR / resolution / f"{_checked(ticker)}.bin"
+
+
+def _legacy_csv_path(ticker: str) -> Path:
+    return STOCK_DATA_DIR / f"{_checked(ticker)}.csv"
+
+
+def has_history(ticker: str) -> bool:
+    """A daily file is stored for `ticker` (False for invalid symbols)."""
+    return valid_ticker(ticker) and store_path(ticker).exists()
+
+
+def df_to_records(df: pd.DataFrame) -> np.ndarray:
+    import pandas as pd
+
+    if df is None or df.empty or "Date" not in df.columns:
+        return _EMPTY.copy()
+    dates = pd.to_datetime(df["Date"], errors="coerce")
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    mask = dates.notna().to_numpy()
+    recs = np.empty(int(mask.sum()), dtype=RECORD_DTYPE)
+    recs["Date"] = dates[mask].to_numpy().astype("M8[D]")
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            recs[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="f8")[mask]
+        else:
+            recs[col] = np.nan
+    return recs
+
+
+def records_to_df(recs: np.ndarray) -> pd.DataFrame:
+    import pandas as pd
+
+    if len(recs) == 0:
+        return pd.DataFrame()
+    data = {"Date": recs["Date"].astype("M8[ns]")}
+    for col in PRICE_COLUMNS:
+        data[col] = np.array(recs[col])
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def _sort_dedupe(recs: np.ndarray) -> np.ndarray:
+    if len(recs) == 0:
+        return recs
+    # Stable sort then keep the last record per date (newest fetch wins)
+    order = np.argsort(recs["Date"], kind="stable")
+    recs = recs[order]
+    keep = np.ones(len(recs), dtype=bool)
+    keep[:-1] = recs["Date"][1:] != recs["Date"][:-1]
+    return recs[keep]
+
+
+def _tmp_path(path: Path) -> Path:
+    """A temp file next to `path` that no other writer (thread or process) uses."""
+    return path.with_suffix(f".bin.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_records(ticker: str, recs: np.ndarray) -> Path:
+    STOCK_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = store_path(ticker)
+    recs = _sort_dedupe(np.asarray(recs, dtype=RECORD_DTYPE))
+    tmp_path = _tmp_path(path)
+    recs.tofile(tmp_path)
+    with _write_lock:
+        os.replace(tmp_path, path)
+        _write_rollups(ticker, recs)
+    metrics.BYTES_WRITTEN.inc(recs.nbytes, store="price_store")
+    price_events.publish([ticker])
+    return path
+
+
+def write_df(ticker: str, df: pd.DataFrame) -> Path:
+    return write_records(ticker, df_to_records(df))
+
+
+def append_records(ticker: str, recs: np.ndarray) -> Path:
+    """
+    Append records that are strictly newer than everything stored.
+    Only the new bytes are written; callers must check ordering (see merge_records).
+    """
+    STOCK_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = store_path(ticker)
+    recs = _sort_dedupe(np.asarray(recs, dtype=RECORD_DTYPE))
+    with _write_lock:
+        # Rollups that were behind before this append are rebuilt rather than patched
+        current = all(_rollup_current(ticker, resolution) for resolution in ROLLUPS)
+        _append_bytes(path, recs.tobytes())
+        if current and len(recs):
+            _extend_rollups(ticker, recs["Date"][0])
+        elif not current:
+            _write_rollups(ticker, np.array(open_records(ticker)))
+    metrics.BYTES_WRITTEN.inc(recs.nbytes, store="price_store")
+    price_events.publish([ticker])
+    return path
+
+
+def _append_bytes(path: Path, data: bytes, keep: int | None = None) -> None:
+    """Append `data` after the first `keep` bytes (default: all whole records) of `path`."""
+    with path.open("r+b" if path.exists() else "wb") as f:
+        size = f.seek(0, os.SEEK_END)
+        # Drop a torn trailing record left by an interrupted append
+        end = size - size % RECORD_DTYPE.itemsize if keep is None else keep
+        if end != size:
+            f.truncate(end)
+            f.seek(end)
+        f.write(data)
+
+
+# ---- weekly / monthly rollups ----
+
+def _period_start(days: np.ndarray, resolution: str) -> np.ndarray:
+    days = np.asarray(days).astype("M8[D]")
+    if resolution == "weekly":
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        ordinal = days.astype("i8")
+        return (ordinal - (ordinal + 3) % 7).astype("M8[D]")
+    if resolution == "monthly":
+        return days.astype("M8[M]").astype("M8[D]")
+    raise ValueError(f"Unknown resolution '{resolution}'; use one of {', '.join(RESOLUTIONS)}.")
+
+
+def aggregate_bars(recs: np.ndarray, resolution: str) -> np.ndarray:
+    """
+    One bar per week or month of daily records: first Open, highest High, lowest
+    Low, last Close and Adj Close, summed Volume, dated by the period's last trading day.
+    """
+    if len(recs) == 0:
+        return _EMPTY.copy()
+    periods = _period_start(recs["Date"], resolution)
+    starts = np.flatnonzero(np.concatenate([[True], periods[1:] != periods[:-1]]))
+    ends = np.concatenate([starts[1:], [len(recs)]]) - 1
+    bars = np.empty(len(starts), dtype=RECORD_DTYPE)
+    bars["Date"] = recs["Date"][ends]
+    bars["Open"] = recs["Open"][starts]
+    bars["High"] = np.fmax.reduceat(np.asarray(recs["High"]), starts)
+    bars["Low"] = np.fmin.reduceat(np.asarray(recs["Low"]), starts)
+    bars["Close"] = recs["Close"][ends]
+    bars["Adj Close"] = recs["Adj Close"][ends]
+    bars["Volume"] = np.add.reduceat(np.nan_to_num(np.asarray(recs["Volume"])), starts)
+    return bars
+
+
+def _rollup_current(ticker: str, resolution: str) -> bool:
+    """The rollup exists and was written no earlier than the daily file."""
+    try:
+        rollup = rollup_path(ticker, resolution).stat()
+        daily = store_path(ticker).stat()
+    except OSError:
+        return False
+    return rollup.st_mtime_ns >= daily.st_mtime_ns and rollup.st_size % RECORD_DTYPE.itemsize == 0
+
+
+def _write_rollups(ticker: str, recs: np.ndarray) -> None:
+    for resolution in ROLLUPS:
+        path = rollup_path(ticker, resolution)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        bars = aggregate_bars(recs, resolution)
+        tmp_path = _tmp_path(path)
+        bars.tofile(tmp_path)
+        os.replace(tmp_path, path)
+        metrics.BYTES_WRITTEN.inc(bars.nbytes, store="price_rollups")
+
+
+def _extend_rollups(ticker: str, first_new: np.datetime64) -> None:
+    """After an append starting at `first_new`: re-aggregate from the period containing it on."""
+    daily = open_records(ticker)
+    for resolution in ROLLUPS:
+        path = rollup_path(ticker, resolution)
+        start = _period_start(np.array([first_new]), resolution)[0]
+        tail = np.array(daily[np.searchsorted(daily["Date"], start):])
+        bars = aggregate_bars(tail, resolution)
+        stored = _map(path)
+        keep = int(np.searchsorted(stored["Date"], start)) * RECORD_DTYPE.itemsize
+        del stored
+        _append_bytes(path, bars.tobytes(), keep=keep)
+        metrics.BYTES_WRITTEN.inc(bars.nbytes, store="price_rollups")
+
+
+def rebuild_rollups(tickers: List[str] | None = None) -> List[str]:
+    """Rebuild weekly/monthly bars that are missing or older than their daily file."""
+    rebuilt = []
+    for ticker in list_tickers() if tickers is None else tickers:
+        with _write_lock:
+            if all(_rollup_current(ticker, resolution) for resolution in ROLLUPS):
+                continue
+            recs = open_records(ticker)
+            if not len(recs):
+                continue
+            _write_rollups(ticker, np.array(recs))
+        rebuilt.append(ticker)
+    return rebuilt
+
+
+def compact(ticker: str, extra: np.ndarray | None = None) -> Path:
+    """Rewrite the ticker's file sorted and de-duplicated, merging in `extra` (which wins on overlap)."""
+    with _write_lock:
+        existing = np.array(open_records(ticker))
+        if extra is not None and len(extra):
+            existing = np.concatenate([existing, np.asarray(extra, dtype=RECORD_DTYPE)])
+        return write_records(ticker, existing)
+
+
+def merge_records(ticker: str, recs: np.ndarray) -> str:
+    """
+    Store newly fetched records. Rows strictly after the stored range are appended
+    in place; a prepend or overlap falls back to a full compaction.
+    Returns "append", "rewrite" or "none".
+    """
+    recs = _sort_dedupe(np.asarray(recs, dtype=RECORD_DTYPE))
+    if len(recs) == 0:
+        return "none"
+    # Held from the check to the write, so a concurrent merge cannot append behind our back
+    with _write_lock:
+        existing = open_records(ticker)
+        if len(existing) and recs["Date"][0] > existing["Date"][-1]:
+            append_records(ticker, recs)
+            return "append"
+        compact(ticker, recs)
+        return "rewrite"
+
+
+def merge_df(ticker: str, df: pd.DataFrame) -> str:
+    return merge_records(ticker, df_to_records(df))
+
+
+def migrate_csv(ticker: str) -> bool:
+    csv_path = _legacy_csv_path(ticker)
+    if not csv_path.exists():
+        return False
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(csv_path, parse_dates=["Date"])
+    except Exception:
+        return False
+    write_df(ticker, df)
+    # Keep the original next to the store rather than deleting user data
+    os.replace(csv_path, csv_path.with_name(csv_path.name + ".migrated"))
+    return True
+
+
+def migrate_all() -> List[str]:
+    if not STOCK_DATA_DIR.exists():
+        return []
+    migrated = []
+    for csv_path in sorted(STOCK_DATA_DIR.glob("*.csv")):
+        if not valid_ticker(csv_path.stem) or store_path(csv_path.stem).exists():
+            continue
+        if migrate_csv(csv_path.stem):
+            migrated.append(csv_path.stem)
+    return migrated
+
+
+def _map(path: Path) -> np.ndarray:
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return _EMPTY
+    if size < RECORD_DTYPE.itemsize:
+        return _EMPTY
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(size // RECORD_DTYPE.itemsize,))
+
+
+def open_records(ticker: str, resolution: str = "daily") -> np.ndarray:
+    """
+    Stored history for `ticker` (sorted by date) at `resolution` ("daily", "weekly" or
+    "monthly"); daily records are memory-mapped. Returns an empty record array when nothing is
+    stored or the symbol is not valid.
+    Rollups missing or behind the daily file (e.g. written by an older version) are rebuilt first.
+    """
+    if not valid_ticker(ticker):
+        return _EMPTY
+    path = store_path(ticker)
+    if resolution == "daily":
+        if not path.exists() and not migrate_csv(ticker):
+            return _EMPTY
+        return _map(path)
+    if resolution not in ROLLUPS:
+        raise ValueError(f"Unknown resolution '{resolution}'; use one of {', '.join(RESOLUTIONS)}.")
+    if not _rollup_current(ticker, resolution):
+        if not path.exists() and not migrate_csv(ticker):
+            return _EMPTY
+        rebuild_rollups([ticker])
+    # Bar files are a few KB: one read is cheaper than setting up a mapping
+    try:
+        return np.fromfile(rollup_path(ticker, resolution), dtype=RECORD_DTYPE)
+    except OSError:
+        return _EMPTY
+
+
+def load_df(ticker: str, resolution: str = "daily") -> pd.DataFrame:
+    recs = open_records(ticker, resolution)
+    # Building the frame copies every mapped record, i.e. reads the whole file
+    metrics.BYTES_READ.inc(recs.nbytes, store="price_store")
+    return records_to_df(recs)
+
+
+def date_range(ticker: str) -> Tuple[date, date] | None:
+    recs = open_records(ticker)
+    if len(recs) == 0:
+        return None
+    return recs["Date"][0].astype(date), recs["Date"][-1].astype(date)
+
+
+def list_tickers() -> List[str]:
+    if not STOCK_DATA_DIR.exists():
+        return []
+    names = {p.stem for p in STOCK_DATA_DIR.glob("*.bin")}
+    names.update(p.stem for p in STOCK_DATA_DIR.glob("*.csv"))
+    return sorted(name for name in names if valid_ticker(name))
+
+
+if __name__ == "__main__":
+    done = migrate_all()
+    print(f"Migrated {len(done)} ticker(s) to {STOCK_DATA_DIR}")
+    rebuilt = rebuild_rollups()
+    print(f"Built weekly/monthly bars for {len(rebuilt)} ticker(s)")
@@ -0,0 +1,84 @@
+"""
+One long-lived process pool for CPU-bound work (efficient frontier, Monte Carlo
+forecast), shared by every request instead of a pool per call.
+Workers are started with forkserver (spawn where that is unavailable), never by
+forking the threaded Flask process, which could copy a lock another thread holds.
+The pool is created on first use and recreated if a worker dies.
+Per-call data (a factorized problem, a forecast model) travels as a Shared: it is
+pickled once in the parent and unpickled at most once per worker.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import pickle
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Tuple
+
+MAX_WORKERS = min(os.cpu_count() or 1, 8)
+# Imported once by the fork server, so workers start warm
+PRELOAD = ["backend.optimizer", "backend.forecast"]
+
+_pool: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_context())
+        return _pool
+
+
+def submit(fn: Callable, *args) -> Future:
+    """Submit to the shared pool, replacing it once if a worker died and broke it."""
+    global _pool
+    pool = get_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        with _lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return get_pool().submit(fn, *args)
+
+
+def shutdown() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+class Shared:
+    """A payload pickled once in the parent; workers cache the latest one they unpickled."""
+
+    def __init__(self, obj):
+        self.key = uuid.uuid4().hex
+        self.data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# Worker side: (key, object) of the last Shared loaded in this process
+_loaded: Tuple[str, object] | None = None
+
+
+def load(shared: Shared):
+    global _loaded
+    if _loaded is None or _loaded[0] != shared.key:
+        _loaded = (shared.key, pickle.loads(shared.data))
+    return _loaded[1]
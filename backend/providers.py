@@ -0,0 +1,162 @@
+"""
+Market data providers used by getStonks' refresh engine.
+A provider turns (symbols, start, end_exclusive) into one daily OHLCV frame per
+symbol, in the same layout yf.download returns for a single ticker, and
+quotes(symbols) into {symbol: (latest price, "YYYY-MM-DD" market day)} for the
+quote table.
+YahooProvider is the live source; FakeProvider generates deterministic synthetic
+prices so tests and benchmarks can run offline.
+pandas and yfinance are imported on first download, not at import time.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class YahooProvider:
+    name = "yahoo"
+
+    def download(self, symbols: List[str], start: str, end_exclusive: str) -> Dict[str, pd.DataFrame]:
+        if not symbols:
+            return {}
+        import pandas as pd
+        import yfinance as yf
+
+        raw = yf.download(
+            symbols if len(symbols) > 1 else symbols[0],
+            start=start,
+            end=end_exclusive,
+            auto_adjust=False,
+            progress=False,
+            group_by="ticker",
+            threads=False,
+        )
+        if raw is None or raw.empty:
+            return {}
+
+        out = {}
+        if isinstance(raw.columns, pd.MultiIndex):
+            level0 = set(raw.columns.get_level_values(0))
+            for symbol in symbols:
+                if symbol not in level0:
+                    continue
+                # Multi-symbol frames share one date index; drop days this symbol did not trade
+                df = raw[symbol].dropna(how="all")
+                if not df.empty:
+                    out[symbol] = df
+        elif len(symbols) == 1:
+            out[symbols[0]] = raw
+        return out
+
+    def quotes(self, symbols: List[str]) -> Dict[str, Tuple[float, str]]:
+        # The last week of daily bars; today's bar carries the latest price while the market is open
+        today = date.today()
+        frames = self.download(symbols, (today - timedelta(days=7)).isoformat(),
+                               (today + timedelta(days=1)).isoformat())
+        out = {}
+        for symbol, df in frames.items():
+            close = df["Close"].dropna()
+            if len(close):
+                out[symbol] = (float(close.iloc[-1]), close.index[-1].strftime("%Y-%m-%d"))
+        return out
+
+    def exists(self, symbol: str) -> bool:
+        import yfinance as yf
+
+        # fetch 5 days of history to see if data exists
+        return len(yf.Ticker(symbol).history(period="5d")) > 0
+
+
+class FakeProvider:
+    """
+    Offline stand-in for Yahoo. Prices are a seeded random walk over business
+    days since `epoch`, so any window for a symbol is consistent with any other.
+    """
+    name = "fake"
+
+    def __init__(self, epoch: str = "2000-01-03", missing: List[str] | None = None):
+        self.epoch = np.datetime64(epoch, "D")
+        self.missing = {s.upper() for s in (missing or [])}
+        self.calls = 0
+        self.symbols_requested = 0
+        self._quote_overrides: Dict[str, float] = {}
+        self._paths: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, n_days: int) -> np.ndarray:
+        with self._lock:
+            path = self._paths.get(symbol)
+            if path is None or len(path) < n_days:
+                rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+                n = max(n_days, 8192)
+                base = 20.0 + (zlib.crc32(symbol.encode()) % 400)
+                path = base * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+                self._paths[symbol] = path
+            return path
+
+    def set_quote(self, symbol: str, price: float) -> None:
+        """Pin the price quotes() returns for `symbol` (e.g. to simulate a move)."""
+        with self._lock:
+            self._quote_overrides[symbol] = price
+
+    def quotes(self, symbols: List[str]) -> Dict[str, Tuple[float, str]]:
+        with self._lock:
+            self.calls += 1
+            self.symbols_requested += len(symbols)
+            overrides = dict(self._quote_overrides)
+        # The walk's value on the latest business day, matching download()'s last bar
+        day = np.busday_offset(np.datetime64(date.today(), "D"), 0, roll="backward")
+        offset = int(np.busday_count(self.epoch, day))
+        out = {}
+        for symbol in symbols:
+            if symbol.upper() in self.missing:
+                continue
+            price = overrides.get(symbol)
+            if price is None:
+                price = float(self._path(symbol, offset + 1)[offset])
+            out[symbol] = (price, str(day))
+        return out
+
+    def exists(self, symbol: str) -> bool:
+        with self._lock:
+            self.calls += 1
+        return symbol.upper() not in self.missing
+
+    def download(self, symbols: List[str], start: str, end_exclusive: str) -> Dict[str, pd.DataFrame]:
+        import pandas as pd
+
+        with self._lock:
+            self.calls += 1
+            self.symbols_requested += len(symbols)
+        end = pd.Timestamp(end_exclusive) - pd.Timedelta(days=1)
+        days = pd.bdate_range(max(pd.Timestamp(start), pd.Timestamp(self.epoch)), end, name="Date")
+        if len(days) == 0:
+            return {}
+        offsets = np.busday_count(self.epoch, days.values.astype("M8[D]"))
+
+        out = {}
+        for symbol in symbols:
+            if symbol.upper() in self.missing:
+                continue
+            adj = self._path(symbol, int(offsets[-1]) + 1)[offsets]
+            out[symbol] = pd.DataFrame(
+                {
+                    "Open": adj * 0.995,
+                    "High": adj * 1.01,
+                    "Low": adj * 0.99,
+                    "Close": adj,
+                    "Adj Close": adj,
+                    "Volume": np.full(len(adj), 1_000_000.0),
+                },
+                index=days,
+            )
+        return out
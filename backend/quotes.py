@@ -0,0 +1,232 @@
+"""
+Latest-price quotes, kept separate from the full history sync.
+The current-value columns, the pie chart and the risk weights only need each
+ticker's last price. QuoteTable keeps it in compact parallel arrays (price, market
+day, fetch time, change seq) behind a ticker -> slot dict. Quotes older than the
+TTL are re-fetched in one batch through the provider's quotes() call on a
+background thread, and the stale price is served until the new one lands. A ticker
+seen for the first time starts from its stored history's last close. When the
+price store later gains a bar at least as recent as the quote, the stored close
+wins, so history syncs and simulated ticks still show through.
+Quote changes are published on priceEvents, like price store writes.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from backend import metrics
+from backend.getStonks import get_provider
+from backend.lots import NO_DAY
+from backend.priceCache import file_signature, price_cache
+from backend.priceEvents import price_events
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60.0
+_INITIAL_SLOTS = 64
+
+
+def _day_ordinal(value) -> int:
+    return int(np.datetime64(value, "D").astype("i8"))
+
+
+class QuoteTable:
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, provider_fn: Callable | None = None,
+                 background: bool = True):
+        self.ttl = ttl
+        # Defaults to getStonks' provider, so set_provider() swaps history and quotes together
+        self.provider_fn = provider_fn or get_provider
+        self.background = background
+        self._slots: Dict[str, int] = {}
+        self._price = np.full(_INITIAL_SLOTS, np.nan)
+        self._day = np.full(_INITIAL_SLOTS, NO_DAY, dtype=np.int32)
+        # time.monotonic() of the last provider attempt; -inf until the first one
+        self._fetched = np.full(_INITIAL_SLOTS, -np.inf)
+        self._seq = np.zeros(_INITIAL_SLOTS, dtype=np.int64)
+        # time.time() of each slot's latest change (for Last-Modified)
+        self._changed_at = np.zeros(_INITIAL_SLOTS)
+        # Price store file signature each slot last reconciled with
+        self._store_sigs: List[tuple | None] = []
+        self._version = 0
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.failures = 0
+
+    def _slot(self, ticker: str) -> int:
+        # Caller holds the lock
+        slot = self._slots.get(ticker)
+        if slot is not None:
+            return slot
+        slot = len(self._slots)
+        if slot == len(self._price):
+            grow = len(self._price)
+            self._price = np.concatenate([self._price, np.full(grow, np.nan)])
+            self._day = np.concatenate([self._day, np.full(grow, NO_DAY, dtype=np.int32)])
+            self._fetched = np.concatenate([self._fetched, np.full(grow, -np.inf)])
+            self._seq = np.concatenate([self._seq, np.zeros(grow, dtype=np.int64)])
+            self._changed_at = np.concatenate([self._changed_at, np.zeros(grow)])
+        self._slots[ticker] = slot
+        self._store_sigs.append(None)
+        return slot
+
+    def _reconcile(self, ticker: str) -> None:
+        """Adopt the stored last close when the store changed and is at least as recent as the quote."""
+        sig = file_signature(ticker)
+        with self._lock:
+            slot = self._slots.get(ticker)
+            if slot is not None and self._store_sigs[slot] == sig:
+                return
+        df = price_cache.get_df(ticker)
+        with self._lock:
+            slot = self._slot(ticker)
+            self._store_sigs[slot] = sig
+            if df.empty or "Adj Close" not in df.columns:
+                return
+            day = _day_ordinal(df["Date"].iloc[-1])
+            if day >= self._day[slot]:
+                self._price[slot] = float(df["Adj Close"].iloc[-1])
+                self._day[slot] = day
+
+    def _stale(self, tickers: Iterable[str], now: float) -> List[str]:
+        # Caller holds the lock; unknown tickers count as stale
+        return [t for t in tickers if t not in self._inflight
+                and (t not in self._slots or now - self._fetched[self._slots[t]] >= self.ttl)]
+
+    def refresh_stale(self, tickers: Iterable[str]) -> None:
+        """Start a background refresh of the tickers' stale quotes (no-op with background off)."""
+        if not self.background:
+            return
+        with self._lock:
+            batch = self._stale(tickers, time.monotonic())
+            self._inflight.update(batch)
+        if batch:
+            threading.Thread(target=self._refresh_in_background, args=(batch,), name="quote-refresh",
+                             daemon=True).start()
+
+    def _refresh_in_background(self, tickers: List[str]) -> None:
+        try:
+            self.refresh(tickers)
+        finally:
+            with self._lock:
+                self._inflight.difference_update(tickers)
+
+    def prices(self, tickers: List[str]) -> np.ndarray:
+        """Latest price per ticker (NaN if unknown); stale ones are refreshed in the background."""
+        for ticker in tickers:
+            self._reconcile(ticker)
+        with self._lock:
+            out = np.array([self._price[self._slots[t]] for t in tickers], dtype="f8")
+        self.refresh_stale(tickers)
+        return out
+
+    def price(self, ticker: str) -> float | None:
+        value = self.prices([ticker])[0]
+        return None if np.isnan(value) else float(value)
+
+    def signature(self, tickers: Iterable[str]) -> Tuple[int, float]:
+        """
+        (seq, time) of the latest quote change among `tickers`, for cache keys and
+        HTTP validators; (0, 0.0) until one changes. Stale quotes are refreshed in the background.
+        """
+        tickers = list(tickers)
+        with self._lock:
+            slots = [self._slots[t] for t in tickers if t in self._slots]
+            latest = max(slots, key=lambda slot: self._seq[slot], default=None)
+            sig = (0, 0.0) if latest is None else (int(self._seq[latest]), float(self._changed_at[latest]))
+        self.refresh_stale(tickers)
+        return sig
+
+    def refresh(self, tickers: Iterable[str]) -> List[str]:
+        """Fetch quotes for `tickers` now, in one provider call; returns the tickers whose price changed."""
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return []
+        for ticker in tickers:
+            self._reconcile(ticker)
+        metrics.FETCHED_SYMBOLS.inc(len(tickers))
+        try:
+            with metrics.stage("quotes"):
+                quotes = self.provider_fn().quotes(tickers)
+        except Exception:
+            metrics.FETCHES.inc(outcome="error")
+            logger.exception("Quote refresh failed for %d ticker(s)", len(tickers))
+            quotes = {}
+            ok = False
+        else:
+            metrics.FETCHES.inc(outcome="ok")
+            ok = True
+
+        with self._lock:
+            self.refreshes += 1
+            self.failures += not ok
+        # A failed fetch also waits out the TTL before the next attempt
+        return self._apply(tickers, quotes)
+
+    def set_quotes(self, quotes: Dict[str, Tuple[float, str]]) -> List[str]:
+        """
+        Set quotes directly ({ticker: (price, "YYYY-MM-DD")}), as if just fetched; returns
+        the tickers whose price changed. Held in memory only (used by SimulatedTicks).
+        """
+        for ticker in quotes:
+            self._reconcile(ticker)
+        return self._apply(list(quotes), quotes)
+
+    def _apply(self, tickers: List[str], quotes: Dict[str, Tuple[float, str]]) -> List[str]:
+        changed = []
+        now = time.monotonic()
+        wall = time.time()
+        with self._lock:
+            for ticker in tickers:
+                slot = self._slot(ticker)
+                self._fetched[slot] = now
+                if ticker not in quotes:
+                    continue
+                price, day = quotes[ticker]
+                day = _day_ordinal(day)
+                if not np.isfinite(price) or day < self._day[slot]:
+                    continue
+                if day == self._day[slot] and price == self._price[slot]:
+                    continue
+                self._price[slot] = price
+                self._day[slot] = day
+                self._version += 1
+                self._seq[slot] = self._version
+                self._changed_at[slot] = wall
+                changed.append(ticker)
+        if changed:
+            price_events.publish(changed)
+        return changed
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        """Forget quotes (all, or one ticker); the next lookup starts from the stored close again."""
+        with self._lock:
+            slots = list(self._slots.values()) if ticker is None else [self._slots.get(ticker)]
+            for slot in slots:
+                if slot is None:
+                    continue
+                self._price[slot] = np.nan
+                self._day[slot] = NO_DAY
+                self._fetched[slot] = -np.inf
+                self._store_sigs[slot] = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n = len(self._slots)
+            now = time.monotonic()
+            return {
+                "entries": n,
+                "stale": int((now - self._fetched[:n] >= self.ttl).sum()),
+                "ttl": self.ttl,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+            }
+
+
+quote_table = QuoteTable()
@@ -0,0 +1,285 @@
+"""
+Risk analytics on the stock_data histories: returns matrix, covariance and
+correlation, per-asset and portfolio volatility, beta against a benchmark, and
+historical / parametric VaR.
+State is kept per ticker set (the portfolio's tickers plus the benchmark), so
+cost scales with the portfolio rather than the whole ticker universe. Both the
+sample covariance (running sums and cross-products) and the EWMA covariance
+(RiskMetrics, lambda=0.94) are updated in place when the store only gained
+newer trading days. Days without a return for a ticker (before its first close,
+or missing from its history) are left out of its moments rather than counted as
+0%: sums are kept per pair of tickers over the days both have a return.
+Returns can also be taken from the store's weekly or monthly bars (e.g. for
+multi-year betas), which reads a fraction of the daily history.
+"""
+
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.lots import Lots
+from backend.priceCache import file_signature
+from backend.quotes import quote_table
+from backend.timeSeries import align_prices, load_histories, window_start
+
+TRADING_DAYS = 252
+# Return observations per year at each price store resolution
+PERIODS_PER_YEAR = {"daily": TRADING_DAYS, "weekly": 52, "monthly": 12}
+DEFAULT_YEARS = 5
+DEFAULT_BENCHMARK = "SPY"
+EWMA_LAMBDA = 0.94
+MAX_CACHED_STATES = 16
+MAX_MATRIX_TICKERS = 100
+
+
+class _RiskState:
+    def __init__(self, tickers: List[str], years: int):
+        self.tickers = tickers
+        self.years = years
+        self.file_sigs = None
+        self.marks: List[Tuple[int, np.datetime64]] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        n = len(self.tickers)
+        self.dates = np.empty(0, dtype="M8[D]")
+        # NaN where a ticker has no return that day
+        self.returns = np.empty((0, n))
+        self.last_prices = np.full(n, np.nan)
+        self.count = 0
+        # [i, j]: days both i and j have a return, and the sum of i's returns over those days
+        self.pair_count = np.zeros((n, n))
+        self.pair_sums = np.zeros((n, n))
+        self.cross = np.zeros((n, n))
+        # EWMA cross-products and the decay weight each pair has seen, for normalizing
+        self.ewma = np.zeros((n, n))
+        self.ewma_weight = np.zeros((n, n))
+
+    def _add_rows(self, dates: np.ndarray, histories) -> None:
+        """Turn the histories' prices on `dates` into returns and fold them into the running moments."""
+        if len(dates) == 0:
+            return
+        # Forward-filled, so a return after a gap spans it rather than being lost
+        prices = align_prices(histories, dates)
+        prev = np.vstack([self.last_prices, prices[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = prices / prev - 1.0
+        # No return on the window's first day, before a ticker's first close, or on a
+        # day missing from its history (the filled price would read as 0%)
+        valid = np.isfinite(rets) & _observed(histories, dates)
+        rets = np.where(valid, rets, np.nan)
+        r0 = np.where(valid, rets, 0.0)
+        m = valid.astype("f8")
+
+        k = len(rets)
+        self.count += k
+        self.pair_count += m.T @ m
+        self.pair_sums += r0.T @ m
+        self.cross += r0.T @ r0
+        # k EWMA steps at once: cov = lambda^k * cov + sum_i (1-lambda) lambda^(k-1-i) r_i r_i'
+        decay = (1.0 - EWMA_LAMBDA) * EWMA_LAMBDA ** np.arange(k - 1, -1, -1)
+        self.ewma = EWMA_LAMBDA ** k * self.ewma + (r0 * decay[:, None]).T @ r0
+        self.ewma_weight = EWMA_LAMBDA ** k * self.ewma_weight + (m * decay[:, None]).T @ m
+
+        self.dates = np.concatenate([self.dates, dates])
+        self.returns = np.vstack([self.returns, rets])
+        last = prices[-1]
+        self.last_prices = np.where(np.isnan(last), self.last_prices, last)
+
+    def refresh(self, histories) -> str:
+        marks = [(len(d), d[-1] if len(d) else np.datetime64("NaT")) for d, _ in histories]
+        if marks == self.marks:
+            return "cached"
+        if len(self.dates):
+            last = self.dates[-1]
+            appended_only = all(
+                len(d) >= n and (not n or d[n - 1] == end) and (len(d) == n or d[n] > last)
+                for (n, end), (d, _) in zip(self.marks, histories)
+            )
+            if appended_only and window_start(max(e for _, e in marks), self.years) == window_start(last, self.years):
+                new_dates = np.unique(np.concatenate([d[n:] for (n, _), (d, _) in zip(self.marks, histories)]))
+                self._add_rows(new_dates, histories)
+                self.marks = marks
+                return "incremental"
+
+        self._reset()
+        self.marks = marks
+        ends = [d[-1] for d, _ in histories if len(d)]
+        if not ends:
+            return "rebuild"
+        start = window_start(max(ends), self.years)
+        dates = np.unique(np.concatenate([d[d >= start] for d, _ in histories if len(d)]))
+        self._add_rows(dates, histories)
+        return "rebuild"
+
+    def mean(self) -> np.ndarray:
+        """Mean return per ticker over the days it has one."""
+        n = np.diag(self.pair_count)
+        return np.divide(np.diag(self.pair_sums), n, out=np.zeros(len(n)), where=n > 0)
+
+    def covariance(self, method: str = "sample") -> np.ndarray:
+        if method == "ewma":
+            cov = np.divide(self.ewma, self.ewma_weight, out=np.zeros_like(self.ewma), where=self.ewma_weight > 0)
+        else:
+            n = self.pair_count
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = (self.cross - self.pair_sums * self.pair_sums.T / n) / (n - 1)
+            cov = np.where(n >= 2, cov, 0.0)
+        if len(cov) and (self.pair_count != self.pair_count.max()).any():
+            # Pairs estimated over different days need not form a valid covariance
+            cov = _nearest_psd(cov)
+        return cov
+
+    def complete_returns(self) -> np.ndarray:
+        """Rows of `returns` on which every ticker has a return."""
+        return self.returns[np.isfinite(self.returns).all(axis=1)]
+
+
+def _observed(histories, dates: np.ndarray) -> np.ndarray:
+    """dates x tickers: the ticker's history has a row on that date."""
+    out = np.zeros((len(dates), len(histories)), dtype=bool)
+    for col, (tdates, _) in enumerate(histories):
+        if len(tdates):
+            pos = np.minimum(np.searchsorted(tdates, dates), len(tdates) - 1)
+            out[:, col] = tdates[pos] == dates
+    return out
+
+
+def _nearest_psd(cov: np.ndarray) -> np.ndarray:
+    evals, evecs = np.linalg.eigh((cov + cov.T) / 2)
+    return (evecs * np.clip(evals, 0.0, None)) @ evecs.T
+
+
+class RiskCache:
+    def __init__(self, max_entries: int = MAX_CACHED_STATES):
+        self.max_entries = max_entries
+        self._states: "OrderedDict[tuple, _RiskState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tickers: List[str], years: int = DEFAULT_YEARS,
+            resolution: str = "daily") -> Tuple[_RiskState, str]:
+        key = (tuple(tickers), years, resolution)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = _RiskState(list(tickers), years)
+                self._states[key] = state
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+            self._states.move_to_end(key)
+            sigs = [file_signature(t) for t in tickers]
+            if sigs == state.file_sigs:
+                return state, "cached"
+            mode = state.refresh(load_histories(tickers, resolution))
+            state.file_sigs = sigs
+        return state, mode
+
+
+risk_cache = RiskCache()
+
+
+def holdings_from_lots(lots: Lots) -> Tuple[List[str], np.ndarray]:
+    """Aggregate lots into (tickers, current market value per ticker), skipping tickers without prices."""
+    ok = lots.ok
+    ids, codes = np.unique(lots.ticker_id[ok], return_inverse=True)
+    tickers = lots.symbols[ids].astype(str)
+    qty = np.bincount(codes.reshape(-1), weights=lots.qty[ok].astype("f8"), minlength=len(tickers))
+    prices = quote_table.prices(tickers.tolist())
+    values = qty * prices
+    keep = np.isfinite(values) & (values != 0)
+    return tickers[keep].tolist(), values[keep]
+
+
+def portfolio_risk(
+    tickers: List[str],
+    values: np.ndarray,
+    benchmark: str = DEFAULT_BENCHMARK,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    method: str = "sample",
+    years: int = DEFAULT_YEARS,
+    resolution: str = "daily",
+) -> Dict:
+    """
+    Annualized volatility/covariance, beta vs `benchmark` and `horizon_days` VaR at
+    `confidence` for a portfolio holding `values` (market value per ticker), from
+    daily, weekly or monthly returns (`resolution`).
+    """
+    if method not in ("sample", "ewma"):
+        raise ValueError("method must be 'sample' or 'ewma'.")
+    if resolution not in PERIODS_PER_YEAR:
+        raise ValueError(f"resolution must be one of {', '.join(PERIODS_PER_YEAR)}.")
+    if not 0.5 < confidence < 1.0:
+        raise ValueError("confidence must be between 0.5 and 1.")
+    if not tickers:
+        raise ValueError("No priced holdings in portfolio.")
+
+    benchmark = benchmark.strip().upper()
+    universe = list(tickers) + ([benchmark] if benchmark not in tickers else [])
+    state, mode = risk_cache.get(universe, years, resolution)
+    n = len(tickers)
+    periods = PERIODS_PER_YEAR[resolution]
+
+    cov_all = state.covariance(method)
+    cov = cov_all[:n, :n]
+    total_value = float(np.sum(values))
+    weights = np.asarray(values, dtype="f8") / total_value
+
+    asset_var = np.clip(np.diag(cov), 0.0, None)
+    asset_vol = np.sqrt(asset_var * periods)
+    port_var = float(weights @ cov @ weights)
+    # Per return period (a day, week or month)
+    port_vol_period = np.sqrt(max(port_var, 0.0))
+
+    b = universe.index(benchmark)
+    bench_var = cov_all[b, b]
+    has_bench = bench_var > 0
+    asset_beta = (cov_all[:n, b] / bench_var) if has_bench else np.full(n, np.nan)
+    port_beta = float(weights @ asset_beta) if has_bench else None
+
+    # Square-root-of-time from the return period to the horizon
+    scale = np.sqrt(horizon_days * periods / TRADING_DAYS)
+    z = NormalDist().inv_cdf(confidence)
+    var_param = z * port_vol_period * scale
+    # Days on which every holding has a return
+    held = state.returns[:, :n]
+    port_rets = held[np.isfinite(held).all(axis=1)] @ weights
+    var_hist = float(-np.quantile(port_rets, 1.0 - confidence) * scale) if len(port_rets) else None
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sd = np.sqrt(asset_var)
+        corr = cov / np.outer(sd, sd)
+    corr = np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(corr, 1.0)
+
+    result = {
+        "mode": mode,
+        "method": method,
+        "resolution": resolution,
+        "observations": int(state.count),
+        "start": str(state.dates[0]) if len(state.dates) else None,
+        "end": str(state.dates[-1]) if len(state.dates) else None,
+        "benchmark": benchmark if has_bench else None,
+        "tickers": list(tickers),
+        "weights": weights.round(6).tolist(),
+        "volatility": asset_vol.round(6).tolist(),
+        "beta": [None if not np.isfinite(x) else round(float(x), 6) for x in asset_beta],
+        "portfolio": {
+            "value": round(total_value, 2),
+            "volatility": round(float(port_vol_period * np.sqrt(periods)), 6),
+            "beta": None if port_beta is None else round(port_beta, 6),
+            "confidence": confidence,
+            "horizon_days": horizon_days,
+            "var_parametric": round(float(var_param), 6),
+            "var_historical": None if var_hist is None else round(var_hist, 6),
+            "var_parametric_value": round(float(var_param) * total_value, 2),
+            "var_historical_value": None if var_hist is None else round(var_hist * total_value, 2),
+        },
+    }
+    if n <= MAX_MATRIX_TICKERS:
+        result["covariance"] = (cov * periods).round(8).tolist()
+        result["correlation"] = corr.round(6).tolist()
+    return result
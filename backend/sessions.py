@@ -0,0 +1,244 @@
+"""
+Per-session current portfolio, held in memory.
+Each browser session (an opaque id in the equiviz_sid cookie) owns one
+immutable Portfolio snapshot: its name, the CSV rows and the parsed lots
+(backend.lots, shared with any other holder of the same rows). Edits
+swap in a new snapshot under a lock, so readers never see a half-written
+portfolio and never re-read CSVs.
+Persistence is write-behind: changed sessions are flushed to
+backend/current_portfolio/<session id>/<name>.csv by a background thread, and a
+session that is not in memory (server restart, idle eviction) is reloaded from
+there on first access.
+"""
+
+import atexit
+import csv
+import io
+import itertools
+import os
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend.lots import Lots, parse_lots
+
+BASE_DIR = Path(__file__).resolve().parent
+CURRENT_PORTFOLIO_DIR = BASE_DIR / "current_portfolio"
+SESSION_COOKIE = "equiviz_sid"
+PORTFOLIO_HEADER = ["Asset", "Quantity", "Date Acquired"]
+
+FLUSH_INTERVAL_SECONDS = 2.0
+IDLE_TTL_SECONDS = 12 * 3600
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+# Versions are unique across sessions, so (session, version) can key shared caches
+_versions = itertools.count(1)
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def valid_session_id(sid: str | None) -> bool:
+    # Session ids become directory names; only accept what new_session_id produces
+    return bool(sid) and bool(_SESSION_ID_RE.match(sid))
+
+
+class Portfolio:
+    """Immutable snapshot of one session's current portfolio."""
+
+    __slots__ = ("session_id", "name", "rows", "lots", "version", "modified")
+
+    def __init__(self, session_id: str, name: str, rows: List[list], modified: float | None = None):
+        self.session_id = session_id
+        self.name = name
+        self.rows = [list(r) for r in rows]
+        self.lots: Lots = parse_lots(self.rows)
+        self.version = next(_versions)
+        # Wall-clock time of the change (Last-Modified); the file's mtime when reloaded from disk
+        self.modified = time.time() if modified is None else modified
+
+    @property
+    def signature(self) -> tuple:
+        return ("session", self.session_id, self.version)
+
+    @property
+    def tickers(self) -> List[str]:
+        return [t for t in self.lots.tickers if t]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.csv"
+
+    def to_csv(self) -> str:
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(PORTFOLIO_HEADER)
+        writer.writerows(self.rows)
+        return buf.getvalue()
+
+
+def read_portfolio_csv(text: str) -> List[list]:
+    """Data rows of a portfolio CSV (header dropped, blank lines skipped)."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    return rows[1:]
+
+
+class SessionStore:
+    def __init__(self, persist_dir: Path | None = CURRENT_PORTFOLIO_DIR,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, idle_ttl: float = IDLE_TTL_SECONDS):
+        self.persist_dir = persist_dir
+        self.flush_interval = flush_interval
+        self.idle_ttl = idle_ttl
+        self._portfolios: Dict[str, Portfolio] = {}
+        self._last_used: Dict[str, float] = {}
+        self._dirty: Dict[str, Portfolio] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+
+    # ---- reads ----
+
+    def get(self, sid: str) -> Portfolio | None:
+        with self._lock:
+            portfolio = self._portfolios.get(sid)
+            if portfolio is not None:
+                self._last_used[sid] = time.monotonic()
+                return portfolio
+        portfolio = self._load(sid)
+        if portfolio is None:
+            return None
+        with self._lock:
+            # Another request may have loaded or replaced it meanwhile; keep that one
+            portfolio = self._portfolios.setdefault(sid, portfolio)
+            self._last_used[sid] = time.monotonic()
+        return portfolio
+
+    def require(self, sid: str) -> Portfolio:
+        portfolio = self.get(sid)
+        if portfolio is None:
+            raise FileNotFoundError("No current portfolio found.")
+        return portfolio
+
+    # ---- writes ----
+
+    def set(self, sid: str, name: str, rows: List[list]) -> Portfolio:
+        """Replace the session's portfolio; persisted on the next flush."""
+        portfolio = Portfolio(sid, name, rows)
+        with self._lock:
+            self._portfolios[sid] = portfolio
+            self._last_used[sid] = time.monotonic()
+            if self.persist_dir is not None:
+                self._dirty[sid] = portfolio
+        self._ensure_flusher()
+        return portfolio
+
+    def drop(self, sid: str) -> None:
+        with self._lock:
+            self._portfolios.pop(sid, None)
+            self._last_used.pop(sid, None)
+            self._dirty.pop(sid, None)
+        session_dir = self._session_dir(sid)
+        if session_dir is not None:
+            self._clear_dir(session_dir)
+
+    # ---- persistence ----
+
+    def _session_dir(self, sid: str) -> Path | None:
+        if self.persist_dir is None or not valid_session_id(sid):
+            return None
+        return self.persist_dir / sid
+
+    def _load(self, sid: str) -> Portfolio | None:
+        session_dir = self._session_dir(sid)
+        if session_dir is None or not session_dir.is_dir():
+            return None
+        csv_files = sorted(session_dir.glob("*.csv"))
+        if not csv_files:
+            return None
+        path = csv_files[0]
+        try:
+            rows = read_portfolio_csv(path.read_text(encoding="utf-8"))
+            modified = path.stat().st_mtime
+        except OSError:
+            return None
+        return Portfolio(sid, path.stem, rows, modified)
+
+    @staticmethod
+    def _clear_dir(session_dir: Path, keep: str | None = None) -> None:
+        if not session_dir.is_dir():
+            return
+        for item in session_dir.iterdir():
+            if item.is_file() and item.name != keep:
+                item.unlink()
+
+    def _write(self, portfolio: Portfolio) -> None:
+        session_dir = self._session_dir(portfolio.session_id)
+        if session_dir is None:
+            return
+        session_dir.mkdir(parents=True, exist_ok=True)
+        out_path = session_dir / portfolio.filename
+        tmp_path = session_dir / f".{portfolio.filename}.tmp"
+        tmp_path.write_text(portfolio.to_csv(), encoding="utf-8")
+        os.replace(tmp_path, out_path)
+        # A rename (new portfolio name) leaves the old file behind otherwise
+        self._clear_dir(session_dir, keep=out_path.name)
+
+    def flush(self) -> int:
+        """Write every changed session now. Returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            for portfolio in dirty.values():
+                try:
+                    self._write(portfolio)
+                except OSError:
+                    # Keep it dirty unless a newer edit already replaced it
+                    with self._lock:
+                        self._dirty.setdefault(portfolio.session_id, portfolio)
+            return len(dirty)
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_ttl from memory (they reload from disk)."""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [sid for sid, used in self._last_used.items() if used < cutoff and sid not in self._dirty]
+            if self.persist_dir is None:
+                # Nothing to reload from; keep them
+                return 0
+            for sid in idle:
+                self._portfolios.pop(sid, None)
+                self._last_used.pop(sid, None)
+        return len(idle)
+
+    def _ensure_flusher(self) -> None:
+        if self.persist_dir is None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-flush", daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            self.evict_idle()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"sessions": len(self._portfolios), "dirty": len(self._dirty)}
+
+    def active_tickers(self) -> List[str]:
+        """Tickers held by any portfolio currently in memory."""
+        with self._lock:
+            portfolios = list(self._portfolios.values())
+        return sorted({t for p in portfolios for t in p.tickers})
+
+
+session_store = SessionStore()
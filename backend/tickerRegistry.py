@@ -0,0 +1,161 @@
+"""
+Local ticker registry so validation doesn't hit Yahoo on every form submit.
+Known symbols come from backend/stock_data, the bundled cache/ datasets and an
+importable symbol list (backend/symbols.txt). Remote checks are only made for
+symbols the registry has never seen, and their results are TTL-cached
+(positive and negative) in memory.
+"""
+
+import csv
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from backend import priceStore
+
+BASE_DIR = Path(__file__).resolve().parent
+CACHE_DATA_DIR = BASE_DIR.parent / "cache"
+SYMBOLS_FILE = BASE_DIR / "symbols.txt"
+
+POSITIVE_TTL_SECONDS = 7 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 3600
+
+
+def _normalize(symbol: str) -> str:
+    return str(symbol).strip().upper()
+
+
+def _read_symbol_file(path: Path) -> List[str]:
+    """One symbol per line, or a CSV whose first column (or 'Symbol'/'Ticker' column) holds symbols."""
+    with path.open(newline="", encoding="utf-8") as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    col = 0
+    for name in ("symbol", "ticker", "asset"):
+        if name in header:
+            col = header.index(name)
+            rows = rows[1:]
+            break
+    return [_normalize(row[col]) for row in rows if len(row) > col and row[col].strip()]
+
+
+def _cache_dataset_symbols() -> Set[str]:
+    symbols = set()
+    if not CACHE_DATA_DIR.exists():
+        return symbols
+    for path in CACHE_DATA_DIR.glob("*_5yr_history.csv"):
+        symbols.add(_normalize(path.name[:-len("_5yr_history.csv")]))
+    for path in CACHE_DATA_DIR.glob("*_stocks_*.csv"):
+        # Wide layout: Date,<TICKER>,<TICKER>,...
+        with path.open(newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        symbols.update(_normalize(h) for h in header[1:] if h.strip())
+    return symbols
+
+
+class TickerRegistry:
+    def __init__(self):
+        self._known: Set[str] | None = None
+        self._remote: Dict[str, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+        self.remote_checks = 0
+
+    def _load(self) -> Set[str]:
+        known = set(priceStore.list_tickers())
+        known.update(_cache_dataset_symbols())
+        if SYMBOLS_FILE.exists():
+            known.update(_read_symbol_file(SYMBOLS_FILE))
+        return known
+
+    def _known_set(self) -> Set[str]:
+        with self._lock:
+            if self._known is None:
+                self._known = self._load()
+            return self._known
+
+    def reload(self) -> None:
+        with self._lock:
+            self._known = None
+
+    def is_known(self, symbol: str) -> bool | None:
+        """
+        Local-only lookup: True if known, False if a cached remote check said it
+        doesn't exist, None if the registry has no opinion.
+        """
+        symbol = _normalize(symbol)
+        known = self._known_set()
+        if symbol in known:
+            return True
+        if priceStore.has_history(symbol):
+            # Fetched since the registry was built
+            with self._lock:
+                known.add(symbol)
+            return True
+        with self._lock:
+            cached = self._remote.get(symbol)
+            if cached is not None:
+                exists, expires = cached
+                if time.time() < expires:
+                    return exists
+                del self._remote[symbol]
+        return None
+
+    def rejected(self, symbols: Iterable[str]) -> List[str]:
+        """Symbols a cached negative result says do not exist (no remote calls)."""
+        return [s for s in dict.fromkeys(_normalize(s) for s in symbols) if self.is_known(s) is False]
+
+    def verify(self, symbol: str, provider=None) -> bool:
+        """
+        True if the symbol exists. Uses the registry first and only asks the
+        provider for symbols it has never seen; provider errors propagate and are not cached.
+        """
+        symbol = _normalize(symbol)
+        local = self.is_known(symbol)
+        if local is not None:
+            return local
+
+        if provider is None:
+            from backend.getStonks import get_provider
+            provider = get_provider()
+        with self._lock:
+            self.remote_checks += 1
+        exists = bool(provider.exists(symbol))
+
+        ttl = POSITIVE_TTL_SECONDS if exists else NEGATIVE_TTL_SECONDS
+        with self._lock:
+            self._remote[symbol] = (exists, time.time() + ttl)
+            if exists and self._known is not None:
+                self._known.add(symbol)
+        return exists
+
+    def import_symbols(self, path: Path) -> int:
+        """Merge a symbol list into backend/symbols.txt. Returns how many new symbols were added."""
+        incoming = set(_read_symbol_file(Path(path)))
+        existing = set(_read_symbol_file(SYMBOLS_FILE)) if SYMBOLS_FILE.exists() else set()
+        added = incoming - existing
+        if added:
+            SYMBOLS_FILE.write_text("\n".join(sorted(existing | incoming)) + "\n", encoding="utf-8")
+        with self._lock:
+            if self._known is not None:
+                self._known.update(incoming)
+        return len(added)
+
+    def symbols(self) -> List[str]:
+        return sorted(self._known_set())
+
+
+ticker_registry = TickerRegistry()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        count = ticker_registry.import_symbols(Path(sys.argv[2]))
+        print(f"Imported {count} new symbol(s) into {SYMBOLS_FILE}")
+    else:
+        print(f"{len(ticker_registry.symbols())} known symbol(s)")
+        print("Usage: python -m backend.tickerRegistry import <symbols.txt|symbols.csv>")
@@ -0,0 +1,207 @@
+"""
+Daily portfolio value time series for the Analysis page.
+Builds an aligned date x ticker price matrix from the price store and computes
+market value, cost basis and P&L for every day of the window in one vectorized
+pass over all lots. A lot counts from its acquisition date onwards, at the entry
+price the portfolio table uses (first close on/after the acquisition date).
+When the store only gained newer trading days, the cached series is extended
+by those rows instead of being rebuilt. A series can also be built from the
+store's weekly or monthly bars (one row per bar) for long-range charts; entry
+prices still come from the daily closes.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend import priceStore
+from backend.lots import Lots
+from backend.priceCache import file_signature
+
+DEFAULT_YEARS = 5
+MAX_CACHED_SERIES = 8
+
+
+def window_start(end: np.datetime64, years: int) -> np.datetime64:
+    # Same anchor as getStonks: Jan 1 of (end year - years)
+    end_year = end.astype("M8[Y]").astype(int) + 1970
+    return np.datetime64(date(int(end_year) - years, 1, 1), "D")
+
+
+def load_histories(tickers: List[str], resolution: str = "daily") -> List[Tuple[np.ndarray, np.ndarray]]:
+    out = []
+    for ticker in tickers:
+        recs = priceStore.open_records(ticker, resolution)
+        out.append((np.asarray(recs["Date"]), np.asarray(recs["Adj Close"], dtype="f8")))
+    return out
+
+
+def align_prices(histories: List[Tuple[np.ndarray, np.ndarray]], dates: np.ndarray) -> np.ndarray:
+    """Forward-filled price matrix (len(dates) x tickers); NaN before a ticker's first close."""
+    prices = np.full((len(dates), len(histories)), np.nan)
+    for col, (tdates, adj) in enumerate(histories):
+        if len(tdates) == 0:
+            continue
+        pos = np.searchsorted(tdates, dates, side="right") - 1
+        valid = pos >= 0
+        prices[valid, col] = adj[pos[valid]]
+    return prices
+
+
+def _entry_prices(histories, codes: np.ndarray, acquired: np.ndarray) -> np.ndarray:
+    entry = np.full(len(codes), np.nan)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(histories) + 1))
+    for col, (tdates, adj) in enumerate(histories):
+        members = order[bounds[col]:bounds[col + 1]]
+        if len(members) == 0 or len(tdates) == 0:
+            continue
+        idx = np.searchsorted(tdates, acquired[members], side="left")
+        ok = idx < len(tdates)
+        entry[members[ok]] = adj[idx[ok]]
+    return entry
+
+
+class _SeriesState:
+    def __init__(self, tickers, codes, qty, acquired, years, resolution="daily"):
+        self.tickers = tickers
+        self.codes = codes
+        self.qty = qty
+        self.acquired = acquired
+        self.years = years
+        self.resolution = resolution
+        self.dates = np.empty(0, dtype="M8[D]")
+        self.value = np.empty(0)
+        self.cost = np.empty(0)
+        self.held = np.zeros(len(tickers))
+        self.cost_held = 0.0
+        self.counted = np.zeros(len(codes), dtype=bool)
+        self.marks: List[Tuple[int, np.datetime64]] = []
+        self.file_sigs: List | None = None
+
+    def _store_marks(self, histories) -> List[Tuple[int, np.datetime64]]:
+        return [(len(d), d[-1] if len(d) else np.datetime64("NaT")) for d, _ in histories]
+
+    def rebuild(self, histories) -> None:
+        ends = [d[-1] for d, _ in histories if len(d)]
+        self.marks = self._store_marks(histories)
+        if not ends:
+            return
+        end = max(ends)
+        start = window_start(end, self.years)
+        all_dates = np.unique(np.concatenate([d[(d >= start)] for d, _ in histories if len(d)]))
+        self.dates = np.empty(0, dtype="M8[D]")
+        self.value = np.empty(0)
+        self.cost = np.empty(0)
+        self.held = np.zeros(len(self.tickers))
+        self.cost_held = 0.0
+        self.counted = np.zeros(len(self.codes), dtype=bool)
+        self._extend(histories, all_dates)
+
+    def _extend(self, histories, new_dates: np.ndarray) -> None:
+        """Append rows for `new_dates` (all later than self.dates)."""
+        if len(new_dates) == 0:
+            return
+        prices = align_prices(histories, new_dates)
+        n_days, n_tickers = prices.shape
+
+        # Lots not yet counted that start on or before the last new date
+        pending = np.flatnonzero(~self.counted & (self.acquired <= new_dates[-1]))
+        # Entry prices are daily closes, as in the portfolio table, whatever the series resolution
+        daily = histories if self.resolution == "daily" or not len(pending) else load_histories(self.tickers)
+        entry = _entry_prices(daily, self.codes[pending], self.acquired[pending])
+        usable = np.isfinite(entry)
+        pending, entry = pending[usable], entry[usable]
+        # Lots acquired before the window start count from its first day
+        start_row = np.searchsorted(new_dates, self.acquired[pending], side="left")
+
+        delta_qty = np.zeros((n_days, n_tickers))
+        np.add.at(delta_qty, (start_row, self.codes[pending]), self.qty[pending])
+        held = np.cumsum(delta_qty, axis=0) + self.held
+        delta_cost = np.bincount(start_row, weights=self.qty[pending] * entry, minlength=n_days)
+        cost = np.cumsum(delta_cost) + self.cost_held
+
+        value = np.einsum("dt,dt->d", held, np.nan_to_num(prices))
+
+        self.dates = np.concatenate([self.dates, new_dates])
+        self.value = np.concatenate([self.value, value])
+        self.cost = np.concatenate([self.cost, cost])
+        self.held = held[-1]
+        self.cost_held = float(cost[-1])
+        self.counted[pending] = True
+
+    def refresh(self, histories) -> str:
+        """Bring the series up to date; returns "cached", "incremental" or "rebuild"."""
+        marks = self._store_marks(histories)
+        if marks == self.marks:
+            return "cached"
+        if len(self.dates):
+            last = self.dates[-1]
+            appended_only = True
+            for (old_n, old_end), (tdates, _) in zip(self.marks, histories):
+                # Earlier rows must be untouched and every new row must be newer than the series
+                if len(tdates) < old_n or (old_n and tdates[old_n - 1] != old_end):
+                    appended_only = False
+                    break
+                if len(tdates) > old_n and tdates[old_n] <= last:
+                    appended_only = False
+                    break
+            if appended_only:
+                new_dates = np.unique(np.concatenate([d[n:] for (n, _), (d, _) in zip(self.marks, histories)]))
+                self._extend(histories, new_dates)
+                self.marks = marks
+                # Slide the window start forward if the new days crossed into a new year
+                keep = self.dates >= window_start(self.dates[-1], self.years)
+                if not keep.all():
+                    self.dates, self.value, self.cost = self.dates[keep], self.value[keep], self.cost[keep]
+                return "incremental"
+        self.rebuild(histories)
+        return "rebuild"
+
+    def to_dict(self) -> Dict:
+        return {
+            "dates": np.datetime_as_string(self.dates, unit="D").tolist(),
+            "value": np.round(self.value, 2).tolist(),
+            "cost": np.round(self.cost, 2).tolist(),
+            "pnl": np.round(self.value - self.cost, 2).tolist(),
+        }
+
+
+class ValueSeriesCache:
+    def __init__(self, max_entries: int = MAX_CACHED_SERIES):
+        self.max_entries = max_entries
+        self._states: "OrderedDict[tuple, _SeriesState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, lots: Lots, years: int = DEFAULT_YEARS,
+            resolution: str = "daily") -> Tuple[_SeriesState, str]:
+        """
+        Series for `lots` (backend.lots.Lots) with one row per `resolution` bar. `key`
+        identifies the lot set (e.g. the portfolio file signature).
+        """
+        with self._lock:
+            state = self._states.get((key, years, resolution))
+            if state is None:
+                ok = lots.ok
+                ids, codes = np.unique(lots.ticker_id[ok], return_inverse=True)
+                state = _SeriesState(
+                    lots.symbols[ids].tolist(), codes.reshape(-1).astype(np.intp), lots.qty[ok].astype("f8"),
+                    lots.date[ok], years, resolution,
+                )
+                self._states[(key, years, resolution)] = state
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+            self._states.move_to_end((key, years, resolution))
+            # Cheap stat() check first so an unchanged store doesn't map every history
+            sigs = [file_signature(t) for t in state.tickers]
+            if sigs == state.file_sigs:
+                return state, "cached"
+            mode = state.refresh(load_histories(state.tickers, resolution))
+            state.file_sigs = sigs
+        return state, mode
+
+
+value_series_cache = ValueSeriesCache()
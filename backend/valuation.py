@@ -0,0 +1,108 @@
+"""
+Vectorized lot valuation used by the portfolio table.
+Lots (backend.lots) are grouped by ticker id, entry prices for all acquisition dates are found with
+one np.searchsorted over the ticker's sorted date array, and cost/value/return are
+computed as whole-column array operations. Current prices come from the quote
+table (backend.quotes), or with stored_only=True the last stored close, which needs
+no quote refresh and reads the memory-mapped records instead of building
+DataFrames. Formatting is left to the caller.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from backend import priceStore
+from backend.lots import Lots
+from backend.priceCache import price_cache
+from backend.quotes import quote_table
+
+
+def _price_arrays(ticker: str):
+    df = price_cache.get_df(ticker)
+    if df.empty or "Adj Close" not in df.columns:
+        return None
+    return df["Date"].to_numpy().astype("M8[D]"), df["Adj Close"].to_numpy(dtype="f8")
+
+
+def _stored_arrays(ticker: str):
+    # Reads the mapped record columns directly; no DataFrame is built or cached
+    recs = priceStore.open_records(ticker)
+    if not len(recs):
+        return None
+    return recs["Date"], recs["Adj Close"]
+
+
+def value_lots(lots: Lots, stored_only: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Entry price is the first close on/after the acquisition date (or the last close
+    if the lot is newer than the stored history); current price is the ticker's quote,
+    or its last stored close when `stored_only` (e.g. for catalog summaries).
+    """
+    n = len(lots)
+    entry = np.full(n, np.nan)
+    current = np.full(n, np.nan)
+    valued = np.zeros(n, dtype=bool)
+
+    if n:
+        # Group by ticker id; only the tickers present (a page may hold a few of many)
+        present, codes = np.unique(lots.ticker_id, return_inverse=True)
+        codes = codes.reshape(-1)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(present) + 1))
+        dates_all = lots.date
+        groups = []
+        for code, ticker_id in enumerate(present):
+            members = order[bounds[code]:bounds[code + 1]]
+            members = members[lots.ok[members]]
+            if len(members):
+                groups.append((lots.symbols[ticker_id], members))
+        if stored_only:
+            quotes = np.full(len(groups), np.nan)
+        else:
+            quotes = quote_table.prices([ticker for ticker, _ in groups])
+        arrays = _stored_arrays if stored_only else _price_arrays
+        for (ticker, members), quote in zip(groups, quotes):
+            prices = arrays(ticker)
+            if prices is None:
+                continue
+            dates, adj = prices
+            idx = np.searchsorted(dates, dates_all[members], side="left")
+            idx[idx >= len(dates)] = len(dates) - 1
+            entry[members] = adj[idx]
+            current[members] = quote if np.isfinite(quote) else float(adj[-1])
+            valued[members] = True
+
+    qty = lots.qty.astype("f8")
+    cost = entry * qty
+    value = current * qty
+    ret = (current - entry) * qty
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(entry != 0, (current - entry) / entry, 0.0)
+    return {
+        "entry": entry,
+        "current": current,
+        "cost": cost,
+        "value": value,
+        "ret": ret,
+        "pct": pct,
+        "valued": valued,
+    }
+
+
+def summarize(lots: Lots, valuation: Dict[str, np.ndarray]) -> Dict:
+    mask = valuation["valued"]
+    count = int(mask.sum())
+    cost_sum = float(valuation["cost"][mask].sum())
+    value_sum = float(valuation["value"][mask].sum())
+    net_ret = value_sum - cost_sum
+    return {
+        "count": count,
+        "qty": int(lots.qty[mask].sum()),
+        "avg_price": float(valuation["entry"][mask].mean()) if count else None,
+        "avg_price_today": float(valuation["current"][mask].mean()) if count else None,
+        "cost": cost_sum,
+        "value": value_sum,
+        "ret": net_ret,
+        "pct": (net_ret / cost_sum * 100) if cost_sum else 0.0,
+    }
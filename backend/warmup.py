@@ -0,0 +1,96 @@
+"""
+Optional warm start for freshly started workers (EQUIVIZ_WARMUP=1).
+app.py defers pandas, matplotlib and yfinance until a request needs them. When
+warm-up is enabled, a background thread waits until the server is up, then
+imports those libraries and loads the most recently used tickers' histories into
+price_cache, so the first real requests don't pay for either.
+Recency comes from the sessions' persisted portfolio files, newest first.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend import metrics, priceStore
+from backend.priceCache import price_cache
+from backend.riskAnal import DEFAULT_BENCHMARK
+from backend.sessions import CURRENT_PORTFOLIO_DIR, read_portfolio_csv
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DELAY_SECONDS = 1.0
+WARMUP_MAX_TICKERS = 200
+
+last_result: Dict | None = None
+
+
+def recent_tickers(persist_dir: Path | None = CURRENT_PORTFOLIO_DIR, limit: int = WARMUP_MAX_TICKERS) -> List[str]:
+    """Tickers of the most recently written session portfolios that have stored prices."""
+    if persist_dir is None or not persist_dir.is_dir():
+        return []
+    files = []
+    for path in persist_dir.glob("*/*.csv"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except OSError:
+            continue
+
+    tickers: Dict[str, None] = {}
+    for _, path in sorted(files, reverse=True):
+        try:
+            rows = read_portfolio_csv(path.read_text(encoding="utf-8"))
+        except OSError:
+            continue
+        for row in rows:
+            ticker = str(row[0]).strip().upper() if row else ""
+            if ticker and ticker not in tickers and priceStore.has_history(ticker):
+                tickers[ticker] = None
+        if len(tickers) >= limit:
+            break
+    # Risk views compare against the benchmark whatever the portfolio holds
+    if tickers and DEFAULT_BENCHMARK not in tickers and priceStore.has_history(DEFAULT_BENCHMARK):
+        tickers[DEFAULT_BENCHMARK] = None
+    return list(tickers)[:limit]
+
+
+def warm_up(persist_dir: Path | None = CURRENT_PORTFOLIO_DIR, limit: int = WARMUP_MAX_TICKERS) -> Dict:
+    """Import the deferred libraries and preload recent tickers into price_cache."""
+    global last_result
+    start = time.perf_counter()
+    with metrics.stage("warmup_imports"):
+        import pandas  # noqa: F401
+        import yfinance  # noqa: F401
+
+        from backend.portAnal import load_pyplot
+        load_pyplot()
+    imported = time.perf_counter() - start
+
+    tickers = recent_tickers(persist_dir, limit)
+    with metrics.stage("warmup_prices"):
+        loaded = sum(1 for t in tickers if not price_cache.get_df(t).empty)
+
+    last_result = {
+        "tickers": len(tickers),
+        "loaded": loaded,
+        "import_seconds": round(imported, 3),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return last_result
+
+
+def start_warmup(persist_dir: Path | None = CURRENT_PORTFOLIO_DIR, delay: float = WARMUP_DELAY_SECONDS,
+                 limit: int = WARMUP_MAX_TICKERS) -> threading.Thread:
+    """Run warm_up on a daemon thread after `delay` seconds (time for the server to start listening)."""
+    def run():
+        time.sleep(delay)
+        try:
+            warm_up(persist_dir, limit)
+        except Exception:
+            # Best effort: a failed warm-up only means the first requests are slower
+            logger.exception("Warm-up failed")
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
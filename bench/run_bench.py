@@ -0,0 +1,481 @@
+"""
+Benchmark suite for EquiViz hot paths.
+Generates synthetic price histories (FakeProvider random walks) and portfolios
+at several scales in a temp directory, then times:
+- backend.lots: parsing rows (cold and memoized) and aggregating identical lots
+- backend.liveUpdates: re-valuing one ticker's lots, and the SSE stream from a tick to its delta event
+- backend.quotes: one batch quote refresh for every ticker, and warm latest-price lookups
+- backend.chartData: LTTB-downsampled 5-year price series for up to 50 tickers (cold and cached)
+- app._enrich_rows, app._load_stock_df (cold and warm)
+- getStonks._update_symbol with a FakeProvider (up to date and appending days)
+- portAnal.run_portfolio_analysis (cold render and cache hit)
+- the saved-portfolio catalog: cold index build, no-op sync and search/sort pages
+- every Flask route, through the test client, plus 304 revalidations and a gzipped page
+- cold start: `import app` and the first GET / in a fresh interpreter, plus
+  which heavy libraries (pandas, matplotlib, yfinance) that import pulled in
+
+Usage:
+    python -m bench.run_bench                                  # tiny + small
+    python -m bench.run_bench --scales all --out bench/results/HEAD.json
+    python -m bench.run_bench --baseline bench/results/main.json --threshold 1.25
+
+With --baseline, the run exits non-zero if any benchmark's median is more than
+`threshold` times the baseline median (ignoring differences under --min-delta),
+or if `import app` now eagerly loads a heavy library the baseline did not.
+"""
+
+import argparse
+import io
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# scale name -> (lots, tickers)
+SCALES = {
+    "tiny": (10, 10),
+    "small": (1_000, 100),
+    "medium": (10_000, 1_000),
+    "large": (100_000, 5_000),
+}
+# scale name -> saved portfolios in the catalog
+CATALOG_SIZES = {"tiny": 10, "small": 1_000, "medium": 10_000, "large": 10_000}
+DEFAULT_SCALES = ["tiny", "small"]
+HISTORY_START = date(2021, 1, 1)
+
+# Libraries app.py defers until a request needs them
+HEAVY_MODULES = ("pandas", "matplotlib", "yfinance")
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+app.app.test_client().get("/")
+first = time.perf_counter() - start
+print(json.dumps({"import": imported, "first": first, "eager": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _time(fn: Callable, repeat: int, setup: Callable | None = None) -> Dict:
+    # One untimed call so first-use costs (template compile, deferred imports) don't skew the median;
+    # cold start is measured separately by run_startup
+    if setup is not None:
+        setup()
+    fn()
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "mean": statistics.fmean(runs),
+        "runs": repeat,
+    }
+
+
+def _synthetic_rows(n_lots: int, tickers: List[str], seed: int = 0) -> List[list]:
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64(HISTORY_START), np.datetime64(date.today()), dtype="M8[D]")
+    picks = rng.integers(0, len(tickers), n_lots)
+    qty = rng.integers(1, 500, n_lots)
+    acquired = days[rng.integers(0, len(days), n_lots)]
+    return [[tickers[p], str(q), str(d)] for p, q, d in zip(picks, qty, acquired)]
+
+
+def _rows_csv(rows: List[list]) -> str:
+    return "Asset,Quantity,Date Acquired\n" + "\n".join(",".join(r) for r in rows) + "\n"
+
+
+def run_startup(repeat: int) -> tuple:
+    """Cold-start timings from fresh interpreters; returns (results, eagerly imported heavy modules)."""
+    runs = {"startup/import app": [], "startup/first GET /": [], "startup/process": []}
+    eager: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, capture_output=True, text=True,
+                             check=True).stdout
+        runs["startup/process"].append(time.perf_counter() - start)
+        data = json.loads(out.strip().splitlines()[-1])
+        runs["startup/import app"].append(data["import"])
+        runs["startup/first GET /"].append(data["first"])
+        eager = data["eager"]
+
+    results = {}
+    for name, times in runs.items():
+        results[name] = {"median": statistics.median(times), "min": min(times), "mean": statistics.fmean(times),
+                         "runs": repeat}
+        print(f"  {name:<55} {results[name]['median'] * 1000:10.2f} ms")
+    if eager:
+        print(f"  ! import app eagerly loads: {', '.join(eager)}")
+    return results, eager
+
+
+class Bench:
+    def __init__(self, workdir: Path, repeat: int):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.results: Dict[str, Dict] = {}
+
+        # Import after sys.path is set; point every on-disk location at the temp dir
+        import app as app_module
+        from backend import getStonks, lots, portAnal, priceStore, sessions
+        from backend.catalog import Catalog, catalog
+        from backend.priceCache import price_cache
+        from backend.liveUpdates import LiveValuation, SimulatedTicks
+        from backend.quotes import quote_table
+        from backend.chartData import price_series_cache
+        from backend.providers import FakeProvider
+
+        self.app_module = app_module
+        self.getStonks = getStonks
+        self.portAnal = portAnal
+        self.lots = lots
+        self.price_cache = price_cache
+        self.quote_table = quote_table
+        self.price_series_cache = price_series_cache
+        self.priceStore = priceStore
+
+        priceStore.STOCK_DATA_DIR = workdir / "stock_data"
+        priceStore.STOCK_DATA_DIR.mkdir(parents=True)
+        portAnal.CHART_CACHE_DIR = workdir / "chart_cache"
+        app_module.BACKEND_DIR = workdir
+        (workdir / "saved_portfolios").mkdir()
+        catalog.directory = workdir / "saved_portfolios"
+        self.catalog = catalog
+        self.Catalog = Catalog
+        self.LiveValuation = LiveValuation
+        self.SimulatedTicks = SimulatedTicks
+        app_module.session_store = sessions.SessionStore(persist_dir=None)
+        self.provider = FakeProvider()
+        getStonks.set_provider(self.provider)
+        self.client = app_module.app.test_client()
+
+    def record(self, name: str, fn: Callable, setup: Callable | None = None, repeat: int | None = None) -> None:
+        result = _time(fn, repeat or self.repeat, setup)
+        self.results[name] = result
+        print(f"  {name:<55} {result['median'] * 1000:10.2f} ms")
+
+    # ---- data ----
+
+    def seed_histories(self, tickers: List[str], end: date) -> None:
+        start = time.perf_counter()
+        self.getStonks.refresh_symbols(tickers, HISTORY_START, end, provider=self.provider)
+        print(f"  seeded {len(tickers)} histories in {time.perf_counter() - start:.1f}s")
+
+    def wait_job(self, response) -> None:
+        job_id = (response.get_json() or {}).get("job_id")
+        if job_id:
+            while self.client.get(f"/jobs/{job_id}/wait?timeout=30").get_json()["job"]["status"] in ("queued", "running"):
+                pass
+
+    # ---- suites ----
+
+    def run_scale(self, scale: str) -> None:
+        n_lots, n_tickers = SCALES[scale]
+        print(f"[{scale}] {n_lots} lots x {n_tickers} tickers")
+        tickers = [f"T{i:05d}" for i in range(n_tickers)]
+        end = date.today() - timedelta(days=1)
+        self.seed_histories(tickers, end)
+        rows = _synthetic_rows(n_lots, tickers)
+        csv_text = _rows_csv(rows)
+        p = f"{scale}/"
+        app = self.app_module
+
+        # backend.lots
+        self.record(p + "lots.parse.cold", lambda: self.lots.parse_lots(rows), setup=self.lots._memo.clear)
+        self.record(p + "lots.parse.memo", lambda: self.lots.parse_lots(rows))
+        parsed = self.lots.parse_lots(rows)
+        self.record(p + "lots.aggregate", lambda: parsed.take(np.arange(len(parsed))).aggregate())
+
+        # backend.liveUpdates: one ticker's prices changed
+        live = self.LiveValuation(parsed)
+        self.record(p + "live.apply_one_ticker", lambda: live.apply([rows[0][0]]))
+
+        # backend.quotes: batch refresh through the provider, then lookups from the table
+        self.record(p + f"quotes.refresh_x{n_tickers}", lambda: self.quote_table.refresh(tickers),
+                    setup=self.quote_table.invalidate)
+        self.record(p + "quotes.prices.warm", lambda: self.quote_table.prices(tickers))
+
+        # backend.chartData: one 600px chart of up to 50 five-year series
+        charted = tickers[:50]
+        self.record(p + f"chart.prices_5y_x{len(charted)}.cold",
+                    lambda: self.price_series_cache.get_json(charted, "5y", 600),
+                    setup=self.price_series_cache.invalidate)
+        self.record(p + f"chart.prices_5y_x{len(charted)}.cached",
+                    lambda: self.price_series_cache.get_json(charted, "5y", 600))
+
+        # backend.priceStore: five years of closes read from the daily history vs the monthly bars
+        five_years = np.datetime64(end - timedelta(days=1827), "D")
+
+        def read_closes(resolution):
+            for t in charted:
+                recs = self.priceStore.open_records(t, resolution)
+                np.array(recs["Adj Close"][np.searchsorted(recs["Date"], five_years):])
+
+        self.record(p + f"store.read_5y_x{len(charted)}.daily", lambda: read_closes("daily"))
+        self.record(p + f"store.read_5y_x{len(charted)}.monthly", lambda: read_closes("monthly"))
+
+        # _enrich_rows / _load_stock_df (parse is memoized, as for a session's snapshot)
+        self.record(p + "enrich_rows", lambda: app._enrich_rows(rows))
+        sample = tickers[: min(len(tickers), 100)]
+        self.record(p + "load_stock_df.cold_x100", lambda: [app._load_stock_df(t) for t in sample],
+                    setup=self.price_cache.invalidate)
+        self.record(p + "load_stock_df.warm_x100", lambda: [app._load_stock_df(t) for t in sample])
+
+        # getStonks._update_symbol
+        self.record(p + "update_symbol.up_to_date",
+                    lambda: self.getStonks._update_symbol(tickers[0], HISTORY_START, end, provider=self.provider))
+        extra = f"X{scale.upper()}"
+
+        def seed_short():
+            # History that stops before `end`, so the timed call appends new days
+            self.getStonks.refresh_symbols([extra], HISTORY_START, end - timedelta(days=60), provider=self.provider)
+
+        self.record(p + "update_symbol.append", setup=seed_short,
+                    fn=lambda: self.getStonks._update_symbol(extra, HISTORY_START, end, provider=self.provider),
+                    repeat=1)
+
+        # portAnal.run_portfolio_analysis
+        def clear_charts():
+            shutil.rmtree(self.portAnal.CHART_CACHE_DIR, ignore_errors=True)
+
+        self.record(p + "run_portfolio_analysis.render", lambda: self.portAnal.run_portfolio_analysis(parsed),
+                    setup=clear_charts)
+        self.record(p + "run_portfolio_analysis.cached", lambda: self.portAnal.run_portfolio_analysis(parsed))
+
+        self.run_catalog(p, CATALOG_SIZES[scale], tickers)
+        self.run_routes(p, rows, csv_text)
+
+    def run_catalog(self, p: str, n_saved: int, tickers: List[str]) -> None:
+        saved_dir = self.catalog.directory
+        for old in saved_dir.glob("*.csv"):
+            old.unlink()
+        rng = np.random.default_rng(1)
+        for i in range(n_saved):
+            (saved_dir / f"saved_{i:05d}.csv").write_text(
+                _rows_csv(_synthetic_rows(int(rng.integers(1, 6)), tickers, seed=i)), encoding="utf-8")
+
+        def reset_index():
+            for index_file in (".catalog.json", ".catalog.log"):
+                (saved_dir / index_file).unlink(missing_ok=True)
+            self.catalog.__init__(saved_dir)
+
+        self.record(p + f"catalog.build_x{n_saved}", lambda: self.catalog.sync(), setup=reset_index, repeat=1)
+        self.record(p + "catalog.sync.unchanged", lambda: self.catalog.sync())
+        self.record(p + "catalog.search.first_page", lambda: self.catalog.search(limit=50))
+        self.record(p + "catalog.search.sort_value_desc",
+                    lambda: self.catalog.search(sort="value", descending=True, limit=50))
+        self.record(p + "catalog.search.query", lambda: self.catalog.search("saved_001", limit=50))
+        self.record(p + "catalog.search.ticker", lambda: self.catalog.search(ticker=tickers[0], limit=50))
+
+    def run_routes(self, p: str, rows: List[list], csv_text: str) -> None:
+        client = self.client
+        saved = self.workdir / "saved_portfolios" / "bench.csv"
+        saved.write_text(csv_text, encoding="utf-8")
+
+        def post_upload():
+            return client.post("/upload-portfolio", data={"file": (io.BytesIO(csv_text.encode()), "bench.csv")},
+                               content_type="multipart/form-data")
+
+        # Writes first: each one becomes the session's portfolio, so wait for its refresh job
+        writes = {
+            "POST /upload-portfolio": post_upload,
+            "POST /update-portfolio": lambda: client.post("/update-portfolio", json={"csv_text": csv_text}),
+            "POST /select-portfolio": lambda: client.post("/select-portfolio", json={"name": "bench"}),
+        }
+        for name, call in writes.items():
+            self.record(p + name, lambda: self.wait_job(call()))
+        create = {"name": f"bench_{p.strip('/')}", "ticker": rows[0][0], "quantity": 1, "date": rows[0][2]}
+        self.record(p + "POST /create-portfolio", lambda: self.wait_job(client.post("/create-portfolio", json=create)),
+                    repeat=1)
+        self.wait_job(client.post("/select-portfolio", json={"name": "bench"}))
+
+        job_id = client.post("/update-portfolio", json={"csv_text": csv_text}).get_json()["job_id"]
+        charted = ",".join(list(dict.fromkeys(row[0] for row in rows))[:50])
+        self.wait_job(client.get(f"/jobs/{job_id}"))
+        reads = {
+            "GET /": "/",
+            "GET /saved-portfolios": "/saved-portfolios?limit=50",
+            "GET /saved-portfolios?q=": "/saved-portfolios?limit=50&q=bench",
+            "GET /jobs/<id>": f"/jobs/{job_id}",
+            "GET /jobs/<id>/wait": f"/jobs/{job_id}/wait?timeout=0",
+            "GET /current-portfolio": "/current-portfolio?limit=50",
+            "GET /current-portfolio?sort=value": "/current-portfolio?limit=50&sort=value&order=desc",
+            "GET /current-portfolio?aggregate=1": "/current-portfolio?limit=50&aggregate=1",
+            "GET /current-portfolio/raw": "/current-portfolio/raw",
+            "GET /current-portfolio/export.ndjson": "/current-portfolio/export.ndjson",
+            "GET /current-portfolio/value-series": "/current-portfolio/value-series",
+            "GET /current-portfolio/chart-data/composition": "/current-portfolio/chart-data/composition",
+            "GET /chart-data/prices": f"/chart-data/prices?range=5y&width=600&tickers={charted}",
+            "GET /current-portfolio/risk": "/current-portfolio/risk",
+            "GET /current-portfolio/optimize": "/current-portfolio/optimize?objective=min_variance",
+            "GET /current-portfolio/frontier": "/current-portfolio/frontier?points=10",
+            "GET /current-portfolio/forecast.ndjson": "/current-portfolio/forecast.ndjson?paths=2000&steps=21&seed=1",
+            "GET /current-portfolio/papie.png": "/current-portfolio/papie.png",
+            "GET /price-cache/stats": "/price-cache/stats",
+            "GET /download-current": "/download-current",
+            "GET /metrics": "/metrics",
+        }
+        for name, url in reads.items():
+            def call(url=url):
+                response = client.get(url)
+                response.get_data()  # drain streamed bodies
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            self.record(p + name, call)
+
+        # Conditional GETs: an unchanged portfolio and prices answer 304 before any valuation
+        for name in ("GET /current-portfolio", "GET /current-portfolio/raw", "GET /current-portfolio/papie.png"):
+            etag = client.get(reads[name]).headers["ETag"]
+
+            def revalidate(url=reads[name], etag=etag):
+                response = client.get(url, headers={"If-None-Match": etag})
+                if response.status_code != 304:
+                    raise RuntimeError(f"{url} -> {response.status_code}, expected 304")
+            self.record(p + name + " (304)", revalidate)
+        self.record(p + "GET /current-portfolio?limit=1000 (gzip)",
+                    lambda: client.get("/current-portfolio?limit=1000", headers={"Accept-Encoding": "gzip"}))
+
+        def stream_delta():
+            # One tick written -> the 'prices' event carrying the changed rows
+            response = client.get("/current-portfolio/stream")
+            chunks = iter(response.response)
+            next(chunks)
+            self.SimulatedTicks(lambda: [rows[0][0]], per_tick=1).tick()
+            for chunk in chunks:
+                if b"event: prices" in chunk:
+                    break
+            response.close()
+
+        coalesce = self.app_module.STREAM_COALESCE_SECONDS
+        self.app_module.STREAM_COALESCE_SECONDS = 0.0
+        self.record(p + "GET /current-portfolio/stream (tick -> delta)", stream_delta)
+        self.app_module.STREAM_COALESCE_SECONDS = coalesce
+
+        self.record(p + "POST /saved-portfolios",
+                    lambda: client.post("/saved-portfolios", json={"name": "bench_copy", "overwrite": True}))
+        self.record(p + "DELETE /saved-portfolios/<name>", lambda: client.delete("/saved-portfolios/bench_copy"),
+                    setup=lambda: client.post("/saved-portfolios", json={"name": "bench_copy", "overwrite": True}))
+        # The save above renamed the session's portfolio; put the benchmark one back
+        self.wait_job(client.post("/select-portfolio", json={"name": "bench"}))
+
+        # Profiling is opt-in per server; enable it just for this one request
+        self.app_module.PROFILING_ENABLED = True
+        profile_id = client.get("/current-portfolio?_profile=1").headers["X-Profile-Id"]
+        self.app_module.PROFILING_ENABLED = False
+        self.record(p + "GET /debug/profile/<id>", lambda: client.get(f"/debug/profile/{profile_id}"))
+
+        covered = {n.split(" ", 1)[1].split("?")[0]
+                   for n in list(writes) + list(reads)
+                   + ["POST /create-portfolio", "GET /debug/profile/<id>", "DELETE /saved-portfolios/<name>",
+                      "GET /current-portfolio/stream"]}
+        for rule in self.app_module.app.url_map.iter_rules():
+            if rule.endpoint != "static" and rule.rule.replace("<job_id>", "<id>").replace("<profile_id>", "<id>") not in covered:
+                print(f"  ! route not benchmarked: {rule.rule}")
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_delta: float) -> List[str]:
+    """Names whose median regressed past threshold x baseline (and by more than min_delta seconds)."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["median"] > base["median"] * threshold and cur["median"] - base["median"] > min_delta:
+            regressions.append(
+                f"{name}: {base['median'] * 1000:.2f} ms -> {cur['median'] * 1000:.2f} ms "
+                f"({cur['median'] / base['median']:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES),
+                        help=f"comma-separated from {list(SCALES)} or 'all'")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown factor vs baseline")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--skip-startup", action="store_true", help="don't run the cold-start benchmark")
+    args = parser.parse_args(argv)
+
+    scales = list(SCALES) if args.scales == "all" else [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {unknown}")
+
+    startup, eager = {}, []
+    if not args.skip_startup:
+        print("[startup] fresh interpreter")
+        startup, eager = run_startup(args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="equiviz-bench-") as tmp:
+        bench = Bench(Path(tmp), args.repeat)
+        bench.results.update(startup)
+        for scale in scales:
+            bench.run_scale(scale)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "scales": {s: {"lots": SCALES[s][0], "tickers": SCALES[s][1]} for s in scales},
+            "repeat": args.repeat,
+            "eager_imports": None if args.skip_startup else eager,
+        },
+        "results": bench.results,
+    }
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(bench.results, baseline, args.threshold, args.min_delta)
+        base_eager = baseline["meta"].get("eager_imports")
+        if base_eager is not None and not args.skip_startup:
+            regressions += [f"import app now eagerly loads {m}" for m in eager if m not in base_eager]
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold}x baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions over {args.threshold}x baseline ({baseline['meta'].get('commit')}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
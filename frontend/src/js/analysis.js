@@ -0,0 +1,261 @@
+// analysis.js
+
+// Draws the charts on analysis.html from the JSON chart-data routes (no server-side rendering):
+// the value / cost basis / P&L series, the allocation pie and per-ticker price history
+document.addEventListener('DOMContentLoaded', () => {
+    const canvas = document.getElementById('valueSeriesChart');
+    const legend = document.getElementById('valueSeriesLegend');
+    const errorBox = document.getElementById('valueSeriesError');
+    const pieCanvas = document.getElementById('compositionChart');
+    const pieLegend = document.getElementById('compositionLegend');
+    const pieError = document.getElementById('compositionError');
+    const priceCanvas = document.getElementById('priceHistoryChart');
+    const priceLegend = document.getElementById('priceHistoryLegend');
+    const priceError = document.getElementById('priceHistoryError');
+    const rangeSelect = document.getElementById('priceRange');
+
+    const PALETTE = ['#4ade80', '#96b0e1', '#e4a70d', '#f472b6', '#38bdf8', '#a78bfa',
+        '#fb923c', '#facc15', '#2dd4bf', '#f87171', '#c084fc', '#94a3b8'];
+    // Largest holdings get their own slice / line; the rest are grouped or left out
+    const PIE_SLICES = 11;
+    const PRICE_TICKERS = 12;
+
+    const SERIES = [
+        { key: 'value', label: 'Market Value', color: '#4ade80' },
+        { key: 'cost', label: 'Cost Basis', color: '#96b0e1' },
+        { key: 'pnl', label: 'P&L', color: '#e4a70d' }
+    ];
+
+    const showError = (msg, box = errorBox) => {
+        if (box) {
+            box.textContent = msg;
+            box.style.display = 'block';
+        }
+    };
+
+    const fillLegend = (box, items) => {
+        if (!box) return;
+        box.innerHTML = '';
+        items.forEach(({ label, color }) => {
+            const item = document.createElement('span');
+            item.style.setProperty('--swatch', color);
+            item.textContent = label;
+            box.appendChild(item);
+        });
+    };
+
+    const money = (v) => `$${Math.round(v).toLocaleString()}`;
+
+    const drawLineChart = (dates, data) => {
+        const ctx = canvas.getContext('2d');
+        const { width, height } = canvas;
+        const pad = { left: 90, right: 16, top: 16, bottom: 32 };
+        ctx.clearRect(0, 0, width, height);
+
+        const all = SERIES.flatMap((s) => data[s.key]);
+        let min = Math.min(0, ...all);
+        let max = Math.max(...all);
+        if (max === min) max = min + 1;
+
+        const x = (i) => pad.left + (i / Math.max(1, dates.length - 1)) * (width - pad.left - pad.right);
+        const y = (v) => pad.top + (1 - (v - min) / (max - min)) * (height - pad.top - pad.bottom);
+
+        // Axes + a few horizontal gridlines
+        ctx.strokeStyle = 'rgba(255, 255, 255, 0.12)';
+        ctx.fillStyle = '#96b0e1';
+        ctx.font = '12px Roboto, sans-serif';
+        for (let g = 0; g <= 4; g++) {
+            const v = min + (g / 4) * (max - min);
+            ctx.beginPath();
+            ctx.moveTo(pad.left, y(v));
+            ctx.lineTo(width - pad.right, y(v));
+            ctx.stroke();
+            ctx.fillText(money(v), 8, y(v) + 4);
+        }
+        [0, Math.floor(dates.length / 2), dates.length - 1].forEach((i) => {
+            if (dates[i]) ctx.fillText(dates[i], Math.min(x(i), width - pad.right - 70), height - 10);
+        });
+
+        SERIES.forEach((s) => {
+            ctx.strokeStyle = s.color;
+            ctx.lineWidth = 1.5;
+            ctx.beginPath();
+            data[s.key].forEach((v, i) => {
+                if (i === 0) ctx.moveTo(x(i), y(v));
+                else ctx.lineTo(x(i), y(v));
+            });
+            ctx.stroke();
+        });
+
+        fillLegend(legend, SERIES.map((s) => ({ label: s.label, color: s.color })));
+    };
+
+    const drawPie = (assets) => {
+        const ctx = pieCanvas.getContext('2d');
+        const { width, height } = pieCanvas;
+        ctx.clearRect(0, 0, width, height);
+
+        const slices = assets.slice(0, PIE_SLICES).map((a) => ({ label: a.asset, weight: a.weight }));
+        const rest = assets.slice(PIE_SLICES).reduce((sum, a) => sum + a.weight, 0);
+        if (rest > 0) slices.push({ label: 'Other', weight: rest });
+
+        const cx = width / 2;
+        const cy = height / 2;
+        const r = Math.min(width, height) / 2 - 16;
+        let angle = -Math.PI / 2;
+        slices.forEach((slice, i) => {
+            const sweep = slice.weight * 2 * Math.PI;
+            ctx.fillStyle = PALETTE[i % PALETTE.length];
+            ctx.beginPath();
+            ctx.moveTo(cx, cy);
+            ctx.arc(cx, cy, r, angle, angle + sweep);
+            ctx.closePath();
+            ctx.fill();
+            angle += sweep;
+        });
+
+        fillLegend(pieLegend, slices.map((slice, i) => ({
+            label: `${slice.label} ${(slice.weight * 100).toFixed(1)}%`,
+            color: PALETTE[i % PALETTE.length]
+        })));
+    };
+
+    // Series come as a start date plus day steps between points
+    const decodeDays = (series) => {
+        const start = Date.parse(series.start);
+        let day = 0;
+        return series.steps.map((step) => {
+            day += step;
+            return start + day * 86400000;
+        });
+    };
+
+    const drawPriceHistory = (series) => {
+        const ctx = priceCanvas.getContext('2d');
+        const { width, height } = priceCanvas;
+        const pad = { left: 70, right: 16, top: 16, bottom: 32 };
+        ctx.clearRect(0, 0, width, height);
+
+        // Rebase each ticker to % change from its first point so they share one axis
+        const lines = series.map((s, i) => {
+            const times = decodeDays(s);
+            const first = s.values[0];
+            return { ticker: s.ticker, color: PALETTE[i % PALETTE.length], times,
+                pct: s.values.map((v) => (v / first - 1) * 100) };
+        });
+        const allTimes = lines.flatMap((l) => [l.times[0], l.times[l.times.length - 1]]);
+        const t0 = Math.min(...allTimes);
+        let t1 = Math.max(...allTimes);
+        if (t1 === t0) t1 = t0 + 1;
+        const allPct = lines.flatMap((l) => l.pct);
+        let min = Math.min(0, ...allPct);
+        let max = Math.max(0, ...allPct);
+        if (max === min) max = min + 1;
+
+        const x = (t) => pad.left + ((t - t0) / (t1 - t0)) * (width - pad.left - pad.right);
+        const y = (v) => pad.top + (1 - (v - min) / (max - min)) * (height - pad.top - pad.bottom);
+
+        ctx.strokeStyle = 'rgba(255, 255, 255, 0.12)';
+        ctx.fillStyle = '#96b0e1';
+        ctx.font = '12px Roboto, sans-serif';
+        for (let g = 0; g <= 4; g++) {
+            const v = min + (g / 4) * (max - min);
+            ctx.beginPath();
+            ctx.moveTo(pad.left, y(v));
+            ctx.lineTo(width - pad.right, y(v));
+            ctx.stroke();
+            ctx.fillText(`${v >= 0 ? '+' : ''}${v.toFixed(1)}%`, 8, y(v) + 4);
+        }
+        [t0, (t0 + t1) / 2, t1].forEach((t) => {
+            const label = new Date(t).toISOString().slice(0, 10);
+            ctx.fillText(label, Math.min(x(t), width - pad.right - 70), height - 10);
+        });
+
+        lines.forEach((l) => {
+            ctx.strokeStyle = l.color;
+            ctx.lineWidth = 1.5;
+            ctx.beginPath();
+            l.pct.forEach((v, i) => {
+                if (i === 0) ctx.moveTo(x(l.times[i]), y(v));
+                else ctx.lineTo(x(l.times[i]), y(v));
+            });
+            ctx.stroke();
+        });
+
+        fillLegend(priceLegend, lines.map((l) => ({ label: l.ticker, color: l.color })));
+    };
+
+    const loadSeries = async () => {
+        if (!canvas) return;
+        try {
+            // Downsampled on the server to about one point per pixel
+            const res = await fetch(`/current-portfolio/value-series?width=${canvas.width}`);
+            const data = await res.json();
+            if (!res.ok || !data.success) {
+                showError(data.error || 'Unable to load value series.');
+                return;
+            }
+            if (!data.dates.length) {
+                showError('No price history available for this portfolio yet.');
+                return;
+            }
+            drawLineChart(data.dates, data);
+        } catch (err) {
+            console.error(err);
+            showError('Unable to load value series.');
+        }
+    };
+
+    let priceTickers = [];
+
+    const loadPriceHistory = async () => {
+        if (!priceCanvas || !priceTickers.length) return;
+        if (priceError) priceError.style.display = 'none';
+        const range = rangeSelect ? rangeSelect.value : '1y';
+        try {
+            const params = new URLSearchParams({ tickers: priceTickers.join(','), range, width: priceCanvas.width });
+            const res = await fetch(`/chart-data/prices?${params}`);
+            const data = await res.json();
+            if (!res.ok || !data.success) {
+                showError(data.error || 'Unable to load price history.', priceError);
+                return;
+            }
+            const series = data.series.filter((s) => s.values.length > 0);
+            if (!series.length) {
+                showError('No price history available for this range.', priceError);
+                return;
+            }
+            drawPriceHistory(series);
+        } catch (err) {
+            console.error(err);
+            showError('Unable to load price history.', priceError);
+        }
+    };
+
+    const loadComposition = async () => {
+        if (!pieCanvas) return;
+        try {
+            const res = await fetch('/current-portfolio/chart-data/composition');
+            const data = await res.json();
+            if (!res.ok || !data.success) {
+                showError(data.error || 'Unable to load portfolio composition.', pieError);
+                return;
+            }
+            if (!data.assets.length) {
+                showError('No priced holdings in this portfolio yet.', pieError);
+                return;
+            }
+            drawPie(data.assets);
+            priceTickers = data.assets.slice(0, PRICE_TICKERS).map((a) => a.asset);
+            loadPriceHistory();
+        } catch (err) {
+            console.error(err);
+            showError('Unable to load portfolio composition.', pieError);
+        }
+    };
+
+    if (rangeSelect) rangeSelect.addEventListener('change', loadPriceHistory);
+
+    loadSeries();
+    loadComposition();
+});
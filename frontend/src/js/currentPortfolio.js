@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const editTextarea = document.getElementById('editTextarea');
     const editSubmit = document.getElementById('editSubmit');
     const editError = document.getElementById('editError');
+    const aggregateToggle = document.getElementById('aggregateLots');
 
     const showError = (msg) => {
         if (errorBox) {
@@ -22,9 +23,57 @@ document.addEventListener('DOMContentLoaded', () => {
         if (errorBox) errorBox.style.display = 'none';
     };
 
-    const renderTable = ({ columns, rows, total_rows, truncated }) => {
+    // Table paging state: rows are fetched a page at a time as the user scrolls
+    const PAGE_SIZE = 50;
+    const SORT_KEYS = {
+        'Asset': 'asset',
+        'Qty': 'qty',
+        'Acquired': 'acquired',
+        '$/Share': 'price',
+        '$/Share tdy': 'price_today',
+        'Cost': 'cost',
+        'Value': 'value',
+        'Return': 'return',
+        'Return %': 'return_pct'
+    };
+    const view = { sort: null, order: 'asc', nextCursor: null, loaded: 0, total: 0, loading: false, columns: [] };
+    let tbody = null;
+    let sentinelObserver = null;
+    // Live price updates (SSE); reopened when the aggregate view changes
+    let stream = null;
+    let streamAggregate = null;
+
+    const buildRow = (row, columns, lotIndex) => {
+        const tr = document.createElement('tr');
+        if (lotIndex !== undefined) tr.dataset.lot = lotIndex;
+        row.forEach((cell, cellIdx) => {
+            const td = document.createElement('td');
+            const colName = columns[cellIdx];
+            td.textContent = cell;
+            if (colName === 'Return' || colName === 'Return %') {
+                const num = parseFloat(String(cell).replace(/[^-0-9.]/g, ''));
+                if (!isNaN(num)) {
+                    if (num > 0) td.classList.add('pos');
+                    else if (num < 0) td.classList.add('neg');
+                    else td.classList.add('neutral');
+                }
+            }
+            tr.appendChild(td);
+        });
+        return tr;
+    };
+
+    const updateMeta = () => {
+        if (!meta) return;
+        meta.textContent = view.loaded < view.total
+            ? `Showing ${view.loaded} of ${view.total} rows (scroll for more)`
+            : `Showing ${view.total} row(s)`;
+    };
+
+    const renderTable = ({ columns, rows, net_total, indexes = [] }) => {
         if (!tableContainer) return;
         tableContainer.innerHTML = '';
+        view.columns = columns;
 
         const table = document.createElement('table');
         table.className = 'portfolio-grid';
@@ -33,53 +82,70 @@ document.addEventListener('DOMContentLoaded', () => {
         const headerRow = document.createElement('tr');
         columns.forEach((col) => {
             const th = document.createElement('th');
+            const key = SORT_KEYS[col];
             th.textContent = col;
+            if (view.sort === key) th.textContent += view.order === 'asc' ? ' ▲' : ' ▼';
+            if (key) {
+                th.style.cursor = 'pointer';
+                th.addEventListener('click', () => {
+                    view.order = view.sort === key && view.order === 'asc' ? 'desc' : 'asc';
+                    view.sort = key;
+                    loadPortfolio();
+                });
+            }
             headerRow.appendChild(th);
         });
         thead.appendChild(headerRow);
         table.appendChild(thead);
 
-        const tbody = document.createElement('tbody');
-        rows.forEach((row, idx) => {
-            const tr = document.createElement('tr');
-            row.forEach((cell, cellIdx) => {
-                const td = document.createElement('td');
-                const colName = columns[cellIdx];
-                td.textContent = cell;
-                if (colName === 'Return' || colName === 'Return %') {
-                    const num = parseFloat(String(cell).replace(/[^-0-9.]/g, ''));
-                    if (!isNaN(num)) {
-                        if (num > 0) td.classList.add('pos');
-                        else if (num < 0) td.classList.add('neg');
-                        else td.classList.add('neutral');
-                    }
-                }
-                tr.appendChild(td);
-            });
-            if (row[0] === 'Net Total') {
-                tr.classList.add('net-row');
-            }
-            tbody.appendChild(tr);
-
-            // Insert an ... row if truncated and we're after the 5th entry
-            if (truncated && idx === 4) {
-                const ellipsis = document.createElement('tr');
-                const td = document.createElement('td');
-                td.colSpan = columns.length;
-                td.className = 'ellipsis-row';
-                td.textContent = '...';
-                ellipsis.appendChild(td);
-                tbody.appendChild(ellipsis);
-            }
-        });
+        tbody = document.createElement('tbody');
+        rows.forEach((row, i) => tbody.appendChild(buildRow(row, columns, indexes[i])));
         table.appendChild(tbody);
 
+        if (net_total) {
+            const tfoot = document.createElement('tfoot');
+            const netRow = buildRow(net_total, columns);
+            netRow.classList.add('net-row');
+            tfoot.appendChild(netRow);
+            table.appendChild(tfoot);
+        }
+
         tableContainer.appendChild(table);
 
-        if (meta) {
-            meta.textContent = truncated
-                ? `Showing first 5 and last 5 of ${total_rows} rows`
-                : `Showing ${total_rows} row(s)`;
+        // Fetch the next page when the bottom of the table scrolls into view
+        const sentinel = document.createElement('div');
+        sentinel.className = 'table-sentinel';
+        tableContainer.appendChild(sentinel);
+        if (sentinelObserver) sentinelObserver.disconnect();
+        sentinelObserver = new IntersectionObserver((entries) => {
+            if (entries.some((e) => e.isIntersecting)) loadNextPage();
+        });
+        sentinelObserver.observe(sentinel);
+    };
+
+    const fetchPage = async (params) => {
+        const res = await fetch(`/current-portfolio?${params.toString()}`);
+        const data = await res.json();
+        if (!res.ok || !data.success) {
+            throw new Error(data.error || 'Unable to load portfolio.');
+        }
+        return data;
+    };
+
+    const loadNextPage = async () => {
+        if (!view.nextCursor || view.loading || !tbody) return;
+        view.loading = true;
+        try {
+            const data = await fetchPage(new URLSearchParams({ cursor: view.nextCursor, limit: PAGE_SIZE }));
+            data.rows.forEach((row, i) => tbody.appendChild(buildRow(row, view.columns, data.indexes[i])));
+            view.loaded += data.rows.length;
+            view.nextCursor = data.next_cursor;
+            updateMeta();
+        } catch (err) {
+            console.error(err);
+            showError(err.message || 'Unable to load portfolio.');
+        } finally {
+            view.loading = false;
         }
     };
 
@@ -89,19 +155,62 @@ document.addEventListener('DOMContentLoaded', () => {
         if (tableContainer) tableContainer.innerHTML = '';
 
         try {
-            const res = await fetch('/current-portfolio');
-            const data = await res.json();
-            if (!res.ok || !data.success) {
-                showError(data.error || 'Unable to load portfolio.');
-                return;
+            const params = new URLSearchParams({ limit: PAGE_SIZE });
+            // Same ticker + acquisition date shown as one lot
+            if (aggregateToggle && aggregateToggle.checked) params.set('aggregate', '1');
+            if (view.sort) {
+                params.set('sort', view.sort);
+                params.set('order', view.order);
             }
+            const data = await fetchPage(params);
+            view.loaded = data.rows.length;
+            view.total = data.total_rows;
+            view.nextCursor = data.next_cursor;
             renderTable(data);
+            updateMeta();
+            openStream(data.price_seq);
         } catch (err) {
             console.error(err);
-            showError('Unable to load portfolio.');
+            showError(err.message || 'Unable to load portfolio.');
+        }
+    };
+
+    // Replace only the rows the server says changed, plus the net total
+    const applyPriceUpdate = ({ rows, net_total }) => {
+        if (!tbody) return;
+        rows.forEach(({ index, row }) => {
+            const tr = tbody.querySelector(`tr[data-lot="${index}"]`);
+            if (tr) tr.replaceWith(buildRow(row, view.columns, index));
+        });
+        const netRow = tableContainer && tableContainer.querySelector('tfoot .net-row');
+        if (netRow && net_total) {
+            const fresh = buildRow(net_total, view.columns);
+            fresh.classList.add('net-row');
+            netRow.replaceWith(fresh);
         }
     };
 
+    // priceSeq: the price_seq of the rows on screen, so changes since then are sent first
+    const openStream = (priceSeq) => {
+        if (!window.EventSource) return;
+        const aggregate = Boolean(aggregateToggle && aggregateToggle.checked);
+        if (stream && streamAggregate === aggregate) return;
+        if (stream) stream.close();
+        streamAggregate = aggregate;
+        const params = new URLSearchParams();
+        if (aggregate) params.set('aggregate', '1');
+        if (priceSeq !== undefined && priceSeq !== null) params.set('since', priceSeq);
+        const query = params.toString();
+        stream = new EventSource(`/current-portfolio/stream${query ? `?${query}` : ''}`);
+        stream.addEventListener('prices', (e) => applyPriceUpdate(JSON.parse(e.data)));
+        stream.addEventListener('portfolio', () => {
+            // Portfolio was edited elsewhere: reload the table and start a fresh stream
+            stream.close();
+            stream = null;
+            loadPortfolio();
+        });
+    };
+
     const downloadPortfolio = async () => {
         try {
             const res = await fetch('/download-current');
@@ -126,9 +235,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    const savePortfolio = async (overwrite = false) => {
+        const res = await fetch('/saved-portfolios', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ overwrite })
+        });
+        const data = await res.json().catch(() => ({}));
+        if (res.status === 409 && data.exists) {
+            if (!window.confirm(`${data.error} Overwrite it?`)) return false;
+            return savePortfolio(true);
+        }
+        if (!res.ok || !data.success) {
+            showError(data.error || 'Unable to save portfolio.');
+            return false;
+        }
+        return true;
+    };
+
     if (saveBtn) {
         saveBtn.addEventListener('click', async () => {
-            const confirmed = window.confirm('Download CSV file of portfolio?');
+            try {
+                if (!(await savePortfolio())) return;
+            } catch (err) {
+                console.error(err);
+                showError('Unable to save portfolio.');
+                return;
+            }
+            const confirmed = window.confirm('Portfolio saved. Also download a CSV copy?');
             if (!confirmed) return;
             await downloadPortfolio();
         });
@@ -210,11 +344,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 showEditError(data.error || 'Could not update portfolio.');
                 return;
             }
+            await window.waitForJob(data.job_id, (job) => {
+                if (meta) meta.textContent = `Refreshing portfolio: ${job.stage}`;
+            });
             closeEditModal();
             await loadPortfolio();
         } catch (err) {
             console.error(err);
-            showEditError('Could not update portfolio.');
+            showEditError(err.message || 'Could not update portfolio.');
         }
     };
 
@@ -222,5 +359,9 @@ document.addEventListener('DOMContentLoaded', () => {
         editSubmit.addEventListener('click', submitEdit);
     }
 
+    if (aggregateToggle) {
+        aggregateToggle.addEventListener('change', () => loadPortfolio());
+    }
+
     loadPortfolio();
 });
@@ -0,0 +1,140 @@
+// forecasts.js
+
+// Streams /current-portfolio/forecast.ndjson and redraws the percentile bands as chunks finish
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('forecastControls');
+    const button = form.querySelector('button[type="submit"]');
+    const canvas = document.getElementById('forecastChart');
+    const legend = document.getElementById('forecastLegend');
+    const status = document.getElementById('forecastStatus');
+    const errorBox = document.getElementById('forecastError');
+
+    const BANDS = [
+        { lo: 'p5', hi: 'p95', label: '5–95%', color: 'rgba(150, 176, 225, 0.25)' },
+        { lo: 'p25', hi: 'p75', label: '25–75%', color: 'rgba(150, 176, 225, 0.45)' }
+    ];
+    const LINES = [
+        { key: 'p50', label: 'Median', color: '#4ade80' },
+        { key: 'mean', label: 'Mean', color: '#e4a70d' }
+    ];
+
+    const money = (v) => `$${Math.round(v).toLocaleString()}`;
+
+    const showError = (msg) => {
+        errorBox.textContent = msg;
+        errorBox.style.display = msg ? 'block' : 'none';
+    };
+
+    const draw = (snap) => {
+        const ctx = canvas.getContext('2d');
+        const { width, height } = canvas;
+        const pad = { left: 90, right: 16, top: 16, bottom: 32 };
+        ctx.clearRect(0, 0, width, height);
+
+        // Step 0 is today's value; the bands start at step 1
+        const series = (arr) => [snap.start_value, ...arr];
+        const lows = series(snap.bands.p5);
+        const highs = series(snap.bands.p95);
+        const min = Math.min(...lows);
+        let max = Math.max(...highs);
+        if (max === min) max = min + 1;
+        const n = lows.length;
+
+        const x = (i) => pad.left + (i / Math.max(1, n - 1)) * (width - pad.left - pad.right);
+        const y = (v) => pad.top + (1 - (v - min) / (max - min)) * (height - pad.top - pad.bottom);
+
+        ctx.strokeStyle = 'rgba(255, 255, 255, 0.12)';
+        ctx.fillStyle = '#96b0e1';
+        ctx.font = '12px Roboto, sans-serif';
+        for (let g = 0; g <= 4; g++) {
+            const v = min + (g / 4) * (max - min);
+            ctx.beginPath();
+            ctx.moveTo(pad.left, y(v));
+            ctx.lineTo(width - pad.right, y(v));
+            ctx.stroke();
+            ctx.fillText(money(v), 8, y(v) + 4);
+        }
+        [0, Math.floor((n - 1) / 2), n - 1].forEach((i) => {
+            ctx.fillText(`day ${i}`, Math.min(x(i), width - pad.right - 50), height - 10);
+        });
+
+        BANDS.forEach((b) => {
+            const lo = series(snap.bands[b.lo]);
+            const hi = series(snap.bands[b.hi]);
+            ctx.fillStyle = b.color;
+            ctx.beginPath();
+            hi.forEach((v, i) => (i === 0 ? ctx.moveTo(x(i), y(v)) : ctx.lineTo(x(i), y(v))));
+            for (let i = n - 1; i >= 0; i--) ctx.lineTo(x(i), y(lo[i]));
+            ctx.closePath();
+            ctx.fill();
+        });
+
+        LINES.forEach((l) => {
+            const data = series(l.key === 'mean' ? snap.mean : snap.bands[l.key]);
+            ctx.strokeStyle = l.color;
+            ctx.lineWidth = 1.5;
+            ctx.beginPath();
+            data.forEach((v, i) => (i === 0 ? ctx.moveTo(x(i), y(v)) : ctx.lineTo(x(i), y(v))));
+            ctx.stroke();
+        });
+
+        legend.innerHTML = '';
+        [...BANDS.map((b) => [b.label, b.color]), ...LINES.map((l) => [l.label, l.color])].forEach(([label, color]) => {
+            const item = document.createElement('span');
+            item.style.setProperty('--swatch', color);
+            item.textContent = label;
+            legend.appendChild(item);
+        });
+
+        const last = snap.bands.p50.length - 1;
+        status.textContent = `${snap.paths.toLocaleString()} / ${snap.paths_total.toLocaleString()} paths · `
+            + `median ${money(snap.bands.p50[last])} · 5% ${money(snap.bands.p5[last])} · `
+            + `P(loss) ${(snap.prob_loss * 100).toFixed(1)}% · seed ${snap.seed}`;
+    };
+
+    const run = async () => {
+        const params = new URLSearchParams({
+            model: document.getElementById('forecastModel').value,
+            paths: document.getElementById('forecastPaths').value || '10000',
+            steps: document.getElementById('forecastSteps').value || '252'
+        });
+        const seed = document.getElementById('forecastSeed').value;
+        if (seed) params.set('seed', seed);
+
+        button.disabled = true;
+        showError('');
+        status.textContent = 'Simulating…';
+        try {
+            const res = await fetch(`/current-portfolio/forecast.ndjson?${params}`);
+            if (!res.ok) {
+                const data = await res.json();
+                showError(data.error || 'Failed to run forecast.');
+                status.textContent = '';
+                return;
+            }
+            // Read the NDJSON stream line by line and redraw on every snapshot
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                const complete = lines.filter((l) => l.trim());
+                if (complete.length) draw(JSON.parse(complete[complete.length - 1]));
+            }
+        } catch (err) {
+            console.error(err);
+            showError('Failed to run forecast.');
+        } finally {
+            button.disabled = false;
+        }
+    };
+
+    form.addEventListener('submit', (e) => {
+        e.preventDefault();
+        run();
+    });
+});
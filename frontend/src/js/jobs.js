@@ -0,0 +1,36 @@
+// jobs.js
+
+// Shared helper for routes that return a background job_id (create/upload/select/update)
+// Long-polls /jobs/<id>/wait until the job is done or failed, reporting progress along the way
+
+// Pause between polls when the server answers early without a final state
+const JOB_RETRY_DELAY_MS = 1000;
+
+window.waitForJob = async (jobId, onProgress) => {
+    let id = jobId;
+    while (true) {
+        const started = Date.now();
+        const res = await fetch(`/jobs/${encodeURIComponent(id)}/wait?timeout=20`);
+        const data = await res.json().catch(() => ({}));
+        if (!res.ok || !data.success) {
+            throw new Error(data.error || 'Could not check job status.');
+        }
+
+        const job = data.job;
+        if (onProgress) onProgress(job);
+
+        if (job.status === 'done') return job;
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Portfolio refresh failed.');
+        }
+        // The server follows a newer job while it is still known, so a superseded job here
+        // has no successor left to wait for: final
+        if (job.status === 'superseded') return job;
+        // Still queued/running: keep following the newer job the server handed back
+        id = job.id;
+        const elapsed = Date.now() - started;
+        if (elapsed < JOB_RETRY_DELAY_MS) {
+            await new Promise((resolve) => setTimeout(resolve, JOB_RETRY_DELAY_MS - elapsed));
+        }
+    }
+};
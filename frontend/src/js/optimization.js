@@ -0,0 +1,135 @@
+// optimization.js
+
+// Plots the efficient frontier from /current-portfolio/frontier and the chosen
+// solution from /current-portfolio/optimize on optimization.html
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('optControls');
+    const canvas = document.getElementById('frontierChart');
+    const legend = document.getElementById('frontierLegend');
+    const summary = document.getElementById('optSummary');
+    const weightsTable = document.getElementById('optWeights');
+    const errorBox = document.getElementById('optError');
+
+    const COLORS = { frontier: '#4ade80', assets: '#96b0e1', optimal: '#e4a70d' };
+    const pct = (v) => (v === null || v === undefined ? '—' : `${(v * 100).toFixed(2)}%`);
+
+    const showError = (msg) => {
+        errorBox.textContent = msg;
+        errorBox.style.display = msg ? 'block' : 'none';
+    };
+
+    const params = () => {
+        const p = new URLSearchParams({
+            long_only: document.getElementById('optLongOnly').checked ? '1' : '0',
+            rf: document.getElementById('optRf').value || '0'
+        });
+        const cap = document.getElementById('optCap').value;
+        if (cap) p.set('cap', cap);
+        return p;
+    };
+
+    const drawFrontier = (frontier, optimal) => {
+        const ctx = canvas.getContext('2d');
+        const { width, height } = canvas;
+        const pad = { left: 70, right: 16, top: 16, bottom: 36 };
+        ctx.clearRect(0, 0, width, height);
+
+        const pts = frontier.points.concat(frontier.assets);
+        if (optimal) pts.push(optimal);
+        const vols = pts.map((p) => p.volatility);
+        const rets = pts.map((p) => p.return);
+        const vMin = 0, vMax = Math.max(...vols) * 1.05 || 1;
+        let rMin = Math.min(0, ...rets), rMax = Math.max(...rets);
+        if (rMax === rMin) rMax = rMin + 1;
+
+        const x = (v) => pad.left + ((v - vMin) / (vMax - vMin)) * (width - pad.left - pad.right);
+        const y = (r) => pad.top + (1 - (r - rMin) / (rMax - rMin)) * (height - pad.top - pad.bottom);
+
+        ctx.strokeStyle = 'rgba(255, 255, 255, 0.12)';
+        ctx.fillStyle = '#96b0e1';
+        ctx.font = '12px Roboto, sans-serif';
+        for (let g = 0; g <= 4; g++) {
+            const r = rMin + (g / 4) * (rMax - rMin);
+            ctx.beginPath();
+            ctx.moveTo(pad.left, y(r));
+            ctx.lineTo(width - pad.right, y(r));
+            ctx.stroke();
+            ctx.fillText(pct(r), 8, y(r) + 4);
+            const v = vMin + (g / 4) * (vMax - vMin);
+            ctx.fillText(pct(v), Math.min(x(v), width - pad.right - 50), height - 12);
+        }
+
+        ctx.fillStyle = COLORS.assets;
+        frontier.assets.forEach((a) => {
+            ctx.beginPath();
+            ctx.arc(x(a.volatility), y(a.return), 3, 0, 2 * Math.PI);
+            ctx.fill();
+        });
+
+        ctx.strokeStyle = COLORS.frontier;
+        ctx.lineWidth = 2;
+        ctx.beginPath();
+        frontier.points.forEach((p, i) => {
+            if (i === 0) ctx.moveTo(x(p.volatility), y(p.return));
+            else ctx.lineTo(x(p.volatility), y(p.return));
+        });
+        ctx.stroke();
+
+        if (optimal) {
+            ctx.fillStyle = COLORS.optimal;
+            ctx.beginPath();
+            ctx.arc(x(optimal.volatility), y(optimal.return), 6, 0, 2 * Math.PI);
+            ctx.fill();
+        }
+
+        legend.innerHTML = '';
+        [['Efficient frontier', COLORS.frontier], ['Holdings', COLORS.assets], ['Selected portfolio', COLORS.optimal]].forEach(([label, color]) => {
+            const item = document.createElement('span');
+            item.style.setProperty('--swatch', color);
+            item.textContent = label;
+            legend.appendChild(item);
+        });
+    };
+
+    const renderWeights = (result) => {
+        summary.textContent = `Return ${pct(result.return)} · Volatility ${pct(result.volatility)} · Sharpe ${result.sharpe === null ? '—' : result.sharpe.toFixed(2)}`;
+        const rows = result.tickers
+            .map((t, i) => ({ t, w: result.weights[i], c: result.current_weights[i] }))
+            .sort((a, b) => b.w - a.w)
+            .map((r) => `<tr><th>${r.t}</th><td>${pct(r.c)}</td><td>${pct(r.w)}</td></tr>`);
+        weightsTable.innerHTML = '<tr><th>Ticker</th><th>Current</th><th>Optimized</th></tr>' + rows.join('');
+    };
+
+    const fetchJson = async (url) => {
+        const res = await fetch(url);
+        const data = await res.json();
+        if (!res.ok || !data.success) throw new Error(data.error || 'Request failed.');
+        return data;
+    };
+
+    const run = async () => {
+        const base = params();
+        const opt = new URLSearchParams(base);
+        opt.set('objective', document.getElementById('optObjective').value);
+        const target = document.getElementById('optTarget').value;
+        if (target) opt.set('target', target);
+
+        try {
+            const [frontier, result] = await Promise.all([
+                fetchJson(`/current-portfolio/frontier?${base}`),
+                fetchJson(`/current-portfolio/optimize?${opt}`)
+            ]);
+            showError('');
+            drawFrontier(frontier, result);
+            renderWeights(result);
+        } catch (err) {
+            showError(err.message || 'Failed to optimize portfolio.');
+        }
+    };
+
+    form.addEventListener('submit', (e) => {
+        e.preventDefault();
+        run();
+    });
+    run();
+});
@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const selectDropdown = document.getElementById('savedPortfolioSelect');
     const selectSubmit = document.getElementById('selectSubmit');
     const selectError = document.getElementById('selectError');
+    const selectSearch = document.getElementById('savedPortfolioSearch');
 
     const showError = (msg) => {
         if (errorBox) {
@@ -52,11 +53,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     return;
                 }
 
+                await window.waitForJob(data.job_id);
+
                 if (uploadModal) uploadModal.classList.remove('show');
                 window.location.href = "/src/html/portfolio.html";
             } catch (err) {
                 console.error(err);
-                showError('Could not upload file. Please try again.');
+                showError(err.message || 'Could not upload file. Please try again.');
             }
         });
     }
@@ -70,39 +73,65 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
-    const loadSavedPortfolios = async () => {
+    // "name — 12 lots · $10,450 (+4.2%)"; value/return are null until the portfolio has price data
+    const describePortfolio = (item) => {
+        let label = `${item.name} — ${item.lots} lot${item.lots === 1 ? '' : 's'}`;
+        if (item.value !== null && item.value !== undefined) {
+            const value = item.value.toLocaleString(undefined, { style: 'currency', currency: 'USD', maximumFractionDigits: 0 });
+            const pct = item.return_pct || 0;
+            label += ` · ${value} (${pct >= 0 ? '+' : ''}${pct.toFixed(1)}%)`;
+        }
+        return label;
+    };
+
+    const loadSavedPortfolios = async (query = '') => {
         if (selectError) selectError.style.display = 'none';
         if (!selectDropdown) return;
 
         selectDropdown.innerHTML = '<option value=\"\">-- Select --</option>';
 
         try {
-            const res = await fetch('/saved-portfolios');
+            const res = await fetch(`/saved-portfolios?q=${encodeURIComponent(query)}`);
             const data = await res.json();
             if (!res.ok || !data.success) {
                 showSelectError(data.error || 'Could not load saved portfolios.');
                 return;
             }
 
-            if (!data.portfolios || data.portfolios.length === 0) {
-                showSelectError('No saved portfolios found.');
+            if (!data.items || data.items.length === 0) {
+                showSelectError(query ? 'No saved portfolios match.' : 'No saved portfolios found.');
                 return;
             }
 
-            data.portfolios.forEach((name) => {
+            data.items.forEach((item) => {
                 const opt = document.createElement('option');
-                opt.value = name;
-                opt.textContent = name;
+                opt.value = item.name;
+                opt.textContent = describePortfolio(item);
                 selectDropdown.appendChild(opt);
             });
+            if (data.total > data.items.length) {
+                const more = document.createElement('option');
+                more.disabled = true;
+                more.textContent = `${data.total - data.items.length} more — refine the filter`;
+                selectDropdown.appendChild(more);
+            }
         } catch (err) {
             console.error(err);
             showSelectError('Could not load saved portfolios.');
         }
     };
 
+    if (selectSearch) {
+        let searchTimer = null;
+        selectSearch.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => loadSavedPortfolios(selectSearch.value.trim()), 200);
+        });
+    }
+
     if (selectBtn && selectModal) {
         selectBtn.addEventListener('click', async () => {
+            if (selectSearch) selectSearch.value = '';
             await loadSavedPortfolios();
             selectModal.classList.add('show');
         });
@@ -134,12 +163,14 @@ document.addEventListener('DOMContentLoaded', () => {
                     showSelectError(data.error || 'Could not load portfolio.');
                     return;
                 }
+                await window.waitForJob(data.job_id);
+
                 if (selectModal) selectModal.classList.remove('show');
                 if (uploadModal) uploadModal.classList.remove('show');
                 window.location.href = "/src/html/portfolio.html";
             } catch (err) {
                 console.error(err);
-                showSelectError('Could not load portfolio.');
+                showSelectError(err.message || 'Could not load portfolio.');
             }
         });
     }
@@ -28,9 +28,20 @@ document.addEventListener('DOMContentLoaded', () => {
                 const result = await response.json();
 
                 if (response.ok) {
-                    // Success!
+                    // Saved; market data + analysis run as a background job
                     console.log("Success:", result.message);
 
+                    if (errorMsg) errorMsg.style.display = 'none';
+                    try {
+                        await window.waitForJob(result.job_id, (job) => console.log(`Job ${job.status}: ${job.stage}`));
+                    } catch (jobErr) {
+                        if (errorMsg) {
+                            errorMsg.textContent = `Portfolio saved but failed to initialize data: ${jobErr.message}`;
+                            errorMsg.style.display = 'block';
+                        }
+                        return;
+                    }
+
                     // Close the modal (we select it here directly)
                     document.getElementById('createModal').classList.remove('show');
 
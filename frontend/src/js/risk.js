@@ -0,0 +1,86 @@
+// risk.js
+
+// Fills the Global View risk panel from /current-portfolio/risk
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('riskControls');
+    const summary = document.getElementById('riskSummary');
+    const assets = document.getElementById('riskAssets');
+    const matrix = document.getElementById('riskCorrelation');
+    const errorBox = document.getElementById('riskError');
+
+    const pct = (v) => (v === null || v === undefined ? '—' : `${(v * 100).toFixed(2)}%`);
+    const num = (v) => (v === null || v === undefined ? '—' : v.toFixed(2));
+    const money = (v) => (v === null || v === undefined ? '—' : `$${Math.round(v).toLocaleString()}`);
+
+    const showError = (msg) => {
+        errorBox.textContent = msg;
+        errorBox.style.display = msg ? 'block' : 'none';
+    };
+
+    const renderSummary = (data) => {
+        const p = data.portfolio;
+        const cards = [
+            ['Market Value', money(p.value)],
+            ['Volatility (ann.)', pct(p.volatility)],
+            [`Beta vs ${data.benchmark || '—'}`, num(p.beta)],
+            [`Hist. VaR ${Math.round(p.confidence * 100)}% / ${p.horizon_days}d`, `${pct(p.var_historical)} · ${money(p.var_historical_value)}`],
+            [`Param. VaR ${Math.round(p.confidence * 100)}% / ${p.horizon_days}d`, `${pct(p.var_parametric)} · ${money(p.var_parametric_value)}`],
+            ['Observations', `${data.observations} (${data.start || '—'} → ${data.end || '—'})`]
+        ];
+        summary.innerHTML = cards.map(([label, value]) => `<div>${label}<strong>${value}</strong></div>`).join('');
+    };
+
+    const renderAssets = (data) => {
+        const rows = data.tickers.map((t, i) =>
+            `<tr><th>${t}</th><td>${pct(data.weights[i])}</td><td>${pct(data.volatility[i])}</td><td>${num(data.beta[i])}</td></tr>`
+        );
+        assets.innerHTML = '<tr><th>Ticker</th><th>Weight</th><th>Volatility</th><th>Beta</th></tr>' + rows.join('');
+    };
+
+    const renderMatrix = (data) => {
+        if (!data.correlation) {
+            matrix.innerHTML = '<tr><td>Too many holdings to display the full matrix.</td></tr>';
+            return;
+        }
+        const head = '<tr><th></th>' + data.tickers.map((t) => `<th>${t}</th>`).join('') + '</tr>';
+        const rows = data.correlation.map((row, i) => {
+            const cells = row.map((c) => {
+                // Green for positive, red for negative correlation
+                const color = c >= 0 ? `rgba(74, 222, 128, ${Math.abs(c) * 0.5})` : `rgba(239, 68, 68, ${Math.abs(c) * 0.5})`;
+                return `<td style="--cell: ${color}">${c.toFixed(2)}</td>`;
+            });
+            return `<tr><th>${data.tickers[i]}</th>${cells.join('')}</tr>`;
+        });
+        matrix.innerHTML = head + rows.join('');
+    };
+
+    const load = async () => {
+        const params = new URLSearchParams({
+            benchmark: document.getElementById('riskBenchmark').value.trim() || 'SPY',
+            confidence: document.getElementById('riskConfidence').value,
+            horizon: document.getElementById('riskHorizon').value || '1',
+            method: document.getElementById('riskMethod').value,
+            resolution: document.getElementById('riskResolution').value
+        });
+        try {
+            const res = await fetch(`/current-portfolio/risk?${params}`);
+            const data = await res.json();
+            if (!res.ok || !data.success) {
+                showError(data.error || 'Failed to load risk metrics.');
+                return;
+            }
+            showError('');
+            renderSummary(data);
+            renderAssets(data);
+            renderMatrix(data);
+        } catch (err) {
+            showError('Failed to load risk metrics.');
+        }
+    };
+
+    form.addEventListener('submit', (e) => {
+        e.preventDefault();
+        load();
+    });
+    load();
+});
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from backend import getStonks, priceStore, riskAnal
+from backend.providers import FakeProvider
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty price store under tmp_path."""
+    path = tmp_path / "stock_data"
+    monkeypatch.setattr(priceStore, "STOCK_DATA_DIR", path)
+    monkeypatch.setattr(getStonks, "_synced_at", {})
+    riskAnal.risk_cache._states.clear()
+    return path
+
+
+@pytest.fixture
+def app(store, tmp_path, monkeypatch):
+    """The Flask app on an offline FakeProvider, with sessions, catalog and chart cache under tmp_path."""
+    import app as app_module
+    from backend import portAnal, sessions
+    from backend.catalog import Catalog
+    from backend.jobs import job_queue
+    from backend.quotes import quote_table
+
+    monkeypatch.setattr(getStonks, "_provider", FakeProvider())
+    monkeypatch.setattr(app_module, "session_store", sessions.SessionStore(persist_dir=None))
+    monkeypatch.setattr(app_module, "catalog", Catalog(tmp_path / "saved_portfolios"))
+    monkeypatch.setattr(portAnal, "CHART_CACHE_DIR", tmp_path / "chart_cache")
+    # Quotes change only when a test refreshes them
+    monkeypatch.setattr(quote_table, "background", False)
+    quote_table.invalidate()
+    yield app_module.app
+    # Let refresh jobs finish before the temp store goes away
+    for job in list(job_queue._jobs.values()):
+        job.done_event.wait(10)
+    quote_table.invalidate()
+
+
+def make_records(start: str, n: int, seed: int = 0) -> np.ndarray:
+    """`n` daily records on consecutive business days from `start`, with a random-walk close."""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, n)))
+    recs = np.empty(n, dtype=priceStore.RECORD_DTYPE)
+    recs["Date"] = np.busday_offset(np.datetime64(start, "D"), np.arange(n), roll="forward")
+    recs["Open"] = close * rng.uniform(0.98, 1.02, n)
+    recs["High"] = close * 1.03
+    recs["Low"] = close * 0.97
+    recs["Close"] = close
+    recs["Adj Close"] = close
+    recs["Volume"] = rng.integers(1_000, 10_000, n).astype("f8")
+    return recs
+
+
+def write_history(ticker: str, n: int = 500, seed: int = 0) -> np.ndarray:
+    """Store `n` business days of history for `ticker`, ending on the latest business day."""
+    last = np.busday_offset(np.datetime64("today", "D"), 0, roll="backward")
+    start = np.busday_offset(last, -(n - 1))
+    recs = make_records(str(start), n, seed)
+    priceStore.write_records(ticker, recs)
+    return recs
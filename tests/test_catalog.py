@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from backend import catalog as catalog_module
+from backend.catalog import JOURNAL_FILENAME, Catalog
+from backend.postPort import build_portfolio
+from backend.quotes import quote_table
+
+from tests.conftest import write_history
+
+
+@pytest.fixture
+def saved(tmp_path):
+    return Catalog(tmp_path / "saved_portfolios")
+
+
+def _fill(catalog):
+    catalog.save("growth", [["AAPL", "10", "2021-01-04"], ["MSFT", "5", "2021-06-01"]])
+    catalog.save("income", [["KO", "20", "2020-03-02"], ["PEP", "3", "2020-05-01"], ["KO", "1", "2022-01-03"]])
+    catalog.save("tech_growth", [["AMD", "7", "2019-01-02"]])
+    catalog.save("mixed", [["AAPL", "1", "2023-02-01"], ["KO", "1", "2023-02-01"]])
+
+
+def test_search_by_name_substring_and_ticker_prefix(saved):
+    _fill(saved)
+    items, total = saved.search("growth")
+    assert [i["name"] for i in items] == ["growth", "tech_growth"] and total == 2
+    # "am" matches the AMD holding, not a name
+    assert [i["name"] for i in saved.search("am")[0]] == ["tech_growth"]
+    assert [i["name"] for i in saved.search(ticker="ko")[0]] == ["income", "mixed"]
+    assert [i["name"] for i in saved.search("growth", ticker="AAPL")[0]] == ["growth"]
+    assert saved.search("nothing-like-this") == ([], 0)
+
+
+def test_search_sorts_and_pages(saved):
+    _fill(saved)
+    names = [i["name"] for i in saved.search(sort="lots", descending=True, limit=10)[0]]
+    assert names == ["income", "mixed", "growth", "tech_growth"]
+    page1, total = saved.search(sort="name", limit=2)
+    page2, _ = saved.search(sort="name", offset=2, limit=2)
+    assert total == 4
+    assert [i["name"] for i in page1 + page2] == ["growth", "income", "mixed", "tech_growth"]
+    with pytest.raises(ValueError):
+        saved.search(sort="colour")
+
+
+def test_summaries_and_journal_survive_a_restart(saved):
+    _fill(saved)
+    saved.delete("mixed")
+    entry = saved.get("income")
+    assert entry["lots"] == 3
+    assert entry["tickers"] == ["KO", "PEP"]
+    assert (entry["first_date"], entry["last_date"]) == ("2020-03-02", "2022-01-03")
+    assert (saved.directory / JOURNAL_FILENAME).exists()
+
+    reopened = Catalog(saved.directory)
+    assert len(reopened) == 3
+    assert reopened.get("income") == entry
+    assert reopened.get("mixed") is None
+
+
+def test_sync_picks_up_csvs_edited_outside_the_app(saved):
+    _fill(saved)
+    (saved.directory / "manual.csv").write_text("Asset,Quantity,Date Acquired\nNVDA,2,2024-01-02\n")
+    (saved.directory / "growth.csv").unlink()
+    assert [i["name"] for i in saved.search()[0]] == ["income", "manual", "mixed", "tech_growth"]
+    assert saved.get("manual")["tickers"] == ["NVDA"]
+
+
+def test_summaries_use_stored_closes_without_quotes(saved, store, monkeypatch):
+    recs = write_history("AAA", n=60)
+
+    def no_quotes(tickers):
+        raise AssertionError("catalog summaries must not ask for quotes")
+
+    monkeypatch.setattr(quote_table, "prices", no_quotes)
+    entry = saved.save("held", [["AAA", "10", str(recs["Date"][0])]])
+    assert entry["value"] == pytest.approx(10 * recs["Adj Close"][-1], abs=0.01)
+    assert entry["cost"] == pytest.approx(10 * recs["Adj Close"][0], abs=0.01)
+    assert entry["valued_lots"] == 1
+
+
+def test_create_form_name_conflicts_come_from_the_catalog(saved, monkeypatch):
+    monkeypatch.setattr(catalog_module.catalog, "directory", saved.directory)
+    form = {"name": "my growth", "ticker": "aapl", "quantity": "3", "date": "2024-01-02"}
+    assert build_portfolio(form) == ("my_growth", [["AAPL", "3", "2024-01-02"]])
+    saved.save("my_growth", [["AAPL", "3", "2024-01-02"]])
+    with pytest.raises(ValueError):
+        build_portfolio(form)
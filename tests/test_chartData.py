@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from backend.chartData import encode_series, lttb, pick_resolution, round_significant
+
+
+def _reference_lttb(x, y, threshold):
+    """Straightforward per-bucket LTTB (Steinarsson, 2013)."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+        lo = int(np.floor(i * every)) + 1
+        hi = int(np.floor((i + 1) * every)) + 1
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return np.array(picked)
+
+
+@pytest.mark.parametrize("n,threshold", [(1000, 100), (257, 50), (101, 3), (5000, 600), (12, 11)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.integers(1, 4, n)).astype("f8")
+    y = np.cumsum(rng.normal(size=n))
+    (picked,) = lttb([(x, y)], threshold)
+    np.testing.assert_array_equal(picked, _reference_lttb(x, y, threshold))
+
+
+def test_lttb_handles_series_of_different_lengths_together():
+    rng = np.random.default_rng(1)
+    series = []
+    for n in (800, 40, 2000, 3):
+        x = np.arange(n, dtype="f8")
+        series.append((x, np.cumsum(rng.normal(size=n))))
+    picked = lttb(series, 100)
+    for (x, y), idx in zip(series, picked):
+        if len(x) <= 100:
+            np.testing.assert_array_equal(idx, np.arange(len(x)))
+        else:
+            np.testing.assert_array_equal(idx, _reference_lttb(x, y, 100))
+
+
+def test_lttb_rejects_tiny_thresholds():
+    with pytest.raises(ValueError):
+        lttb([(np.arange(10.0), np.arange(10.0))], 2)
+
+
+def test_encode_series_round_trips_days_and_prices():
+    days = np.array(["2021-01-04", "2021-01-05", "2021-01-08", "2021-02-01"], dtype="M8[D]")
+    values = np.array([101.234567, 99.5, 100.0, 123.456789])
+    encoded = encode_series(days, values)
+    decoded = np.datetime64(encoded["start"]) + np.cumsum(encoded["steps"]).astype("m8[D]")
+    np.testing.assert_array_equal(decoded, days)
+    np.testing.assert_allclose(encoded["values"], round_significant(values), rtol=0)
+
+
+@pytest.mark.parametrize("years,width,expected", [
+    (5, 600, "weekly"), (20, 600, "monthly"), (5, 1200, "daily"), (1, 600, "daily"),
+])
+def test_pick_resolution(years, width, expected):
+    end = np.datetime64("2026-01-01")
+    start = end - np.timedelta64(365 * years, "D")
+    assert pick_resolution(start, end, width) == expected
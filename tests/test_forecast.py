@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from backend import forecast, processPool
+
+from tests.conftest import write_history
+
+TICKERS = ["AAA", "BBB", "CCC"]
+VALUES = np.array([5_000.0, 3_000.0, 2_000.0])
+
+
+@pytest.fixture
+def histories(store):
+    for seed, ticker in enumerate(TICKERS):
+        write_history(ticker, seed=seed)
+    yield
+    processPool.shutdown()
+
+
+def test_percentiles_from_histograms_match_numpy():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0.0, 0.1, size=(3, 20_000))
+    lo, hi = -1.0, 1.0
+    bins = 4096
+    hist = np.stack([np.histogram(s, bins=bins, range=(lo, hi))[0] for s in samples])
+    got = forecast._percentiles(hist, lo, hi)
+    expected = np.exp(np.percentile(samples, forecast.PERCENTILES, axis=1))
+    np.testing.assert_allclose(got, expected, rtol=2 * (hi - lo) / bins)
+
+
+@pytest.mark.parametrize("kind", ["gbm", "bootstrap"])
+def test_seeded_forecast_is_reproducible_across_workers(histories, kind):
+    kwargs = dict(kind=kind, paths=2_000, steps=30, seed=7, chunk_paths=500)
+    serial = forecast.simulate(TICKERS, VALUES, max_workers=1, **kwargs)
+    again = forecast.simulate(TICKERS, VALUES, max_workers=1, **kwargs)
+    pooled = forecast.simulate(TICKERS, VALUES, max_workers=2, **kwargs)
+    assert serial == again
+    assert pooled["bands"] == serial["bands"]
+    np.testing.assert_allclose(pooled["mean"], serial["mean"], rtol=1e-9)
+
+    assert serial["done"] and serial["paths"] == 2_000
+    assert serial["start_value"] == 10_000.0
+    bands = np.array([serial["bands"][f"p{q}"] for q in forecast.PERCENTILES])
+    assert np.all(np.diff(bands, axis=0) >= 0)
+    assert 0.0 <= serial["prob_loss"] <= 1.0
+
+
+def test_stream_reports_progress_per_chunk(histories):
+    snapshots = list(forecast.simulate_stream(TICKERS, VALUES, paths=1_250, steps=5, seed=1,
+                                              chunk_paths=500, max_workers=1))
+    assert [s["paths"] for s in snapshots] == [500, 1_000, 1_250]
+    assert [s["done"] for s in snapshots] == [False, False, True]
+
+
+def test_forecast_rejects_bad_arguments(histories):
+    with pytest.raises(ValueError):
+        forecast.simulate(TICKERS, VALUES, kind="garch")
+    with pytest.raises(ValueError):
+        forecast.simulate(TICKERS, VALUES, steps=0)
+    with pytest.raises(ValueError):
+        forecast.simulate(TICKERS, VALUES, paths=0)
@@ -0,0 +1,116 @@
+from datetime import date
+
+import numpy as np
+
+from backend import getStonks, priceStore
+from backend.providers import FakeProvider
+
+from tests.conftest import make_records
+
+
+def _store_days(ticker, start, end):
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    days = days[np.is_busday(days)]
+    recs = make_records(str(days[0]), len(days))
+    priceStore.write_records(ticker, recs)
+
+
+def test_market_holidays_observance():
+    holidays = getStonks._market_holidays(2021, 2023).astype(str).tolist()
+    # 2021-12-25 was a Saturday (observed Friday); 2022-01-01 was a Saturday (not observed)
+    assert "2021-12-24" in holidays
+    assert "2021-12-31" not in holidays
+    assert "2023-01-02" in holidays
+    assert "2021-06-18" not in holidays and "2022-06-20" in holidays
+
+
+def test_plan_windows_without_history_fetches_everything(store):
+    windows = getStonks._plan_windows("AAA", date(2021, 1, 1), date(2021, 3, 31))
+    assert windows == [("2021-01-01", "2021-04-01")]
+
+
+def test_plan_windows_skips_new_years_day(store):
+    # 2021-01-01 was a Friday and a market holiday; history starts on the 4th
+    _store_days("AAA", "2021-01-04", "2021-03-31")
+    assert getStonks._plan_windows("AAA", date(2021, 1, 1), date(2021, 3, 31)) == []
+
+
+def test_plan_windows_skips_weekends_and_holidays_at_the_end(store):
+    _store_days("AAA", "2021-01-04", "2021-07-02")
+    # Sat 3rd, Sun 4th, observed Independence Day Mon 5th
+    assert getStonks._plan_windows("AAA", date(2021, 1, 1), date(2021, 7, 5)) == []
+    assert getStonks._plan_windows("AAA", date(2021, 1, 1), date(2021, 7, 6)) == [("2021-07-03", "2021-07-07")]
+
+
+def test_plan_windows_prepends_missing_trading_days(store):
+    _store_days("AAA", "2021-02-01", "2021-03-31")
+    windows = getStonks._plan_windows("AAA", date(2021, 1, 1), date(2021, 3, 31))
+    assert windows == [("2021-01-01", "2021-02-01")]
+
+
+def test_refresh_symbols_fetches_once_then_is_up_to_date(store):
+    provider = FakeProvider(missing=["NOPE"])
+    start, end = date(2021, 1, 1), date(2021, 6, 30)
+    outcomes = getStonks.refresh_symbols(["AAA", "BBB", "NOPE"], start, end, provider=provider)
+    assert outcomes["AAA"]["status"] == "updated"
+    assert outcomes["BBB"]["status"] == "updated"
+    assert outcomes["NOPE"]["status"] == "failed"
+    # Both symbols missed the same window, so they shared one download
+    assert provider.calls == 1
+    assert priceStore.date_range("AAA") == (date(2021, 1, 1), date(2021, 6, 30))
+
+    calls = provider.calls
+    outcomes = getStonks.refresh_symbols(["AAA", "BBB"], start, end, provider=provider)
+    assert {s: o["status"] for s, o in outcomes.items()} == {"AAA": "up_to_date", "BBB": "up_to_date"}
+    assert provider.calls == calls
+
+
+def test_refresh_symbols_appends_new_days(store):
+    provider = FakeProvider()
+    getStonks.refresh_symbols(["AAA"], date(2021, 1, 1), date(2021, 6, 30), provider=provider)
+    before = np.array(priceStore.open_records("AAA"))
+    outcome = getStonks.refresh_symbols(["AAA"], date(2021, 1, 1), date(2021, 7, 30), provider=provider)["AAA"]
+    after = priceStore.open_records("AAA")
+    assert outcome["status"] == "updated"
+    assert outcome["rows"] == len(after) - len(before)
+    np.testing.assert_array_equal(after[:len(before)], before)
+    # The same walk as a single fetch of the whole range
+    whole = provider.download(["AAA"], "2021-01-01", "2021-07-31")["AAA"]
+    np.testing.assert_allclose(after["Close"], whole["Close"].to_numpy())
+
+
+class _FailingWindowProvider(FakeProvider):
+    """FakeProvider whose downloads starting at `fail_start` raise."""
+
+    def __init__(self, fail_start: str):
+        super().__init__()
+        self.fail_start = fail_start
+
+    def download(self, symbols, start, end_exclusive):
+        if start == self.fail_start:
+            raise RuntimeError("rate limited")
+        return super().download(symbols, start, end_exclusive)
+
+
+def test_refresh_symbols_reports_a_failed_window_as_partial(store):
+    _store_days("AAA", "2021-02-01", "2021-03-31")
+    provider = _FailingWindowProvider("2021-01-01")
+    outcome = getStonks.refresh_symbols(["AAA"], date(2021, 1, 1), date(2021, 6, 30), provider=provider)["AAA"]
+    assert outcome["status"] == "partial"
+    assert outcome["error"] == "rate limited"
+    assert priceStore.date_range("AAA") == (date(2021, 2, 1), date(2021, 6, 30))
+
+
+def test_partial_sync_is_not_remembered_as_synced(store):
+    today = date.today()
+    start = date(today.year - 1, 1, 1)
+    _store_days("AAA", f"{today.year - 1}-03-01", str(np.datetime64(today) - 30))
+    provider = _FailingWindowProvider(str(start))
+    outcomes = getStonks.update_current_portfolio_data(["AAA"], years=1, provider=provider, max_age=3600)
+    assert outcomes["AAA"]["status"] == "partial"
+    assert "AAA" not in getStonks._synced_at
+
+    provider.fail_start = None
+    outcomes = getStonks.update_current_portfolio_data(["AAA"], years=1, provider=provider, max_age=3600)
+    assert outcomes["AAA"]["status"] == "updated"
+    assert "AAA" in getStonks._synced_at
@@ -0,0 +1,70 @@
+import gzip
+import json
+
+import numpy as np
+
+from backend import priceStore
+
+HEADER = "Asset,Quantity,Date Acquired\n"
+
+
+def _load(client, csv_text):
+    response = client.post("/update-portfolio", json={"csv_text": HEADER + csv_text})
+    client.get(f"/jobs/{response.json['job_id']}/wait?timeout=10")
+
+
+def test_unchanged_table_answers_304(app):
+    client = app.test_client()
+    _load(client, "AAA,10,2024-01-02\nBBB,2,2024-02-01\n")
+    first = client.get("/current-portfolio")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/current-portfolio", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_price_write_and_edit_change_the_etag(app):
+    client = app.test_client()
+    _load(client, "AAA,10,2024-01-02\n")
+    etag = client.get("/current-portfolio").headers["ETag"]
+
+    # A new trading day in the store
+    recs = np.array(priceStore.open_records("AAA")[-1:])
+    recs["Date"] += 7
+    recs["Adj Close"] *= 1.5
+    priceStore.merge_records("AAA", recs)
+    after_write = client.get("/current-portfolio", headers={"If-None-Match": etag})
+    assert after_write.status_code == 200
+    assert after_write.headers["ETag"] != etag
+
+    etag = after_write.headers["ETag"]
+    _load(client, "AAA,11,2024-01-02\n")
+    after_edit = client.get("/current-portfolio", headers={"If-None-Match": etag})
+    assert after_edit.status_code == 200
+    assert after_edit.json["rows"][0][1] == "11"
+
+
+def test_raw_portfolio_honours_if_modified_since(app):
+    client = app.test_client()
+    _load(client, "AAA,10,2024-01-02\n")
+    first = client.get("/current-portfolio/raw")
+    modified = first.headers["Last-Modified"]
+    assert client.get("/current-portfolio/raw", headers={"If-Modified-Since": modified}).status_code == 304
+
+
+def test_large_json_is_gzipped_on_request(app):
+    client = app.test_client()
+    rows = "".join(f"AAA,{i + 1},2024-01-02\n" for i in range(200))
+    _load(client, rows)
+    plain = client.get("/current-portfolio?limit=200")
+    zipped = client.get("/current-portfolio?limit=200", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    assert json.loads(gzip.decompress(zipped.data)) == plain.json
+    # Validators are shared by both encodings
+    assert zipped.headers["ETag"] == plain.headers["ETag"]
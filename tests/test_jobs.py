@@ -0,0 +1,67 @@
+import threading
+
+from backend.jobs import DONE, FAILED, SUPERSEDED, JobQueue
+
+
+def test_newer_job_supersedes_the_waiting_one():
+    queue = JobQueue(max_workers=2)
+    gate, started = threading.Event(), threading.Event()
+    ran = []
+
+    def blocked(job):
+        started.set()
+        gate.wait(5)
+        ran.append("first")
+        return "first"
+
+    first = queue.submit("p1", blocked)
+    assert started.wait(5)
+    second = queue.submit("p1", lambda job: ran.append("second") or "second")
+    third = queue.submit("p1", lambda job: ran.append("third") or "third")
+
+    assert second.status == SUPERSEDED
+    assert second.superseded_by == third.id
+    gate.set()
+    # Waiting on the superseded job follows it to its successor
+    waited = queue.wait(second.id, timeout=5)
+    assert waited is third
+    assert third.status == DONE and third.result == "third"
+    assert queue.wait(first.id, timeout=5).result == "first"
+    # The burst collapsed into two runs, one at a time for the key
+    assert ran == ["first", "third"]
+
+
+def test_jobs_for_different_keys_run_side_by_side():
+    queue = JobQueue(max_workers=2)
+    both_running = threading.Barrier(2, timeout=5)
+
+    def meet(job):
+        both_running.wait()
+        return job.key
+
+    a = queue.submit("p1", meet)
+    b = queue.submit("p2", meet)
+    assert queue.wait(a.id, timeout=5).result == "p1"
+    assert queue.wait(b.id, timeout=5).result == "p2"
+
+
+def test_failed_job_keeps_its_error_and_frees_the_key():
+    queue = JobQueue(max_workers=1)
+
+    def boom(job):
+        raise ValueError("No tickers found in portfolio.")
+
+    failed = queue.wait(queue.submit("p1", boom).id, timeout=5)
+    assert failed.status == FAILED
+    assert failed.to_dict()["error"] == "No tickers found in portfolio."
+    assert queue.wait(queue.submit("p1", lambda job: 42).id, timeout=5).result == 42
+
+
+def test_wait_returns_the_running_job_on_timeout():
+    queue = JobQueue(max_workers=1)
+    gate = threading.Event()
+    job = queue.submit("p1", lambda job: gate.wait(5))
+    assert queue.wait(job.id, timeout=0.05).status in ("queued", "running")
+    gate.set()
+    assert queue.wait(job.id, timeout=5).status == DONE
+    assert queue.wait("no-such-job", timeout=0.01) is None
@@ -0,0 +1,59 @@
+import numpy as np
+
+from backend.lots import parse_lots
+
+
+def test_parse_lots_columns():
+    lots = parse_lots([["aapl ", "10", "2021-03-01"], ["MSFT", "5", "2020-01-02"], ["AAPL", "-2", "2022-06-30"]])
+    assert lots.tickers == ["AAPL", "MSFT"]
+    assert lots.ticker.tolist() == ["AAPL", "MSFT", "AAPL"]
+    assert lots.qty.tolist() == [10, 5, -2]
+    assert lots.date.astype(str).tolist() == ["2021-03-01", "2020-01-02", "2022-06-30"]
+    assert lots.ok.all()
+
+
+def test_parse_lots_flags_bad_cells_and_drops_short_rows():
+    lots = parse_lots([["AAPL", "ten", "2021-03-01"], ["MSFT", "5", "not a date"], ["SHORT", "1"],
+                       ["IBM", " 7 ", "03/04/2021"]])
+    assert len(lots) == 3
+    assert lots.ok.tolist() == [False, False, True]
+    assert lots.qty[2] == 7
+    assert str(lots.date[2]) == "2021-03-04"
+
+
+def test_underscore_quantities_are_rejected_on_every_path():
+    clean = parse_lots([["AAPL", "1_000", "2021-03-01"]])
+    mixed = parse_lots([["AAPL", "1_000", "2021-03-01"], ["MSFT", "x", "2021-03-01"]])
+    assert not clean.ok[0]
+    assert not mixed.ok[0]
+
+
+def test_parse_lots_is_memoized_by_content():
+    rows = [["AAPL", "10", "2021-03-01"]]
+    assert parse_lots(rows) is parse_lots([list(r) for r in rows])
+
+
+def test_aggregate_merges_same_ticker_and_date():
+    lots = parse_lots([
+        ["AAPL", "10", "2021-03-01"],
+        ["MSFT", "5", "2020-01-02"],
+        ["AAPL", "4", "2021-03-01"],
+        ["AAPL", "bad", "2021-03-01"],
+        ["AAPL", "1", "2021-03-02"],
+        ["MSFT", "5", "2020-01-02"],
+    ])
+    merged = lots.aggregate()
+    assert merged.ticker.tolist() == ["AAPL", "MSFT", "AAPL", "AAPL"]
+    assert merged.qty[merged.ok].tolist() == [14, 10, 1]
+    assert merged.ok.tolist() == [True, True, False, True]
+    # Merged rows carry the summed quantity; untouched rows are the originals
+    assert merged.rows[0] == ["AAPL", "14", "2021-03-01"]
+    assert merged.rows[3] is lots.rows[4]
+    assert merged.aggregate() is merged
+
+
+def test_take_keeps_shared_symbols():
+    lots = parse_lots([["B", "1", "2021-01-04"], ["A", "2", "2021-01-05"], ["C", "3", "2021-01-06"]])
+    page = lots.take(np.array([2, 0]))
+    assert page.ticker.tolist() == ["C", "B"]
+    assert page.symbols is lots.symbols
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from backend import optimizer, processPool
+
+from tests.conftest import write_history
+
+TICKERS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+@pytest.fixture
+def histories(store):
+    for seed, ticker in enumerate(TICKERS):
+        write_history(ticker, seed=seed)
+    yield
+    processPool.shutdown()
+
+
+def _random_problem(n=5, seed=0, lower=None, upper=None):
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(n, n))
+    cov = a @ a.T / n + 0.05 * np.eye(n)
+    mu = rng.uniform(0.02, 0.15, n)
+    lower = np.full(n, -np.inf) if lower is None else lower
+    upper = np.full(n, np.inf) if upper is None else upper
+    return optimizer._Problem(mu, cov, lower, upper)
+
+
+def test_unconstrained_min_variance_matches_closed_form():
+    problem = _random_problem()
+    w, _, _ = problem.solve()
+    inv_one = np.linalg.solve(problem.cov, np.ones(len(problem.mu)))
+    np.testing.assert_allclose(w, inv_one / inv_one.sum(), atol=1e-5)
+
+
+def test_target_return_solve_meets_the_target_inside_the_box():
+    n = 5
+    problem = _random_problem(n, lower=np.zeros(n), upper=np.full(n, 0.4))
+    target = float(np.mean([problem.mu.min(), problem.mu.max()]))
+    w, _, _ = problem.solve(target=target)
+    assert w.sum() == pytest.approx(1.0, abs=1e-5)
+    assert problem.mu @ w == pytest.approx(target, abs=1e-5)
+    assert w.min() >= 0.0 and w.max() <= 0.4 + 1e-9
+
+
+def test_optimize_long_only_objectives(histories):
+    min_var = optimizer.optimize(TICKERS, objective="min_variance")
+    sharpe = optimizer.optimize(TICKERS, objective="max_sharpe")
+    for result in (min_var, sharpe):
+        assert sum(result["weights"]) == pytest.approx(1.0, abs=1e-4)
+        assert min(result["weights"]) >= -1e-6
+    assert min_var["volatility"] <= sharpe["volatility"] + 1e-6
+    assert sharpe["sharpe"] >= min_var["sharpe"] - 1e-6
+
+    capped = optimizer.optimize(TICKERS, objective="max_sharpe", cap=0.3)
+    assert max(capped["weights"]) <= 0.3 + 1e-6
+    with pytest.raises(ValueError):
+        optimizer.optimize(TICKERS, cap=0.2)
+
+
+def test_frontier_on_the_process_pool_matches_a_single_worker(histories):
+    serial = optimizer.efficient_frontier(TICKERS, points=12, max_workers=1)
+    pooled = optimizer.efficient_frontier(TICKERS, points=12, max_workers=3)
+    assert pooled["points"] == serial["points"]
+
+    returns = [p["return"] for p in serial["points"]]
+    vols = [p["volatility"] for p in serial["points"]]
+    assert returns == sorted(returns)
+    # Along the efficient frontier more return costs more risk
+    assert all(b >= a - 1e-6 for a, b in zip(vols, vols[1:]))
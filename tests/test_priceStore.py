@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend import priceStore
+
+from tests.conftest import make_records
+
+
+@pytest.mark.parametrize("ticker", ["../etc/passwd", "a/b", "..", "A..B", "", "AAPL\n", "X" * 16, None])
+def test_invalid_tickers_never_become_paths(store, ticker):
+    assert not priceStore.valid_ticker(ticker)
+    assert len(priceStore.open_records(ticker)) == 0
+    if ticker is not None:
+        with pytest.raises(ValueError):
+            priceStore.store_path(ticker)
+
+
+@pytest.mark.parametrize("ticker", ["AAPL", "BRK-B", "^GSPC", "EURUSD=X", "RDS.A"])
+def test_exchange_symbols_are_valid(ticker):
+    assert priceStore.valid_ticker(ticker)
+
+
+def test_records_round_trip(store):
+    recs = make_records("2021-01-04", 50)
+    priceStore.write_df("AAA", priceStore.records_to_df(recs))
+    np.testing.assert_array_equal(priceStore.open_records("AAA"), recs)
+    assert priceStore.list_tickers() == ["AAA"]
+
+
+def test_legacy_csv_is_migrated_and_kept(store):
+    recs = make_records("2021-01-04", 20)
+    store.mkdir()
+    priceStore.records_to_df(recs).to_csv(store / "AAA.csv", index=False)
+    np.testing.assert_allclose(priceStore.open_records("AAA")["Close"], recs["Close"])
+    assert (store / "AAA.csv.migrated").exists()
+    assert not (store / "AAA.csv").exists()
+
+
+def test_concurrent_merges_keep_every_day_once(store):
+    recs = make_records("2021-01-04", 400)
+    priceStore.merge_records("AAA", recs[:100])
+    # Overlapping and adjacent chunks from several writers at once
+    chunks = [recs[lo:lo + 40] for lo in range(60, 400, 20)]
+    barrier = threading.Barrier(len(chunks))
+
+    def merge(chunk):
+        barrier.wait()
+        priceStore.merge_records("AAA", chunk)
+
+    threads = [threading.Thread(target=merge, args=(chunk,)) for chunk in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    np.testing.assert_array_equal(priceStore.open_records("AAA"), recs)
+    for resolution in priceStore.ROLLUPS:
+        np.testing.assert_array_equal(
+            priceStore.open_records("AAA", resolution), priceStore.aggregate_bars(recs, resolution))
+    assert not list(store.rglob("*.tmp"))
+
+
+def test_merge_records_appends_newer_rows(store):
+    recs = make_records("2021-01-04", 300)
+    assert priceStore.merge_records("AAA", recs[:200]) == "rewrite"
+    size = priceStore.store_path("AAA").stat().st_size
+    assert priceStore.merge_records("AAA", recs[200:]) == "append"
+    assert priceStore.store_path("AAA").stat().st_size == size + 100 * priceStore.RECORD_DTYPE.itemsize
+    np.testing.assert_array_equal(priceStore.open_records("AAA"), recs)
+
+
+def test_merge_records_compacts_prepends_and_overlaps(store):
+    recs = make_records("2021-01-04", 300)
+    priceStore.merge_records("AAA", recs[100:200])
+    assert priceStore.merge_records("AAA", recs[:100]) == "rewrite"
+    corrected = recs[150:300].copy()
+    corrected["Close"] += 1.0
+    assert priceStore.merge_records("AAA", corrected) == "rewrite"
+
+    stored = priceStore.open_records("AAA")
+    np.testing.assert_array_equal(stored["Date"], recs["Date"])
+    # The newer fetch wins where it overlaps
+    np.testing.assert_array_equal(stored["Close"][:150], recs["Close"][:150])
+    np.testing.assert_array_equal(stored["Close"][150:], corrected["Close"])
+
+
+def test_merge_records_ignores_empty_input(store):
+    assert priceStore.merge_records("AAA", priceStore._EMPTY) == "none"
+    assert not priceStore.has_history("AAA")
+
+
+def test_merge_records_dedupes_within_a_fetch(store):
+    recs = make_records("2021-01-04", 10)
+    again = recs[-1:].copy()
+    again["Close"] = -1.0
+    priceStore.merge_records("AAA", np.concatenate([recs, again]))
+    stored = priceStore.open_records("AAA")
+    assert len(stored) == 10
+    assert stored["Close"][-1] == -1.0
+
+
+def test_append_drops_a_torn_trailing_record(store):
+    recs = make_records("2021-01-04", 20)
+    priceStore.merge_records("AAA", recs[:10])
+    with priceStore.store_path("AAA").open("ab") as f:
+        f.write(b"\0" * 13)
+    assert priceStore.merge_records("AAA", recs[10:]) == "append"
+    np.testing.assert_array_equal(priceStore.open_records("AAA"), recs)
+
+
+def _pandas_bars(recs, freq):
+    df = priceStore.records_to_df(recs)
+    grouped = df.groupby(df["Date"].dt.to_period(freq))
+    return grouped.agg(
+        Date=("Date", "last"), Open=("Open", "first"), High=("High", "max"), Low=("Low", "min"),
+        Close=("Close", "last"), AdjClose=("Adj Close", "last"), Volume=("Volume", "sum"),
+    ).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("resolution,freq", [("weekly", "W-SUN"), ("monthly", "M")])
+def test_aggregate_bars_matches_pandas(resolution, freq):
+    recs = make_records("2020-12-30", 400)
+    bars = priceStore.aggregate_bars(recs, resolution)
+    expected = _pandas_bars(recs, freq)
+    np.testing.assert_array_equal(bars["Date"], expected["Date"].to_numpy().astype("M8[D]"))
+    for col, exp_col in [("Open", "Open"), ("High", "High"), ("Low", "Low"), ("Close", "Close"),
+                         ("Adj Close", "AdjClose"), ("Volume", "Volume")]:
+        np.testing.assert_allclose(bars[col], expected[exp_col].to_numpy())
+
+
+def test_aggregate_bars_weeks_start_on_monday():
+    recs = make_records("2021-01-08", 2)  # Friday, Monday
+    bars = priceStore.aggregate_bars(recs, "weekly")
+    assert bars["Date"].astype(str).tolist() == ["2021-01-08", "2021-01-11"]
+
+
+@pytest.mark.parametrize("split", [1, 37, 38, 120, 299])
+def test_appended_rollups_equal_a_full_rebuild(store, split):
+    recs = make_records("2021-01-04", 300)
+    priceStore.merge_records("AAA", recs[:split])
+    # A few small appends, each starting inside an existing week or month
+    for lo in range(split, 300, 7):
+        assert priceStore.merge_records("AAA", recs[lo:lo + 7]) == "append"
+    for resolution in priceStore.ROLLUPS:
+        np.testing.assert_array_equal(
+            priceStore.open_records("AAA", resolution), priceStore.aggregate_bars(recs, resolution))
+
+
+def test_stale_rollups_are_rebuilt_on_read(store):
+    recs = make_records("2021-01-04", 100)
+    priceStore.merge_records("AAA", recs)
+    priceStore.rollup_path("AAA", "monthly").unlink()
+    np.testing.assert_array_equal(
+        priceStore.open_records("AAA", "monthly"), priceStore.aggregate_bars(recs, "monthly"))
+
+
+def test_unknown_resolution_is_rejected(store):
+    with pytest.raises(ValueError):
+        priceStore.open_records("AAA", "hourly")
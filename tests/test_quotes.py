@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+import pytest
+
+from backend import priceStore
+from backend.priceEvents import price_events
+from backend.providers import FakeProvider
+from backend.quotes import QuoteTable
+
+from tests.conftest import write_history
+
+
+class _FlakyProvider(FakeProvider):
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def quotes(self, symbols):
+        if self.down:
+            with self._lock:
+                self.calls += 1
+            raise RuntimeError("quote service unavailable")
+        return super().quotes(symbols)
+
+
+@pytest.fixture
+def provider():
+    return _FlakyProvider()
+
+
+@pytest.fixture
+def quotes(store, provider):
+    return QuoteTable(ttl=60.0, provider_fn=lambda: provider, background=False)
+
+
+def test_first_lookup_starts_from_the_stored_close(quotes, provider):
+    recs = write_history("AAA", n=30)
+    assert quotes.price("AAA") == recs["Adj Close"][-1]
+    assert quotes.price("NOPE") is None
+    assert provider.calls == 0
+
+
+def test_refresh_fetches_one_batch_and_reports_changes(quotes, provider):
+    write_history("AAA", n=30, seed=1)
+    write_history("BBB", n=30, seed=2)
+    seq = price_events.seq
+    changed = quotes.refresh(["AAA", "BBB", "AAA"])
+    assert sorted(changed) == ["AAA", "BBB"]
+    assert provider.calls == 1 and provider.symbols_requested == 2
+    expected = provider.quotes(["AAA", "BBB"])
+    assert quotes.prices(["AAA", "BBB"]).tolist() == [expected["AAA"][0], expected["BBB"][0]]
+    assert price_events.wait(seq, 0)[1] >= {"AAA", "BBB"}
+    # Same quotes again: nothing changed, nothing published
+    assert quotes.refresh(["AAA", "BBB"]) == []
+
+
+def test_stale_quotes_refresh_in_the_background_after_the_ttl(store, provider):
+    write_history("AAA", n=30)
+    quotes = QuoteTable(ttl=0.2, provider_fn=lambda: provider, background=True)
+    quotes.refresh(["AAA"])
+    calls = provider.calls
+    quotes.prices(["AAA"])
+    assert provider.calls == calls
+    assert quotes.stats()["stale"] == 0
+
+    time.sleep(0.25)
+    assert quotes.stats()["stale"] == 1
+    quotes.prices(["AAA"])
+    deadline = time.monotonic() + 5
+    while provider.calls == calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider.calls == calls + 1
+
+
+def test_failed_refresh_keeps_the_last_price(quotes, provider):
+    write_history("AAA", n=30)
+    quotes.refresh(["AAA"])
+    price = quotes.price("AAA")
+    provider.down = True
+    assert quotes.refresh(["AAA"]) == []
+    assert quotes.price("AAA") == price
+    assert quotes.stats()["failures"] == 1
+
+
+def test_newer_stored_bar_wins_over_the_quote(quotes):
+    recs = write_history("AAA", n=30)
+    day = str(recs["Date"][-1])
+    quotes.set_quotes({"AAA": (123.0, day)})
+    assert quotes.price("AAA") == 123.0
+
+    # A history sync stores a later bar: the stored close takes over
+    newer = recs[-1:].copy()
+    newer["Date"] += 1
+    newer["Adj Close"] = 150.0
+    priceStore.merge_records("AAA", newer)
+    assert quotes.price("AAA") == 150.0
+
+    # A quote older than the stored bar is ignored
+    assert quotes.set_quotes({"AAA": (99.0, day)}) == []
+    assert quotes.price("AAA") == 150.0
+    assert np.isnan(quotes.prices(["ZZZ"])[0])
@@ -0,0 +1,47 @@
+from backend.sessions import SessionStore, new_session_id
+
+HEADER = "Asset,Quantity,Date Acquired\n"
+
+
+def _set_portfolio(client, csv_text):
+    response = client.post("/update-portfolio", json={"csv_text": HEADER + csv_text})
+    assert response.status_code == 202
+    job = client.get(f"/jobs/{response.json['job_id']}/wait?timeout=10").json["job"]
+    assert job["status"] == "done"
+    return job
+
+
+def test_each_browser_session_keeps_its_own_portfolio(app):
+    alice, bob = app.test_client(), app.test_client()
+    _set_portfolio(alice, "AAA,10,2024-01-02\n")
+    _set_portfolio(bob, "BBB,3,2023-06-01\nCCC,1,2023-06-02\n")
+
+    assert alice.get("/current-portfolio/raw").json["text"] == HEADER + "AAA,10,2024-01-02\n"
+    assert [row[0] for row in bob.get("/current-portfolio").json["rows"]] == ["BBB", "CCC"]
+    # An edit in one session leaves the other alone
+    _set_portfolio(bob, "DDD,5,2022-01-03\n")
+    assert [row[0] for row in alice.get("/current-portfolio").json["rows"]] == ["AAA"]
+    assert app.test_client().get("/current-portfolio").status_code == 404
+
+
+def test_sessions_are_written_behind_and_reloaded(tmp_path):
+    sid = new_session_id()
+    store = SessionStore(persist_dir=tmp_path, flush_interval=3600)
+    store.set(sid, "first", [["AAA", "1", "2024-01-02"]])
+    renamed = store.set(sid, "second", [["BBB", "2", "2024-01-03"]])
+    assert not (tmp_path / sid).exists()
+    assert store.flush() == 1
+    assert [p.name for p in (tmp_path / sid).iterdir()] == ["second.csv"]
+
+    reloaded = SessionStore(persist_dir=tmp_path, flush_interval=3600).get(sid)
+    assert reloaded.name == "second"
+    assert reloaded.rows == renamed.rows
+    assert reloaded.lots.content_hash == renamed.lots.content_hash
+
+
+def test_invalid_session_ids_are_never_persisted(tmp_path):
+    store = SessionStore(persist_dir=tmp_path, flush_interval=3600)
+    store.set("../../etc", "evil", [["AAA", "1", "2024-01-02"]])
+    store.flush()
+    assert list(tmp_path.iterdir()) == []
+    assert SessionStore(persist_dir=tmp_path).get("../../etc") is None
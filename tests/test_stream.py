@@ -0,0 +1,102 @@
+import json
+from datetime import date
+
+import pytest
+
+from backend.quotes import quote_table
+
+HEADER = "Asset,Quantity,Date Acquired\n"
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    import app as app_module
+
+    # Short waits, so a quiet stream yields a keepalive instead of blocking the test
+    monkeypatch.setattr(app_module, "STREAM_KEEPALIVE_SECONDS", 0.1)
+    monkeypatch.setattr(app_module, "STREAM_COALESCE_SECONDS", 0.0)
+    client = app.test_client()
+    response = client.post("/update-portfolio",
+                           json={"csv_text": HEADER + "AAA,10,2024-01-02\nBBB,5,2024-01-02\nAAA,1,2024-03-01\n"})
+    client.get(f"/jobs/{response.json['job_id']}/wait?timeout=10")
+    return client
+
+
+class _Stream:
+    def __init__(self, client, url, **kwargs):
+        self.response = client.get(url, buffered=False, **kwargs)
+        assert self.response.status_code == 200
+        self._chunks = iter(self.response.response)
+        assert next(self._chunks).startswith(b"retry:")
+
+    def next_event(self):
+        """(id, event, data) of the next chunk; (None, "keepalive", None) for a comment."""
+        chunk = next(self._chunks).decode()
+        if chunk.startswith(":"):
+            return None, "keepalive", None
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+        event_id = int(fields["id"]) if "id" in fields else None
+        return event_id, fields["event"], json.loads(fields["data"])
+
+    def close(self):
+        self.response.close()
+
+
+def _move(ticker, factor):
+    price = quote_table.price(ticker)
+    quote_table.set_quotes({ticker: (price * factor, str(date.today()))})
+    return price * factor
+
+
+def test_quote_change_pushes_only_the_affected_rows(client):
+    stream = _Stream(client, "/current-portfolio/stream")
+    try:
+        assert stream.next_event()[1] == "keepalive"
+        price = _move("AAA", 1.1)
+        event_id, event, data = stream.next_event()
+        assert event == "prices"
+        assert [r["index"] for r in data["rows"]] == [0, 2]
+        assert data["rows"][0]["row"][4] == f"${price:,.2f}"
+        assert event_id >= 1
+        table = client.get("/current-portfolio").json
+        assert data["net_total"] == table["net_total"]
+    finally:
+        stream.close()
+
+
+@pytest.mark.parametrize("via", ["query", "header"])
+def test_changes_before_the_stream_connected_are_replayed(client, via):
+    seq = client.get("/current-portfolio").json["price_seq"]
+    _move("BBB", 0.9)
+    kwargs = {"headers": {"Last-Event-ID": str(seq)}} if via == "header" else {}
+    url = "/current-portfolio/stream" + (f"?since={seq}" if via == "query" else "")
+    stream = _Stream(client, url, **kwargs)
+    try:
+        event_id, event, data = stream.next_event()
+        assert event == "prices"
+        assert [r["index"] for r in data["rows"]] == [1]
+        assert event_id > seq
+    finally:
+        stream.close()
+
+
+def test_up_to_date_client_gets_no_replay(client):
+    seq = client.get("/current-portfolio").json["price_seq"]
+    stream = _Stream(client, f"/current-portfolio/stream?since={seq}")
+    try:
+        assert stream.next_event()[1] == "keepalive"
+    finally:
+        stream.close()
+
+
+def test_portfolio_edit_tells_the_page_to_reload(client):
+    stream = _Stream(client, "/current-portfolio/stream")
+    try:
+        client.post("/update-portfolio", json={"csv_text": HEADER + "CCC,1,2024-01-02\n"})
+        while True:
+            _, event, data = stream.next_event()
+            if event != "keepalive":
+                break
+        assert event == "portfolio"
+    finally:
+        stream.close()